@@ -0,0 +1,306 @@
+"""Load test the MCP entry points against a local stub of the PatchEvergreen API.
+
+Starts ``stub_upstream.py``, then for each target starts the server (or, for
+stdio, one server process per client), connects simulated MCP clients and
+has each make ``--calls`` tool calls over a seeded, repeatable mix of
+libraries. Reports throughput, p50/p99 call latency, errors and the peak RSS
+of the server processes. Everything runs on localhost, so results are
+reproducible offline.
+
+Targets:
+    stdio         mcp_server.py over stdio (one process per client)
+    sse           mcp_server_only.py over SSE
+    unified       mcp_server_sse.py over SSE
+    unified-http  mcp_server_sse.py over streamable HTTP
+
+Usage::
+
+    python benchmarks/load.py --targets stdio,sse,unified,unified-http --clients 8 --calls 50
+    python benchmarks/load.py --json results.json
+    python benchmarks/load.py --baseline results.json --tolerance 0.2   # exit 1 on regression
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import warnings
+
+from fastmcp import Client
+from fastmcp.client.transports import PythonStdioTransport, SSETransport, StreamableHttpTransport
+
+warnings.filterwarnings("ignore")
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+TARGETS = {
+    "stdio": ("mcp_server.py", None),
+    "sse": ("mcp_server_only.py", "/sse"),
+    "unified": ("mcp_server_sse.py", "/sse"),
+    "unified-http": ("mcp_server_sse.py", "/mcp/"),
+}
+LANGUAGES = ("python", "javascript", "java", "go", "rust", "php", "ruby")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_port(port: int, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"process exited with {process.returncode} before listening on {port}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"nothing listening on port {port} after {timeout}s")
+
+
+def _proc_children(pid: int) -> list:
+    children = []
+    try:
+        for tid in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{tid}/children") as f:
+                children.extend(int(child) for child in f.read().split())
+    except OSError:
+        pass
+    return children
+
+
+def _process_tree(pid: int) -> list:
+    tree = [pid]
+    for child in _proc_children(pid):
+        tree.extend(_process_tree(child))
+    return tree
+
+
+def _peak_rss_kib(pid: int) -> int:
+    """Return the peak resident set size (VmHWM) of ``pid``, 0 if unavailable (non-Linux)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def start_stub(options) -> tuple:
+    """Start the stub API; return (process, url)."""
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "stub_upstream.py"), "--port", str(port),
+         "--latency-ms", str(options.latency_ms), "--jitter-ms", str(options.jitter_ms),
+         "--issues", str(options.issues), "--description-bytes", str(options.description_bytes),
+         "--error-rate", str(options.error_rate), "--seed", str(options.seed)],
+        stdout=subprocess.PIPE, text=True,
+    )
+    line = process.stdout.readline()
+    if not line.startswith("ready "):
+        process.kill()
+        raise RuntimeError("stub upstream did not start")
+    return process, line.split(" ", 1)[1].strip()
+
+
+def server_env(options, upstream_url: str) -> dict:
+    env = dict(os.environ)
+    for name in ("PEG_DISK_CACHE_PATH", "PEG_TRACING_EXPORTER", "PEG_WORKER_REGISTRY"):
+        env.pop(name, None)
+    env.update({
+        "PEG_UPSTREAM_URL": upstream_url,
+        "PEG_WORKERS": str(options.workers),
+        "PEG_CACHE_TTL": str(options.cache_ttl),
+        "PYTHONUNBUFFERED": "1",
+    })
+    return env
+
+
+def _arguments(rng: random.Random, options) -> tuple:
+    def pick():
+        # Skewed towards popular libraries, like real traffic
+        index = min(int(rng.paretovariate(1.2)) - 1, options.libraries - 1)
+        return {"library": f"lib{index}", "language": LANGUAGES[index % len(LANGUAGES)]}
+
+    if options.batch_size > 1:
+        return "get_issues_for_libraries", {"libraries": [pick() for _ in range(options.batch_size)]}
+    return "get_issues_for_library", pick()
+
+
+async def run_client(transport, client_index: int, options, latencies: list, errors: list) -> None:
+    rng = random.Random(options.seed * 1000 + client_index)
+    async with Client(transport, timeout=60) as client:
+        for _ in range(options.calls):
+            tool, arguments = _arguments(rng, options)
+            started = time.perf_counter()
+            try:
+                await client.call_tool(tool, arguments)
+            except Exception as exc:
+                errors.append(type(exc).__name__)
+            latencies.append(time.perf_counter() - started)
+
+
+async def drive(target: str, options, upstream_url: str) -> dict:
+    script, path = TARGETS[target]
+    env = server_env(options, upstream_url)
+    latencies, errors = [], []
+    server = None
+    if path is None:
+        transports = [PythonStdioTransport(os.path.join(ROOT, script), env=env, cwd=ROOT)
+                      for _ in range(options.clients)]
+    else:
+        port = _free_port()
+        env["PEG_PORT"] = str(port)
+        server = subprocess.Popen([sys.executable, script], cwd=ROOT, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        _wait_for_port(port, server)
+        url = f"http://127.0.0.1:{port}{path}"
+        transport_class = SSETransport if path == "/sse" else StreamableHttpTransport
+        transports = [transport_class(url) for _ in range(options.clients)]
+
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(*(run_client(transport, i, options, latencies, errors)
+                               for i, transport in enumerate(transports)))
+        elapsed = time.perf_counter() - started
+        rss = sum(_peak_rss_kib(pid) for pid in _process_tree(server.pid)) if server else 0
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    latencies.sort()
+    return {
+        "target": target,
+        "calls": len(latencies),
+        "errors": len(errors),
+        "seconds": round(elapsed, 3),
+        "calls_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(latencies[max(0, int(len(latencies) * 0.99) - 1)] * 1000, 2),
+        "peak_rss_mib": round(rss / 1024, 1),
+    }
+
+
+async def _sample_stdio_rss(stop: asyncio.Event) -> int:
+    """Return the combined peak RSS of the stdio servers spawned by this process.
+
+    stdio servers exit with their clients, so they are sampled while they run.
+    """
+    peak = 0
+    while not stop.is_set():
+        pids = [pid for pid in _process_tree(os.getpid())[1:] if _is_server(pid)]
+        peak = max(peak, sum(_peak_rss_kib(pid) for pid in pids))
+        try:
+            await asyncio.wait_for(stop.wait(), 0.2)
+        except asyncio.TimeoutError:
+            pass
+    return peak
+
+
+def _is_server(pid: int) -> bool:
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            return b"mcp_server.py" in f.read()
+    except OSError:
+        return False
+
+
+async def run_target(target: str, options, upstream_url: str) -> dict:
+    if TARGETS[target][1] is not None:
+        return await drive(target, options, upstream_url)
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(_sample_stdio_rss(stop))
+    try:
+        result = await drive(target, options, upstream_url)
+    finally:
+        stop.set()
+        rss = await sampler
+    result["peak_rss_mib"] = round(rss / 1024, 1)
+    return result
+
+
+def compare(results: list, baseline: list, tolerance: float) -> list:
+    """Return regression messages for ``results`` against ``baseline``."""
+    previous = {result["target"]: result for result in baseline}
+    problems = []
+    for result in results:
+        before = previous.get(result["target"])
+        if before is None:
+            continue
+        if result["calls_per_second"] < before["calls_per_second"] * (1 - tolerance):
+            problems.append(f"{result['target']}: throughput {result['calls_per_second']} calls/s "
+                            f"< baseline {before['calls_per_second']}")
+        if result["p99_ms"] > before["p99_ms"] * (1 + tolerance):
+            problems.append(f"{result['target']}: p99 {result['p99_ms']} ms > baseline {before['p99_ms']}")
+        if result["peak_rss_mib"] > before["peak_rss_mib"] * (1 + tolerance):
+            problems.append(f"{result['target']}: peak RSS {result['peak_rss_mib']} MiB "
+                            f"> baseline {before['peak_rss_mib']}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--targets", default="stdio,sse,unified,unified-http")
+    parser.add_argument("--clients", type=int, default=8, help="simulated MCP clients per target")
+    parser.add_argument("--calls", type=int, default=50, help="tool calls per client")
+    parser.add_argument("--libraries", type=int, default=200, help="size of the library pool")
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="libraries per call; above 1 uses get_issues_for_libraries")
+    parser.add_argument("--workers", type=int, default=1, help="PEG_WORKERS for the HTTP servers")
+    parser.add_argument("--cache-ttl", type=float, default=3600.0, help="PEG_CACHE_TTL (0 disables the cache)")
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--issues", type=int, default=25)
+    parser.add_argument("--description-bytes", type=int, default=400)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="compare with results previously written by --json")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    options = parser.parse_args()
+
+    targets = [target.strip() for target in options.targets.split(",") if target.strip()]
+    unknown = [target for target in targets if target not in TARGETS]
+    if unknown:
+        parser.error(f"unknown targets: {', '.join(unknown)}")
+
+    stub, upstream_url = start_stub(options)
+    results = []
+    try:
+        for target in targets:
+            results.append(asyncio.run(run_target(target, options, upstream_url)))
+    finally:
+        stub.terminate()
+        stub.wait()
+
+    print(f"{'target':<14}{'calls':>7}{'errors':>8}{'calls/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'RSS MiB':>10}")
+    for r in results:
+        print(f"{r['target']:<14}{r['calls']:>7}{r['errors']:>8}{r['calls_per_second']:>10}"
+              f"{r['p50_ms']:>10}{r['p99_ms']:>10}{r['peak_rss_mib']:>10}")
+
+    if options.json:
+        with open(options.json, "w") as f:
+            json.dump({"options": vars(options), "results": results}, f, indent=2)
+    if options.baseline:
+        with open(options.baseline) as f:
+            problems = compare(results, json.load(f)["results"], options.tolerance)
+        for problem in problems:
+            print(f"REGRESSION {problem}")
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
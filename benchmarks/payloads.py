@@ -0,0 +1,165 @@
+"""Compare the plain-dict and compact payload paths: memory held and JSON throughput.
+
+Generates ``--libraries`` responses with the payload generator of
+``stub_upstream.py`` and runs them through both paths:
+
+- ``plain``: ``json.loads`` into dicts, and FastMCP's default serializer
+  (pydantic, indented) for every tool result, as before the compact model.
+- ``compact``: ``codec.loads`` (orjson when installed) into the records of
+  ``patchevergreen.compact``, and ``codec.dumps_text``, which reuses the
+  encoding kept on a cached payload.
+
+For each path it reports decode throughput (upstream bytes to the cached
+object), the memory the cached objects hold (tracemalloc, in total and per
+issue), and encode throughput for one cached payload returned as a tool
+result (a cache hit) and for a ``get_issues_for_libraries`` result of
+``--batch-size`` cached payloads.
+
+Usage::
+
+    python benchmarks/payloads.py --libraries 2000 --issues 25
+    python benchmarks/payloads.py --json payloads.json
+    python benchmarks/payloads.py --baseline payloads.json --tolerance 0.2   # exit 1 on regression
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.abspath(os.path.join(HERE, os.pardir))
+sys.path[:0] = [ROOT, HERE]
+
+import pydantic_core  # noqa: E402
+
+from patchevergreen import codec  # noqa: E402
+from patchevergreen.compact import compact  # noqa: E402
+from stub_upstream import payload as stub_payload  # noqa: E402
+
+LANGUAGES = ("python", "javascript", "java", "go", "rust", "php", "ruby")
+
+
+def _fastmcp_default(value) -> str:
+    # fastmcp.tools.tool.default_serializer
+    return pydantic_core.to_json(value, fallback=str, indent=2).decode()
+
+
+PATHS = {
+    "plain": (json.loads, _fastmcp_default),
+    "compact": (lambda body: compact(codec.loads(body)), codec.dumps_text),
+}
+
+
+def _rate(function, argument, seconds: float) -> float:
+    """Return how many times per second ``function(argument)`` runs."""
+    calls = 0
+    started = time.perf_counter()
+    while True:
+        function(argument)
+        calls += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= seconds:
+            return calls / elapsed
+
+
+def measure(path: str, bodies: list, options) -> dict:
+    decode, encode = PATHS[path]
+    started = time.perf_counter()
+    for body in bodies:
+        decode(body)
+    decode_seconds = time.perf_counter() - started
+
+    gc.collect()
+    tracemalloc.start()
+    cached = [decode(body) for body in bodies]
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    hit = cached[0]
+    batch = {
+        "results": [{"index": index, "library": payload["library"], "language": payload["language"],
+                     "result": payload} for index, payload in enumerate(cached[:options.batch_size])],
+        "succeeded": min(options.batch_size, len(cached)),
+        "failed": 0,
+    }
+    # The first encode of a cached payload is a miss on the compact path; time the hits after it.
+    encode(hit)
+    encode(batch)
+    issues = sum(len(payload["issues"]) for payload in cached)
+    return {
+        "path": path,
+        "decode_mb_s": round(sum(map(len, bodies)) / decode_seconds / 1e6, 1),
+        "held_mb": round(held / 1e6, 1),
+        "bytes_per_issue": round(held / issues),
+        "hit_encodes_s": round(_rate(encode, hit, options.seconds)),
+        "batch_encodes_s": round(_rate(encode, batch, options.seconds), 1),
+        "_sample": (encode(hit), encode(batch)),
+    }
+
+
+def compare(results: list, baseline: list, tolerance: float) -> list:
+    """Return regression messages for ``results`` against ``baseline``."""
+    previous = {result["path"]: result for result in baseline}
+    problems = []
+    for result in results:
+        before = previous.get(result["path"])
+        if before is None:
+            continue
+        for key in ("decode_mb_s", "hit_encodes_s", "batch_encodes_s"):
+            if result[key] < before[key] * (1 - tolerance):
+                problems.append(f"{result['path']}: {key} {result[key]} < baseline {before[key]}")
+        if result["held_mb"] > before["held_mb"] * (1 + tolerance):
+            problems.append(f"{result['path']}: held_mb {result['held_mb']} > baseline {before['held_mb']}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--libraries", type=int, default=2000, help="cached responses")
+    parser.add_argument("--issues", type=int, default=25, help="issues per response")
+    parser.add_argument("--description-bytes", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=50, help="payloads in the batch result")
+    parser.add_argument("--seconds", type=float, default=1.0, help="time per encode measurement")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="compare with results previously written by --json")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    options = parser.parse_args()
+
+    bodies = [stub_payload(f"library-{index}", LANGUAGES[index % len(LANGUAGES)], options.seed, options.issues,
+                           options.description_bytes) for index in range(options.libraries)]
+    results = [measure(path, bodies, options) for path in PATHS]
+    plain, fast = (result.pop("_sample") for result in results)
+    # Both paths must produce the same JSON documents.
+    assert all(json.loads(a) == json.loads(b) for a, b in zip(plain, fast)), "paths disagree"
+
+    print(f"{len(bodies)} responses, {options.issues} issues each, {sum(map(len, bodies)) / 1e6:.1f} MB of JSON; "
+          f"codec uses {'orjson ' + codec.orjson.__version__ if codec.orjson else 'the json module'}")
+    print(f"{'path':<9}{'decode MB/s':>13}{'held MB':>10}{'B/issue':>9}{'hit enc/s':>12}{'batch enc/s':>13}")
+    for r in results:
+        print(f"{r['path']:<9}{r['decode_mb_s']:>13}{r['held_mb']:>10}{r['bytes_per_issue']:>9}"
+              f"{r['hit_encodes_s']:>12}{r['batch_encodes_s']:>13}")
+    before, after = results
+    print(f"\ncompact vs plain: {before['held_mb'] / after['held_mb']:.2f}x less memory, "
+          f"{after['decode_mb_s'] / before['decode_mb_s']:.2f}x decode, "
+          f"{after['hit_encodes_s'] / before['hit_encodes_s']:.1f}x hit encode, "
+          f"{after['batch_encodes_s'] / before['batch_encodes_s']:.1f}x batch encode")
+
+    if options.json:
+        with open(options.json, "w") as f:
+            json.dump({"options": vars(options), "results": results}, f, indent=2)
+    if options.baseline:
+        with open(options.baseline) as f:
+            problems = compare(results, json.load(f)["results"], options.tolerance)
+        for problem in problems:
+            print(f"REGRESSION {problem}")
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
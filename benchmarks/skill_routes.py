@@ -0,0 +1,159 @@
+"""Compare Skill endpoint latency and throughput: WSGI bridge vs native ASGI.
+
+The "bridged" server reproduces the previous unified layout: the Flask Skill
+app wrapped in ``asgiref.wsgi.WsgiToAsgi`` behind a path router in front of
+the FastMCP SSE app. The "native" server is ``mcp_server_sse``'s SSE app with
+the Skill routes registered on it. Each runs under uvicorn in a child
+process on localhost and is hit with the same concurrent request mix,
+optionally while idle SSE streams are held open.
+
+Usage::
+
+    python benchmarks/skill_routes.py [--requests 5000] [--concurrency 32] [--streams 50]
+
+Requires ``asgiref`` for the bridged server.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+PATHS = ("/.well-known/skill", "/.well-known/skill/metadata", "/.well-known/skills")
+
+
+def bridged_app():
+    """The pre-native layout: /sse to FastMCP, everything else through WsgiToAsgi."""
+    from asgiref.wsgi import WsgiToAsgi
+
+    import flask_server_only
+    import mcp_server_sse
+
+    mcp_app = mcp_server_sse.mcp.http_app(transport="sse")
+    flask_app = WsgiToAsgi(flask_server_only.app)
+
+    async def router(scope, receive, send):
+        path = scope.get("path", "") if scope["type"] == "http" else ""
+        if path == "/sse" or path.startswith("/sse/") or path.startswith("/messages"):
+            await mcp_app(scope, receive, send)
+        else:
+            await flask_app(scope, receive, send)
+
+    return router
+
+
+def native_app():
+    import mcp_server_sse
+
+    return mcp_server_sse.mcp.http_app(transport="sse")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve(factory: str):
+    """Run ``factory`` under uvicorn in a child process; return (process, base_url)."""
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "--factory", f"benchmarks.skill_routes:{factory}",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            break
+        except OSError:
+            if time.monotonic() > deadline or process.poll() is not None:
+                process.kill()
+                raise RuntimeError(f"{factory} server did not start")
+            time.sleep(0.1)
+    return process, f"http://127.0.0.1:{port}"
+
+
+async def _hold_stream(client: httpx.AsyncClient, stop: asyncio.Event):
+    try:
+        async with client.stream("GET", "/sse") as response:
+            async for _ in response.aiter_bytes():
+                if stop.is_set():
+                    break
+    except httpx.HTTPError:
+        pass
+
+
+async def run_load(base_url: str, total: int, concurrency: int, streams: int) -> dict:
+    limits = httpx.Limits(max_connections=concurrency + streams, max_keepalive_connections=concurrency + streams)
+    latencies = []
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        stop = asyncio.Event()
+        holders = [asyncio.create_task(_hold_stream(client, stop)) for _ in range(streams)]
+        await asyncio.sleep(0.2)
+        for path in PATHS:
+            await client.get(path)
+
+        remaining = iter(range(total))
+        errors = 0
+
+        async def worker():
+            nonlocal errors
+            for i in remaining:
+                started = time.perf_counter()
+                response = await client.get(PATHS[i % len(PATHS)], headers={"Accept-Encoding": "gzip"})
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        for holder in holders:
+            holder.cancel()
+        await asyncio.gather(*holders, return_exceptions=True)
+
+    latencies.sort()
+    return {
+        "requests_per_second": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--streams", type=int, default=0, help="idle SSE streams held open during the run")
+    args = parser.parse_args()
+
+    results = {}
+    for name in ("bridged", "native"):
+        process, base_url = serve(f"{name}_app")
+        try:
+            results[name] = asyncio.run(run_load(base_url, args.requests, args.concurrency, args.streams))
+        finally:
+            process.terminate()
+            process.wait()
+
+    print(f"{'server':<10}{'req/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for name, result in results.items():
+        print(f"{name:<10}{result['requests_per_second']:>12.0f}{result['p50_ms']:>10.2f}"
+              f"{result['p99_ms']:>10.2f}{result['errors']:>8}")
+    speedup = results["native"]["requests_per_second"] / results["bridged"]["requests_per_second"]
+    print(f"\nnative throughput: {speedup:.2f}x bridged")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""Measure cold start of the entry points: process start to the first ``initialize`` response.
+
+Each run starts a fresh interpreter with ``-X importtime``. For the stdio
+server (``mcp_server.py``) the benchmark writes an MCP ``initialize``
+request to its stdin as soon as it starts, and times the reply. The hosted
+servers (``mcp_server_only.py``, ``mcp_server_sse.py``) are only imported,
+not served, and their time is measured up to the end of that import. The
+``-X importtime`` report of every run gives the total import time and the
+share spent in this repository's own modules (``patchevergreen`` and the
+entry point itself). Medians over ``--runs`` runs are reported, with the
+modules slowest to import in the last run.
+
+Usage::
+
+    python benchmarks/startup.py --runs 10
+    python benchmarks/startup.py --json startup.json
+    python benchmarks/startup.py --baseline startup.json --tolerance 0.2   # exit 1 on regression
+"""
+import argparse
+import json
+import os
+import re
+import select
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+TARGETS = {
+    "stdio": "mcp_server",
+    "sse": "mcp_server_only",
+    "unified": "mcp_server_sse",
+}
+
+INITIALIZE = {
+    "jsonrpc": "2.0",
+    "id": 1,
+    "method": "initialize",
+    "params": {
+        "protocolVersion": "2025-03-26",
+        "capabilities": {},
+        "clientInfo": {"name": "startup-benchmark", "version": "1"},
+    },
+}
+
+# "import time: <self us> | <cumulative us> | <indent><module>"
+_IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def server_env() -> dict:
+    env = dict(os.environ)
+    # Nothing is fetched during startup; keep the run independent of the local configuration.
+    env["PEG_UPSTREAM_URL"] = "http://127.0.0.1:9/api/getissuesforlibrary.php"
+    for name in ("PEG_DISK_CACHE_PATH", "PEG_CACHE_SNAPSHOT", "PEG_OFFLINE", "PEG_TRACING_EXPORTER",
+                 "PEG_WORKER_REGISTRY", "PYTHONPROFILEIMPORTTIME"):
+        env.pop(name, None)
+    return env
+
+
+def parse_importtime(stderr: str) -> dict:
+    """Return ``{module: (self_us, cumulative_us, depth)}`` from ``-X importtime`` output."""
+    modules = {}
+    for line in stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            modules[module] = (int(self_us), int(cumulative_us), len(indent) // 2)
+    return modules
+
+
+def _own_module(module: str, entry: str) -> bool:
+    return module == entry or module == "patchevergreen" or module.startswith("patchevergreen.")
+
+
+def _wait_for_reply(process: subprocess.Popen, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    buffer = b""
+    while time.monotonic() < deadline:
+        ready, _, _ = select.select([process.stdout], [], [], max(0.0, deadline - time.monotonic()))
+        if not ready:
+            break
+        chunk = os.read(process.stdout.fileno(), 65536)
+        if not chunk:
+            raise RuntimeError("server exited before answering initialize")
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if json.loads(line).get("id") == INITIALIZE["id"]:
+                return
+    raise RuntimeError(f"no initialize response within {timeout}s")
+
+
+def run_once(target: str, timeout: float) -> dict:
+    entry = TARGETS[target]
+    if target == "stdio":
+        command = [sys.executable, "-X", "importtime", os.path.join(ROOT, entry + ".py")]
+    else:
+        command = [sys.executable, "-X", "importtime", "-c", f"import {entry}"]
+    # -X importtime writes more than a pipe holds before the server is ready, so it goes to a file.
+    with tempfile.TemporaryFile() as stderr:
+        started = time.perf_counter()
+        process = subprocess.Popen(command, cwd=ROOT, env=server_env(), stdin=subprocess.PIPE,
+                                   stdout=subprocess.PIPE, stderr=stderr)
+        try:
+            if target == "stdio":
+                # Written before the server is ready, as an IDE does; it waits in the pipe.
+                process.stdin.write((json.dumps(INITIALIZE) + "\n").encode())
+                process.stdin.flush()
+                _wait_for_reply(process, timeout)
+                elapsed = time.perf_counter() - started
+                process.stdin.close()
+            else:
+                process.wait(timeout)
+                elapsed = time.perf_counter() - started
+            process.wait(timeout)
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+        stderr.seek(0)
+        report = stderr.read().decode(errors="replace")
+    if target != "stdio" and process.returncode:
+        raise RuntimeError(f"import {entry} failed:\n{report[-2000:]}")
+
+    modules = parse_importtime(report)
+    top_level = [cumulative for _, cumulative, depth in modules.values() if depth == 0]
+    own = sum(self_us for module, (self_us, _, _) in modules.items() if _own_module(module, entry))
+    return {"elapsed_ms": elapsed * 1000, "import_ms": sum(top_level) / 1000, "own_import_ms": own / 1000,
+            "modules": modules}
+
+
+def run_target(target: str, options) -> dict:
+    runs = [run_once(target, options.timeout) for _ in range(options.runs)]
+    slowest = sorted(runs[-1]["modules"].items(), key=lambda item: item[1][1], reverse=True)
+    return {
+        "target": target,
+        "runs": len(runs),
+        "startup_ms": round(statistics.median(run["elapsed_ms"] for run in runs), 1),
+        "import_ms": round(statistics.median(run["import_ms"] for run in runs), 1),
+        "own_import_ms": round(statistics.median(run["own_import_ms"] for run in runs), 1),
+        "slowest_imports": [[module, round(cumulative / 1000, 1)]
+                            for module, (_, cumulative, depth) in slowest if depth <= 1][:options.top],
+    }
+
+
+def compare(results: list, baseline: list, tolerance: float) -> list:
+    """Return regression messages for ``results`` against ``baseline``."""
+    previous = {result["target"]: result for result in baseline}
+    problems = []
+    for result in results:
+        before = previous.get(result["target"])
+        if before is None:
+            continue
+        for key, label in (("startup_ms", "startup"), ("own_import_ms", "own-module import time")):
+            if result[key] > before[key] * (1 + tolerance):
+                problems.append(f"{result['target']}: {label} {result[key]} ms > baseline {before[key]}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--targets", default="stdio,sse,unified")
+    parser.add_argument("--runs", type=int, default=5, help="cold starts per target")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for one start")
+    parser.add_argument("--top", type=int, default=8, help="slowest imports to list per target")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="compare with results previously written by --json")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    options = parser.parse_args()
+
+    targets = [target.strip() for target in options.targets.split(",") if target.strip()]
+    unknown = [target for target in targets if target not in TARGETS]
+    if unknown:
+        parser.error(f"unknown targets: {', '.join(unknown)}")
+
+    results = [run_target(target, options) for target in targets]
+
+    print(f"{'target':<10}{'startup ms':>12}{'import ms':>12}{'own ms':>10}")
+    for r in results:
+        print(f"{r['target']:<10}{r['startup_ms']:>12}{r['import_ms']:>12}{r['own_import_ms']:>10}")
+    for r in results:
+        print(f"\n{r['target']} slowest imports (cumulative ms):")
+        for module, milliseconds in r["slowest_imports"]:
+            print(f"  {milliseconds:>8}  {module}")
+
+    if options.json:
+        with open(options.json, "w") as f:
+            json.dump({"options": vars(options), "results": results}, f, indent=2)
+    if options.baseline:
+        with open(options.baseline) as f:
+            problems = compare(results, json.load(f)["results"], options.tolerance)
+        for problem in problems:
+            print(f"REGRESSION {problem}")
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Local stand-in for the PatchEvergreen ``getissuesforlibrary.php`` API.
+
+Answers ``GET /api/getissuesforlibrary.php?library=...&language=...`` with a
+deterministic payload: the same library, language and ``--seed`` always
+produce the same issues, so benchmark runs are reproducible offline.
+Latency, payload size and error rate are configurable.
+
+Usage::
+
+    python benchmarks/stub_upstream.py --port 9000 --latency-ms 50 --jitter-ms 10 \\
+        --issues 25 --description-bytes 400 --error-rate 0.01 --seed 1
+
+Point a server at it with
+``PEG_UPSTREAM_URL=http://127.0.0.1:9000/api/getissuesforlibrary.php``.
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+PATH = "/api/getissuesforlibrary.php"
+
+_WORDS = ("deprecated", "removed", "renamed", "signature", "default", "behaviour", "changed",
+          "argument", "return", "type", "module", "config", "option", "now", "raises", "error")
+
+
+def payload(library: str, language: str, seed: int, issues: int, description_bytes: int) -> bytes:
+    """Return the deterministic JSON body for ``library``/``language``."""
+    digest = hashlib.sha256(f"{seed}:{language}:{library}".encode()).digest()
+    rng = random.Random(digest)
+    major = rng.randint(0, 5)
+    items = []
+    for i in range(issues):
+        if rng.random() < 0.3:
+            major += 1
+        words = []
+        while sum(len(word) + 1 for word in words) < description_bytes:
+            words.append(rng.choice(_WORDS))
+        items.append({
+            "id": f"{library}-{i}",
+            "title": f"{rng.choice(_WORDS).capitalize()} {rng.choice(_WORDS)} in {library}",
+            "description": " ".join(words)[:description_bytes],
+            "version": f"{major}.{rng.randint(0, 20)}.{rng.randint(0, 9)}",
+            "severity": rng.choice(("low", "medium", "high")),
+        })
+    return json.dumps({"library": library, "language": language, "issues": items}).encode()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    options = None
+    rng = None
+    lock = threading.Lock()
+    requests = 0
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != PATH:
+            self._send(404, b'{"error": "not found"}')
+            return
+        query = parse_qs(url.query)
+        options = self.options
+        with self.lock:
+            type(self).requests += 1
+            delay = max(0.0, options.latency_ms + self.rng.uniform(-options.jitter_ms, options.jitter_ms)) / 1000
+            fail = self.rng.random() < options.error_rate
+        time.sleep(delay)
+        if fail:
+            self._send(500, b'{"error": "injected failure"}')
+            return
+        body = payload(query.get("library", [""])[0], query.get("language", [""])[0],
+                       options.seed, options.issues, options.description_bytes)
+        self._send(200, body)
+
+    def _send(self, status: int, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="mean response latency")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="latency varies uniformly by +/- this")
+    parser.add_argument("--issues", type=int, default=25, help="issues per response")
+    parser.add_argument("--description-bytes", type=int, default=400, help="size of each issue description")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument("--seed", type=int, default=1)
+    return parser
+
+
+def main():
+    options = build_parser().parse_args()
+    StubHandler.options = options
+    StubHandler.rng = random.Random(options.seed)
+    server = ThreadingHTTPServer((options.host, options.port), StubHandler)
+    server.daemon_threads = True
+    print(f"ready http://{options.host}:{server.server_port}{PATH}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
-from flask import Flask, Response, jsonify
+import time
+from flask import Flask, Response, g, jsonify, request
 from pathlib import Path
+from patchevergreen import metrics, skill
 
 # Initialize Flask app for serving Skill file
 app = Flask(__name__)
@@ -7,6 +9,17 @@ app = Flask(__name__)
 # Get the directory where this script is located
 SCRIPT_DIR = Path(__file__).parent
 SKILL_FILE = SCRIPT_DIR / "SKILL.md"
+skill_file = skill.SkillFile(SKILL_FILE)
+
+
+def _skill_response(representation):
+    """Serve a precomputed Skill representation, honouring Accept-Encoding and If-None-Match."""
+    status, headers, body = skill.respond(
+        representation,
+        request.headers.get('Accept-Encoding'),
+        request.headers.get('If-None-Match'),
+    )
+    return Response(body, status=status, headers=headers)
 
 
 @app.route('/.well-known/skill', methods=['GET'])
@@ -14,10 +27,9 @@ SKILL_FILE = SCRIPT_DIR / "SKILL.md"
 @app.route('/skill', methods=['GET'])
 def get_skill():
     """Serve the SKILL.md file for web clients."""
-    if SKILL_FILE.exists():
-        with open(SKILL_FILE, 'r', encoding='utf-8') as f:
-            content = f.read()
-        return Response(content, mimetype='text/markdown; charset=utf-8')
+    snapshot = skill_file.snapshot()
+    if snapshot is not None:
+        return _skill_response(snapshot.markdown)
     else:
         return jsonify({"error": "Skill file not found"}), 404
 
@@ -26,17 +38,10 @@ def get_skill():
 @app.route('/api/skill/metadata', methods=['GET'])
 def get_skill_metadata():
     """Serve only the YAML frontmatter for skill discovery."""
-    if SKILL_FILE.exists():
-        with open(SKILL_FILE, 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        # Extract YAML frontmatter (between --- markers)
-        if content.startswith('---'):
-            parts = content.split('---', 2)
-            if len(parts) >= 3:
-                frontmatter = parts[1].strip()
-                return Response(frontmatter, mimetype='text/yaml; charset=utf-8')
-
+    snapshot = skill_file.snapshot()
+    if snapshot is not None:
+        if snapshot.frontmatter is not None:
+            return _skill_response(snapshot.frontmatter)
         return jsonify({"error": "Invalid skill format"}), 400
     else:
         return jsonify({"error": "Skill file not found"}), 404
@@ -46,43 +51,39 @@ def get_skill_metadata():
 @app.route('/api/skills', methods=['GET'])
 def list_skills():
     """List available skills (for discovery)."""
-    if SKILL_FILE.exists():
-        with open(SKILL_FILE, 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        # Extract metadata from frontmatter
-        metadata = {}
-        if content.startswith('---'):
-            parts = content.split('---', 2)
-            if len(parts) >= 3:
-                frontmatter = parts[1]
-                for line in frontmatter.split('\n'):
-                    if ':' in line:
-                        key, value = line.split(':', 1)
-                        key = key.strip()
-                        value = value.strip().strip('"').strip("'")
-                        if key == 'tags' and value.startswith('['):
-                            # Handle array format
-                            metadata[key] = [t.strip().strip('"').strip("'") for t in value.strip('[]').split(',')]
-                        else:
-                            metadata[key] = value
-
-        return jsonify(
-            {
-                "skills": [
-                    {
-                        "name": metadata.get("name", "PatchEvergreen Breaking Changes Analyzer"),
-                        "description": metadata.get("description", ""),
-                        "version": metadata.get("version", "1.0.0"),
-                        "url": "/.well-known/skill",
-                    }
-                ]
-            }
-        )
+    snapshot = skill_file.snapshot()
+    if snapshot is not None:
+        return _skill_response(snapshot.listing)
     else:
         return jsonify({"skills": []})
 
 
+@app.before_request
+def _start_timer():
+    metrics.HTTP_IN_FLIGHT.inc()
+    g.started = time.perf_counter()
+
+
+@app.teardown_request
+def _finish_request(exc):
+    metrics.HTTP_IN_FLIGHT.dec()
+
+
+@app.after_request
+def _count_request(response):
+    route = metrics.route_label(request.path)
+    metrics.HTTP_REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+    metrics.HTTP_DURATION.observe(time.perf_counter() - g.started, route=route)
+    return response
+
+
+# Prometheus scrape endpoint
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Expose HTTP request metrics in Prometheus text format."""
+    return Response(metrics.render(metrics.collect()), mimetype=metrics.CONTENT_TYPE)
+
+
 if __name__ == "__main__":
     # Run Flask server on port 8002
     PORT = 8002
@@ -1,16 +1,8 @@
 from fastmcp import FastMCP
-import requests
+from patchevergreen import core
 
-mcp = FastMCP("PEG")
-
-@mcp.tool()
-def get_issues_for_library(library: str, language: str) -> dict:
-    """Fetch issues for a given library and language from PatchEvergreen API."""
-    url = "https://app.patchevergreen.com/api/getissuesforlibrary.php"
-    params = {"library": library, "language": language}
-    response = requests.get(url, params=params, timeout=10)
-    response.raise_for_status()
-    return response.json()
+mcp = FastMCP("PEG", instructions=core.INSTRUCTIONS)
+core.register(mcp, local=True)
 
 if __name__ == "__main__":
     mcp.run(transport='stdio')
@@ -0,0 +1,162 @@
+"""Manifest- and lockfile-driven dependency audits."""
+import asyncio
+import xml.etree.ElementTree as ET
+
+from patchevergreen import batch, lookup, progress, scheduler, settings
+from patchevergreen.lockfiles import LockGraph, dependency_paths, parse_lockfile
+from patchevergreen.lockfiles import detect_format as detect_lockfile_format
+from patchevergreen.manifests import detect_format, parse_manifest
+
+
+async def _parse(label: str, content: str = None, path: str = None) -> dict:
+    try:
+        dependencies = await asyncio.to_thread(parse_manifest, label, content, path)
+    except (ValueError, ET.ParseError, OSError) as exc:
+        return {"manifest": label, "error": f"{type(exc).__name__}: {exc}"}
+    return {"manifest": label, "format": detect_format(label), "dependencies": dependencies}
+
+
+async def audit_manifests(manifests: list = None, paths: list = None, ctx=None) -> dict:
+    """Parse manifests and look up every dependency they declare.
+
+    Args:
+        manifests: ``Manifest`` objects carrying file contents.
+        paths: Manifest paths on the local disk (stdio server only).
+        ctx: Optional MCP context; each finished lookup is sent to it as a
+            progress notification.
+
+    Returns:
+        dict: ``manifests`` with the format and dependency count (or parse
+        error) for each input, ``dependencies`` in completion order with one
+        entry per unique (library, language) pair holding its declared
+        version, the manifests that declare it and either ``result`` or
+        ``error``, and ``succeeded``/``failed`` lookup counts.
+    """
+    sources = [_parse(m.filename, content=m.content) for m in manifests or []]
+    sources += [_parse(path, path=path) for path in paths or []]
+    parsed = await asyncio.gather(*sources)
+
+    unique = {}
+    for manifest in parsed:
+        for dependency in manifest.get("dependencies", ()):
+            key = lookup.cache_key(dependency.name, dependency.language)
+            entry = unique.setdefault(key, {
+                "library": dependency.name,
+                "language": dependency.language,
+                "version": dependency.version,
+                "constraint": dependency.constraint,
+                "manifests": [],
+            })
+            entry["manifests"].append(manifest["manifest"])
+
+    dependencies = await batch.fan_out(list(unique.values()), progress.reporter(ctx, len(unique)),
+                                       scheduler.session_key(ctx))
+    failed = sum(1 for item in dependencies if "error" in item)
+    summaries = []
+    for manifest in parsed:
+        if "error" in manifest:
+            summaries.append(manifest)
+        else:
+            summaries.append({"manifest": manifest["manifest"], "format": manifest["format"],
+                              "dependencies": len(manifest["dependencies"])})
+    return {
+        "manifests": summaries,
+        "dependencies": dependencies,
+        "succeeded": len(dependencies) - failed,
+        "failed": failed,
+    }
+
+
+async def _parse_lockfile(label: str, content: str = None, path: str = None) -> dict:
+    try:
+        language, graph = await asyncio.to_thread(parse_lockfile, label, content, path)
+        paths = await asyncio.to_thread(dependency_paths, graph, settings.LOCKFILE_MAX_PATHS)
+    except (ValueError, OSError) as exc:
+        return {"lockfile": label, "error": f"{type(exc).__name__}: {exc}"}
+    return {"lockfile": label, "format": detect_lockfile_format(label), "language": language,
+            "graph": graph, "paths": paths}
+
+
+def _path_label(graph: LockGraph, path: tuple) -> str:
+    steps = []
+    for node in path:
+        name, version = graph.packages[node]
+        steps.append(f"{name}@{version}" if version else name)
+    return " > ".join(steps)
+
+
+async def audit_lockfiles(lockfiles: list = None, paths: list = None, ctx=None) -> dict:
+    """Parse lockfiles and look up every package they install, direct or transitive.
+
+    Packages are deduplicated across every lockfile and every place in the
+    dependency graph, so each library is looked up once however many
+    versions of it are installed or however many packages require it.
+
+    Args:
+        lockfiles: ``Manifest`` objects carrying lockfile contents.
+        paths: Lockfile paths on the local disk (stdio server only).
+        ctx: Optional MCP context; each finished lookup is sent to it as a
+            progress notification.
+
+    Returns:
+        dict: ``lockfiles`` with the format, package count and whether the
+        lockfile records a dependency graph (or a parse error) for each
+        input, ``dependencies`` in completion order with one entry per
+        unique (library, language) pair holding its installed ``versions``,
+        whether it is ``direct``, up to ``PEG_LOCKFILE_MAX_PATHS`` shortest
+        dependency ``paths`` per version that pull it in, the lockfiles
+        that install it and either ``result`` or ``error``, and
+        ``succeeded``/``failed`` lookup counts.
+    """
+    sources = [_parse_lockfile(m.filename, content=m.content) for m in lockfiles or []]
+    sources += [_parse_lockfile(path, path=path) for path in paths or []]
+    parsed = await asyncio.gather(*sources)
+
+    unique = {}
+    attributed = {}
+    for lockfile in parsed:
+        if "error" in lockfile:
+            continue
+        graph = lockfile["graph"]
+        for node, (name, version) in graph.packages.items():
+            key = lookup.cache_key(name, lockfile["language"])
+            entry = unique.setdefault(key, {
+                "library": name,
+                "language": lockfile["language"],
+                "versions": [],
+                "direct": False,
+                "paths": [],
+                "lockfiles": [],
+            })
+            if version not in entry["versions"]:
+                entry["versions"].append(version)
+            if lockfile["lockfile"] not in entry["lockfiles"]:
+                entry["lockfiles"].append(lockfile["lockfile"])
+            if not graph.has_edges:
+                continue
+            found = lockfile["paths"].get(node, ())
+            entry["direct"] = entry["direct"] or any(len(path) == 1 for path in found)
+            # The same version may be installed at several places in one graph
+            # (nested node_modules); its paths share one PEG_LOCKFILE_MAX_PATHS budget.
+            budget = (lockfile["lockfile"], key, version)
+            for path in found[:settings.LOCKFILE_MAX_PATHS - attributed.get(budget, 0)]:
+                entry["paths"].append(_path_label(graph, path))
+                attributed[budget] = attributed.get(budget, 0) + 1
+
+    dependencies = await batch.fan_out(list(unique.values()), progress.reporter(ctx, len(unique)),
+                                       scheduler.session_key(ctx))
+    failed = sum(1 for item in dependencies if "error" in item)
+    summaries = []
+    for lockfile in parsed:
+        if "error" in lockfile:
+            summaries.append(lockfile)
+        else:
+            summaries.append({"lockfile": lockfile["lockfile"], "format": lockfile["format"],
+                              "packages": len(lockfile["graph"].packages),
+                              "has_graph": lockfile["graph"].has_edges})
+    return {
+        "lockfiles": summaries,
+        "dependencies": dependencies,
+        "succeeded": len(dependencies) - failed,
+        "failed": failed,
+    }
@@ -0,0 +1,59 @@
+"""Concurrent fan-out of breaking-change lookups for many libraries at once."""
+import asyncio
+
+from patchevergreen import lookup, progress, scheduler, settings
+
+
+def _error_message(exc: Exception) -> str:
+    return f"{type(exc).__name__}: {exc}"
+
+
+async def fan_out(items: list, on_result=None, session: str = "local", concurrency: int = None) -> list:
+    """Look up every item's ``library``/``language``, at most ``concurrency`` at a time.
+
+    Each item dict gains either ``result`` (the API payload) or ``error``;
+    failures never propagate. As each lookup finishes, ``on_result(done,
+    item)`` is awaited so callers can stream it. Upstream requests are
+    queued as bulk work for ``session``, behind interactive lookups.
+    ``concurrency`` defaults to ``PEG_BATCH_CONCURRENCY``.
+
+    Returns:
+        list: The items in the order their lookups completed.
+    """
+    semaphore = asyncio.Semaphore(concurrency or settings.BATCH_CONCURRENCY)
+    completed = []
+
+    async def run(item: dict) -> None:
+        async with semaphore:
+            try:
+                item["result"] = await lookup.get_issues(item["library"], item["language"])
+            except Exception as exc:
+                item["error"] = _error_message(exc)
+        completed.append(item)
+        if on_result is not None:
+            await on_result(len(completed), item)
+
+    with scheduler.bulk(session):
+        await asyncio.gather(*(run(item) for item in items))
+    return completed
+
+
+async def get_issues_many(libraries: list, ctx=None) -> dict:
+    """Look up every requested library concurrently.
+
+    A failing lookup is reported on its own item and does not fail the batch.
+    With an MCP ``ctx``, every finished lookup is also sent as a progress
+    notification.
+
+    Returns:
+        dict: ``results`` in completion order, each with its ``index`` in the
+        request, ``library``, ``language`` and either ``result`` (the API
+        payload) or ``error``; plus ``succeeded`` and ``failed`` counts.
+    """
+    if len(libraries) > settings.BATCH_MAX_ITEMS:
+        raise ValueError(f"At most {settings.BATCH_MAX_ITEMS} libraries can be looked up in one call")
+    items = [{"index": index, "library": ref.library, "language": ref.language}
+             for index, ref in enumerate(libraries)]
+    results = await fan_out(items, progress.reporter(ctx, len(items)), scheduler.session_key(ctx))
+    failed = sum(1 for item in results if "error" in item)
+    return {"results": results, "succeeded": len(results) - failed, "failed": failed}
@@ -0,0 +1,209 @@
+"""Bounded in-process TTL/LRU cache for upstream responses."""
+import time
+from collections import OrderedDict
+
+
+class CacheEntry:
+    """A cached value together with its size and freshness deadlines.
+
+    ``derived`` memoizes views computed from ``value`` (such as a version
+    index) so they are built once per cached response.
+    """
+
+    __slots__ = ("value", "size", "fetched_at", "expires_at", "stale_until", "error_until", "derived")
+
+    def __init__(self, value, size: int, fetched_at: float, expires_at: float, stale_until: float,
+                 error_until: float = None):
+        self.value = value
+        self.size = size
+        self.fetched_at = fetched_at
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+        self.error_until = stale_until if error_until is None else error_until
+        self.derived = {}
+
+    def is_fresh(self, now: float = None) -> bool:
+        """Return True until the entry's TTL has passed."""
+        return (time.time() if now is None else now) < self.expires_at
+
+
+class MemoryCache:
+    """LRU cache bounded by entry count and by total payload bytes.
+
+    Entries are fresh for ``ttl`` seconds. After that they are still returned
+    for up to ``max_stale`` more seconds so the caller can serve them at once
+    and refresh in the background (stale-while-revalidate); beyond that they
+    are treated as misses. Entries are kept for ``stale_if_error`` seconds
+    beyond that as a last known good copy, returned only by ``get_stale``
+    when the upstream API is failing, and then dropped.
+
+    ``on_evict(key, entry)``, when given, is called for every entry dropped
+    other than by being replaced (to stay within the bounds, because it
+    expired, or by ``discard`` and ``clear``), so data derived from the
+    cache elsewhere can be dropped with it.
+
+    The cache is not thread-safe; it is meant to be used from a single event
+    loop.
+    """
+
+    def __init__(self, ttl: float, max_stale: float, max_entries: int, max_bytes: int, stale_if_error: float = 0.0,
+                 on_evict=None):
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.stale_if_error = stale_if_error
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale_if_error_hits = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the entry for ``key`` (fresh or stale), or None on a miss."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        now = time.time()
+        if now >= entry.stale_until:
+            if now >= entry.error_until:
+                self._evict(key)
+                self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        if entry.is_fresh(now):
+            self.hits += 1
+        else:
+            self.stale_hits += 1
+        return entry
+
+    def get_stale(self, key):
+        """Return the last known good entry for ``key``, however stale, or None once it has been dropped."""
+        entry = self._entries.get(key)
+        if entry is None or time.time() >= entry.error_until:
+            return None
+        self.stale_if_error_hits += 1
+        return entry
+
+    def peek(self, key):
+        """Return the entry for ``key`` without touching LRU order or counters."""
+        return self._entries.get(key)
+
+    def items(self) -> list:
+        """Return ``(key, entry)`` for every entry, least recently used first."""
+        return list(self._entries.items())
+
+    def set(self, key, value, size: int, fetched_at: float = None) -> CacheEntry:
+        """Store ``value`` under ``key``, evicting least recently used entries as needed."""
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        expires_at = fetched_at + self.ttl
+        stale_until = expires_at + self.max_stale
+        entry = CacheEntry(value, size, fetched_at, expires_at, stale_until, stale_until + self.stale_if_error)
+        if size > self.max_bytes:
+            # Never let a single oversized payload flush the whole cache; it
+            # is not stored, so a cached older response for the key goes too.
+            self.discard(key)
+            return entry
+        if key in self._entries:
+            # Replaced, not evicted: the new entry stands in for it.
+            self._remove(key)
+        self._entries[key] = entry
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._evict(oldest)
+            self.evictions += 1
+        return entry
+
+    def _remove(self, key) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def discard(self, key) -> None:
+        """Drop ``key`` if it is cached; ``on_evict`` is called as for an eviction."""
+        if key in self._entries:
+            self._evict(key)
+
+    def _evict(self, key) -> None:
+        entry = self._entries[key]
+        self._remove(key)
+        if self.on_evict is not None:
+            self.on_evict(key, entry)
+
+    def clear(self) -> None:
+        """Drop every entry; ``on_evict`` is called for each, as for an eviction."""
+        entries, self._entries = self._entries, OrderedDict()
+        self._bytes = 0
+        if self.on_evict is not None:
+            for key, entry in entries.items():
+                self.on_evict(key, entry)
+
+    def stats(self) -> dict:
+        """Return counters and occupancy figures for operators."""
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "max_stale_seconds": self.max_stale,
+            "stale_if_error_seconds": self.stale_if_error,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "stale_if_error_hits": self.stale_if_error_hits,
+            "hit_ratio": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+        }
+
+
+class NegativeCache:
+    """Remembers, for ``ttl`` seconds, a small answer for pairs the upstream API has no data for.
+
+    Used for the error of a pair the API does not know (404) and for empty
+    responses, which would otherwise take up response cache entries or
+    reach the API on every lookup.
+
+    Holds at most ``max_entries`` pairs, dropping the oldest first. Not
+    thread-safe, like ``MemoryCache``.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the value recorded for ``key``, or None."""
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if time.time() >= expires_at:
+            del self._entries[key]
+            return None
+        self.hits += 1
+        return value
+
+    def add(self, key, value) -> None:
+        if self.ttl <= 0:
+            return
+        self._entries.pop(key, None)
+        self._entries[key] = (time.time() + self.ttl, value)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -0,0 +1,74 @@
+"""JSON decoding and encoding for API payloads and tool results.
+
+orjson is used when it is installed, and the standard library otherwise;
+both produce the same compact JSON. Records from ``patchevergreen.compact``
+are encoded like the dicts they were built from. A cached ``Payload`` is
+encoded once and keeps the bytes, which are then reused every time it is
+served: as they are when the payload is a tool's whole result, and spliced
+into the encoding of larger results (batch lookups, audits).
+"""
+import json
+import re
+import secrets
+
+from patchevergreen.compact import Payload, Record
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Payloads inside a larger value are first encoded as the string
+# "<_MARK><n>", which is then replaced by the payload's kept bytes. The
+# random part keeps real data from ever matching.
+_MARK = "\x00peg" + secrets.token_hex(8) + ":"
+_PLACEHOLDER = re.compile(b'"' + re.escape(json.dumps(_MARK)[1:-1].encode()) + rb'(\d+)"')
+
+
+def loads(data):
+    """Decode JSON ``data`` (bytes or str)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _default(value):
+    if isinstance(value, Record):
+        return value.to_dict()
+    return str(value)
+
+
+def _dumps(value, default=_default) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, default=default)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=default).encode("utf-8")
+
+
+def encoded(payload: Payload) -> bytes:
+    """Return the JSON encoding of ``payload``, computed on first use and kept on it."""
+    if payload.encoded is None:
+        payload.encoded = _dumps(payload.to_dict())
+    return payload.encoded
+
+
+def dumps(value) -> bytes:
+    """Encode ``value`` as compact UTF-8 JSON; values JSON cannot hold are encoded as strings."""
+    if isinstance(value, Payload):
+        return encoded(value)
+    spliced = []
+
+    def default(item):
+        if isinstance(item, Payload):
+            spliced.append(encoded(item))
+            return f"{_MARK}{len(spliced) - 1}"
+        return _default(item)
+
+    data = _dumps(value, default)
+    if not spliced:
+        return data
+    return _PLACEHOLDER.sub(lambda match: spliced[int(match.group(1))], data)
+
+
+def dumps_text(value) -> str:
+    """Encode ``value`` like ``dumps``, as text (the serializer of every MCP tool result)."""
+    return dumps(value).decode("utf-8")
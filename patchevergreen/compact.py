@@ -0,0 +1,104 @@
+"""Compact in-memory form of cached API payloads.
+
+A decoded payload is a tree of dicts, lists and strings, and most of its
+memory goes on per-object overhead: every issue is a dict with its own
+hash table, and the same field names and short values (severities,
+versions, language names) are repeated in every issue of every library.
+``compact`` turns the tree into read-only ``Record`` objects that hold
+only a tuple of values and share the table of field positions with every
+record of the same shape. Lists become tuples and short strings are
+interned.
+
+Records are ``Mapping``s, so code reading payloads works on them as on
+dicts, and ``patchevergreen.codec`` encodes them like the dicts they were
+built from. A top-level ``Payload`` also keeps its JSON encoding once it
+has been computed, so a payload served from the cache again is not
+re-serialized.
+"""
+import sys
+from collections.abc import Mapping
+
+# Strings up to this many characters (severities, versions, languages,
+# dates) are interned; longer ones (titles, descriptions) are rarely
+# repeated, and interning a new string costs more than decoding it.
+_INTERN_CHARS = 16
+# Shapes shared between records; payloads with more distinct shapes than
+# this give the extra records a table of their own.
+_MAX_SHAPES = 10000
+
+_shapes = {}
+
+
+def _shape(fields: tuple) -> dict:
+    """Return the shared ``{field: position}`` table for a record with ``fields``."""
+    shape = _shapes.get(fields)
+    if shape is None:
+        shape = {sys.intern(field): position for position, field in enumerate(fields)}
+        if len(_shapes) < _MAX_SHAPES:
+            _shapes[fields] = shape
+    return shape
+
+
+class Record(Mapping):
+    """A read-only JSON object: a tuple of values and a shared table of field positions."""
+
+    __slots__ = ("_shape", "_values")
+
+    def __init__(self, shape: dict, values: tuple):
+        self._shape = shape
+        self._values = values
+
+    def __getitem__(self, field):
+        return self._values[self._shape[field]]
+
+    def get(self, field, default=None):
+        position = self._shape.get(field)
+        return default if position is None else self._values[position]
+
+    def __contains__(self, field) -> bool:
+        return field in self._shape
+
+    def __iter__(self):
+        return iter(self._shape)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    def to_dict(self) -> dict:
+        """Return the fields as a dict; nested objects stay records."""
+        return dict(zip(self._shape, self._values))
+
+
+class Payload(Record):
+    """The top-level object of a cached response, with its JSON encoding once computed."""
+
+    __slots__ = ("encoded",)
+
+    def __init__(self, shape: dict, values: tuple):
+        super().__init__(shape, values)
+        self.encoded = None
+
+
+def _compact(value):
+    # Decoded JSON holds only exact dicts, lists and strs, so type() is enough.
+    kind = type(value)
+    if kind is str:
+        return sys.intern(value) if len(value) <= _INTERN_CHARS else value
+    if kind is dict:
+        return Record(_shape(tuple(value)), tuple([_compact(item) for item in value.values()]))
+    if kind is list:
+        return tuple([_compact(item) for item in value])
+    return value
+
+
+def compact(payload):
+    """Return the compact form of a decoded payload.
+
+    An object becomes a ``Payload``; a bare list of issues becomes a tuple.
+    """
+    if type(payload) is dict:
+        return Payload(_shape(tuple(payload)), tuple([_compact(item) for item in payload.values()]))
+    return _compact(payload)
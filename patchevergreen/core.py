@@ -0,0 +1,582 @@
+"""The tools and prompts every entry point serves.
+
+``mcp_server.py`` (stdio), ``mcp_server_only.py`` and ``mcp_server_sse.py``
+each create their own FastMCP server and call ``register`` on it, so the
+three always expose the same tools, with the same descriptions.
+
+IDE clients start a stdio server per workspace and wait for it to answer
+``initialize``, so this module keeps its imports light: the modules that
+do the work (the upstream HTTP client, the caches, the manifest and
+lockfile parsers) are imported inside the tools, on first call.
+"""
+from fastmcp import Context, FastMCP
+from fastmcp.tools import Tool
+
+from patchevergreen import metrics, settings
+from patchevergreen.models import LibraryRef, Manifest
+
+INSTRUCTIONS = ("MCP server for accessing PatchEvergreen's breaking changes database. "
+                "Fetches breaking changes and compatibility issues between versions "
+                "of programming libraries across multiple languages.")
+
+# Marks the docstring lines of arguments only a server on the user's machine has
+_LOCAL_ONLY = "(stdio server only)"
+
+
+@metrics.timed("tool")
+async def get_issues_for_library(
+    library: str,
+    language: str,
+    fields: list[str] | None = None,
+    cursor: str | None = None,
+    page_size: int | None = None,
+    max_bytes: int | None = None,
+) -> dict:
+    """
+    Fetch breaking changes and compatibility issues for a specific library and programming language.
+
+    Connects to the PatchEvergreen API to retrieve information about breaking changes,
+    deprecated features, and compatibility issues between different versions of libraries.
+
+    Args:
+        library (str): The name of the library/package to check for breaking changes as it would appear in a package manager
+                      (e.g., 'requests', 'lodash', 'django', 'express', 'phpmailer/phpmailer')
+        language (str): The programming language of the library
+                       (e.g., 'python', 'javascript', 'java', 'ruby', 'php', 'go')
+        fields (list, optional): Only return these fields of each issue
+        cursor (str, optional): The next_cursor from a previous page, to fetch the following page
+        page_size (int, optional): Maximum number of issues per page
+        max_bytes (int, optional): Stop adding issues to the page before their JSON size exceeds this
+
+    Returns:
+        dict: Dictionary containing breaking changes information including:
+            - issues: List of breaking changes and compatibility issues
+            - version information, deprecation notices, migration guidance
+            When any of fields, cursor, page_size or max_bytes is given, issues holds
+            one page and the result also has total_issues and next_cursor (None on the last page).
+
+    Example:
+        get_issues_for_library("phpmailer/phpmailer", "php")
+        Returns breaking changes data for the PHP phpmailer library which Packagist would call "phpmailer/phpmailer"
+    """
+    from patchevergreen import lookup
+
+    return await lookup.get_issues_page(library, language, fields, cursor, page_size, max_bytes)
+
+
+@metrics.timed("tool")
+async def get_issues_between_versions(library: str, language: str, current_version: str, target_version: str) -> dict:
+    """
+    Fetch only the breaking changes a library introduced between two versions.
+
+    Returns the issues introduced after current_version, up to and including
+    target_version, using the version ordering of the library's ecosystem
+    (PEP 440 for Python, semver for JavaScript/Rust/Go/Ruby, Maven ordering for
+    Java, Composer ordering for PHP). Use it instead of get_issues_for_library when
+    planning an upgrade, so only the relevant part of the library's history is returned.
+
+    Args:
+        library (str): The name of the library/package as it would appear in a package manager
+                      (e.g., 'requests', 'lodash', 'django', 'express', 'phpmailer/phpmailer')
+        language (str): The programming language of the library
+                       (e.g., 'python', 'javascript', 'java', 'ruby', 'php', 'go')
+        current_version (str): The version currently in use (e.g., '3.2', 'v4.17.0', '^6.5')
+        target_version (str): The version being upgraded to (e.g., '4.2')
+
+    Returns:
+        dict: Dictionary containing:
+            - issues: Breaking changes introduced in the version range, oldest first
+            - total_issues: Number of issues known for the library across all versions
+            - unversioned_issues: Number of issues without a version, which cannot be placed in the range
+
+    Example:
+        get_issues_between_versions("django", "python", "3.2", "4.2")
+    """
+    from patchevergreen import versions
+
+    return await versions.issues_between(library, language, current_version, target_version)
+
+
+@metrics.timed("tool")
+async def get_issues_for_libraries(libraries: list[LibraryRef], ctx: Context) -> dict:
+    """
+    Fetch breaking changes and compatibility issues for many libraries in a single call.
+
+    Looks up every library concurrently, so all of a project's dependencies can be
+    checked in one tool call instead of one call per dependency. A library that cannot
+    be fetched gets an error on its own result and does not fail the others.
+    Each result is also sent as a progress notification as soon as it arrives.
+
+    Args:
+        libraries (list): The libraries to check, each an object with:
+            - library (str): The name as it appears in a package manager (e.g., 'requests', 'phpmailer/phpmailer')
+            - language (str): The programming language (e.g., 'python', 'javascript', 'php')
+
+    Returns:
+        dict: Dictionary containing:
+            - results: One entry per requested library, in the order the lookups finished,
+              with its index in the request, library, language and either result
+              (as returned by get_issues_for_library) or error
+            - succeeded, failed: Counts of successful and failed lookups
+
+    Example:
+        get_issues_for_libraries([{"library": "requests", "language": "python"},
+                                  {"library": "lodash", "language": "javascript"}])
+    """
+    from patchevergreen import batch
+
+    return await batch.get_issues_many(libraries, ctx)
+
+
+@metrics.timed("tool")
+async def audit_manifests(ctx: Context, manifests: list[Manifest] | None = None, paths: list[str] | None = None) -> dict:
+    """
+    Audit every dependency declared in one or more package-manager manifests.
+
+    Parses the manifests on the server, extracts each dependency's name and pinned
+    version, and fetches breaking changes for all of them concurrently, so the model
+    does not have to read the manifest itself or call get_issues_for_library per dependency.
+    Each dependency's result is also sent as a progress notification as soon as it arrives.
+
+    Supported manifests: requirements.txt, package.json, composer.json, Gemfile,
+    Cargo.toml, pom.xml, libs.versions.toml, build.gradle(.kts) and go.mod.
+
+    Args:
+        manifests (list): The manifests to audit, each an object with:
+            - filename (str): The manifest's file name (e.g., 'requirements.txt', 'pom.xml')
+            - content (str): The full text of the manifest
+        paths (list, optional): Paths of manifests on the local disk (stdio server only)
+
+    Returns:
+        dict: Dictionary containing:
+            - manifests: Per manifest, its detected format and dependency count, or a parse error
+            - dependencies: One entry per unique library, in the order the lookups finished,
+              with library, language, version (pinned or minimum version, if any),
+              constraint, the manifests declaring it, and either result (as returned
+              by get_issues_for_library) or error
+            - succeeded, failed: Counts of successful and failed lookups
+
+    Example:
+        audit_manifests([{"filename": "requirements.txt", "content": "requests==2.31.0\nflask>=3.0"}])
+    """
+    from patchevergreen import audit
+
+    return await audit.audit_manifests(manifests, paths, ctx)
+
+
+@metrics.timed("tool")
+async def audit_lockfiles(ctx: Context, lockfiles: list[Manifest] | None = None, paths: list[str] | None = None) -> dict:
+    """
+    Audit every package a project installs, including transitive dependencies, from its lockfiles.
+
+    Parses the lockfiles on the server incrementally, deduplicates packages across the
+    whole dependency graph, and fetches breaking changes once per unique library,
+    concurrently. Each library is attributed to the dependency paths that pull it in
+    (e.g. "express@4.18.2 > body-parser@1.20.1 > qs@6.11.0"), so indirect dependencies
+    can be traced back to the direct dependency responsible for them.
+    Each library's result is also sent as a progress notification as soon as it arrives.
+
+    Supported lockfiles: package-lock.json (and npm-shrinkwrap.json), yarn.lock,
+    poetry.lock, Pipfile.lock, Cargo.lock, composer.lock, Gemfile.lock and go.sum.
+    Pipfile.lock and go.sum do not record which package requires which, so their
+    libraries come without dependency paths.
+
+    Args:
+        lockfiles (list): The lockfiles to audit, each an object with:
+            - filename (str): The lockfile's file name (e.g., 'package-lock.json', 'poetry.lock')
+            - content (str): The full text of the lockfile
+        paths (list, optional): Paths of lockfiles on the local disk (stdio server only)
+
+    Returns:
+        dict: Dictionary containing:
+            - lockfiles: Per lockfile, its detected format, package count and whether it
+              records a dependency graph (has_graph), or a parse error
+            - dependencies: One entry per unique library, in the order the lookups finished,
+              with library, language, the installed versions, direct (whether the project
+              requires it itself), the shortest dependency paths that pull it in, the
+              lockfiles installing it, and either result (as returned by
+              get_issues_for_library) or error
+            - succeeded, failed: Counts of successful and failed lookups
+
+    Example:
+        audit_lockfiles([{"filename": "poetry.lock", "content": "[[package]]\nname = \"requests\"\n..."}])
+    """
+    from patchevergreen import audit
+
+    return await audit.audit_lockfiles(lockfiles, paths, ctx)
+
+
+def _hosted_variant(tool):
+    """Give the decorated function ``tool``'s name, and its docstring without the local-only arguments."""
+    def decorator(fn):
+        fn.__name__ = fn.__qualname__ = tool.__name__
+        fn.__doc__ = "\n".join(line for line in tool.__doc__.splitlines() if _LOCAL_ONLY not in line)
+        return fn
+    return decorator
+
+
+# The audit tools of the hosted servers have no ``paths`` argument at all, so
+# a remote client can never make the server read (or probe) its own files.
+@metrics.timed("tool")
+@_hosted_variant(audit_manifests)
+async def _hosted_audit_manifests(ctx: Context, manifests: list[Manifest] | None = None) -> dict:
+    from patchevergreen import audit
+
+    return await audit.audit_manifests(manifests, None, ctx)
+
+
+@metrics.timed("tool")
+@_hosted_variant(audit_lockfiles)
+async def _hosted_audit_lockfiles(ctx: Context, lockfiles: list[Manifest] | None = None) -> dict:
+    from patchevergreen import audit
+
+    return await audit.audit_lockfiles(lockfiles, None, ctx)
+
+
+@metrics.timed("tool")
+async def search_issues(
+    query: str = "",
+    language: str | None = None,
+    libraries: list[str] | None = None,
+    after_version: str | None = None,
+    up_to_version: str | None = None,
+    limit: int = 20,
+) -> dict:
+    """
+    Search the breaking changes of every library this server has already fetched.
+
+    Runs a full-text search over a local index of all the responses the server has
+    loaded (from the PatchEvergreen API, its caches or a cache snapshot), without calling
+    the API, so questions across many libraries ("which of our libraries removed a
+    Python 3.8 API?") are answered in one call. Only libraries looked up before (with
+    get_issues_for_library, the batch or audit tools, or a prompt) are covered; look up
+    any other library first. Matching is on word stems, so "remove" also finds "removed".
+
+    Args:
+        query (str, optional): Words that must all appear in the issue (e.g., 'removed python 3.8');
+            "quoted words" must appear together and a trailing * matches a prefix (e.g., 'deprecat*').
+            Leave empty to list the issues matching the filters.
+        language (str, optional): Only issues of libraries in this language (e.g., 'python')
+        libraries (list, optional): Only issues of these libraries (e.g., ['django', 'requests'])
+        after_version (str, optional): Only issues introduced after this version, using the
+            version ordering of each library's ecosystem (e.g., '3.2')
+        up_to_version (str, optional): Only issues introduced up to and including this version (e.g., '4.2')
+        limit (int, optional): Maximum number of results (default 20)
+
+    Returns:
+        dict: Dictionary containing:
+            - results: The best matches first, each with library, language, version, title,
+              snippet (matched words in **bold**), score and the full issue
+            - total_matches: Number of issues matching the query and filters
+            - facets: Match counts by language and by library (the 20 largest of each)
+            - indexed_libraries: Number of libraries in the local index
+            - took_ms: Time taken by the search
+
+    Example:
+        search_issues("removed python 3.8", language="python")
+    """
+    from patchevergreen import lookup, search
+
+    await lookup.ready()
+    return await search.search_issues(query, language, libraries, after_version, up_to_version, limit)
+
+
+@metrics.timed("prompt")
+async def analyze_breaking_changes(library: str, language: str, include_data: bool | None = None) -> str:
+    """
+    Analyze breaking changes for a library and provide migration guidance.
+
+    This prompt helps users understand the impact of breaking changes in a library
+    and provides actionable advice for handling version updates.
+
+    Args:
+        library (str): The library name to analyze
+        language (str): The programming language
+        include_data (bool, optional): Embed the library's breaking changes in the prompt
+            (default: PEG_PROMPT_INCLUDE_DATA)
+
+    Returns:
+        str: A comprehensive prompt for analyzing breaking changes
+    """
+    prompt = f"""You are a software engineering expert specializing in library migration and compatibility analysis.
+
+Please analyze the breaking changes for the {language} library "{library}" using the PatchEvergreen database.
+
+Your analysis should include:
+
+1. **Breaking Changes Summary**: List the most critical breaking changes that could affect existing code
+2. **Version Impact Assessment**: Identify which version ranges are most affected
+3. **Migration Priority**: Rank changes by severity and likelihood of impact
+4. **Code Examples**: Where possible, show before/after code examples for major changes
+5. **Action Plan**: Provide a step-by-step migration strategy
+6. **Testing Recommendations**: Suggest specific areas to focus testing efforts
+7. **Timeline Estimation**: Estimate effort required for migration
+
+Focus on practical, actionable advice that developers can immediately use to plan their upgrade strategy."""
+    if _include_data(include_data):
+        return prompt + await _data_section([(library, language)], "get_issues_for_library")
+    return prompt + f"""
+
+Use the get_issues_for_library tool to fetch the latest breaking changes data for {library} in {language}."""
+
+
+@metrics.timed("prompt")
+async def dependency_audit_report(project_language: str, dependencies: str | None = None,
+                                  include_data: bool | None = None) -> str:
+    """
+    Generate a comprehensive dependency audit report template.
+
+    This prompt helps create a structured approach to auditing all dependencies
+    in a project for breaking changes and security issues.
+
+    Args:
+        project_language (str): The primary programming language of the project
+        dependencies (str, optional): Dependencies to audit, comma-separated, each as
+            name, name==version or name@version (e.g., 'requests==2.31.0, flask')
+        include_data (bool, optional): Embed the breaking changes of the listed dependencies,
+            since their given versions, in the prompt (default: PEG_PROMPT_INCLUDE_DATA)
+
+    Returns:
+        str: A prompt template for conducting dependency audits
+    """
+    prompt = f"""You are a DevOps and security specialist conducting a comprehensive dependency audit.
+
+Create a detailed dependency audit report for a {project_language} project. For each dependency that the user provides, use the PatchEvergreen database to assess:
+
+## Audit Framework
+
+### 1. Dependency Inventory
+- List all direct and indirect dependencies
+- Note current versions in use
+- Identify outdated packages
+
+### 2. Breaking Changes Analysis
+For each dependency, analyze:
+- Critical breaking changes since current version
+- Deprecation warnings and timelines
+- API changes that affect the codebase
+- Configuration changes required
+
+### 3. Impact Assessment Matrix
+Classify each dependency by:
+- **High Impact**: Breaking changes likely to cause failures
+- **Medium Impact**: Changes requiring code modifications
+- **Low Impact**: Minor changes or documentation updates
+- **No Impact**: No breaking changes identified
+
+### 4. Update Strategy
+- Prioritized update sequence
+- Version pinning recommendations
+- Rollback procedures
+- Testing requirements for each update
+
+### 5. Timeline and Resource Planning
+- Estimated hours per dependency update
+- Recommended update batching
+- Critical path dependencies
+- Team member assignments
+
+If the user provides lockfiles (package-lock.json, yarn.lock, poetry.lock, Pipfile.lock, Cargo.lock, composer.lock, Gemfile.lock, go.sum), pass them to the audit_lockfiles tool, which covers indirect dependencies too and reports the dependency paths that pull each one in. If the user provides manifest files (requirements.txt, package.json, composer.json, Gemfile, Cargo.toml, pom.xml, libs.versions.toml, build.gradle.kts, go.mod), pass them to the audit_manifests tool, which extracts the dependencies and fetches their breaking changes in a single call. Otherwise use the get_issues_for_libraries tool to fetch breaking changes data for all of the dependencies the user wants to audit in a single call."""
+    if not dependencies:
+        return prompt
+    from patchevergreen import prompt_data
+
+    listed = prompt_data.parse_dependencies(dependencies)
+    prompt += "\n\nDependencies to audit: " + ", ".join(
+        f"{name} {version}" if version else name for name, version in listed) + "."
+    if _include_data(include_data):
+        prompt += await _data_section([(name, project_language, version) for name, version in listed],
+                                      "get_issues_for_libraries")
+    return prompt
+
+
+@metrics.timed("prompt")
+async def version_upgrade_planner(library: str, language: str, current_version: str, target_version: str,
+                                  include_data: bool | None = None) -> str:
+    """
+    Create a detailed version upgrade plan for a specific library.
+
+    This prompt helps plan a safe upgrade path from one version to another,
+    considering all breaking changes along the upgrade path.
+
+    Args:
+        library (str): The library to upgrade
+        language (str): The programming language
+        current_version (str): Current version in use
+        target_version (str): Desired target version
+        include_data (bool, optional): Embed the breaking changes between the two versions
+            in the prompt (default: PEG_PROMPT_INCLUDE_DATA)
+
+    Returns:
+        str: A detailed upgrade planning prompt
+    """
+    with_data = _include_data(include_data)
+    if with_data:
+        fetch_step = f"Take the breaking changes between {current_version} and {target_version} from the PatchEvergreen Data section below"
+    else:
+        fetch_step = f"Fetch the breaking changes between {current_version} and {target_version} using get_issues_between_versions"
+    prompt = f"""You are a senior software architect planning a critical library upgrade.
+
+Create a comprehensive upgrade plan for {library} ({language}) from version {current_version} to {target_version}.
+
+## Upgrade Planning Framework
+
+### 1. Pre-Upgrade Assessment
+- {fetch_step}
+- Review every breaking change in that range
+- Map breaking changes to potential code impact areas
+- Assess compatibility with other dependencies
+
+### 2. Incremental Upgrade Strategy
+- Determine if direct upgrade is safe or if incremental steps are needed
+- Identify stable intermediate versions if step-by-step upgrade is recommended
+- Plan upgrade sequence to minimize risk
+
+### 3. Code Impact Analysis
+- List specific code patterns that will break
+- Identify configuration files that need updates
+- Note API changes affecting interfaces
+- Highlight performance implications
+
+### 4. Testing Strategy
+- Unit tests to update/create
+- Integration test scenarios
+- Performance benchmarks to run
+- Rollback testing procedures
+
+### 5. Implementation Plan
+- Detailed step-by-step upgrade process
+- Rollback procedures at each step
+- Monitoring and validation checkpoints
+- Team coordination requirements
+
+### 6. Change Management
+- Backup procedures
+- Feature flags for gradual rollout
+- Monitoring and validation checkpoints
+- Emergency rollback triggers
+
+Provide specific, actionable steps that the development team can follow to ensure a safe upgrade process."""
+    if with_data:
+        prompt += await _data_section([(library, language, current_version, target_version)],
+                                      "get_issues_between_versions")
+    return prompt
+
+
+@metrics.timed("prompt")
+async def compatibility_impact_summary(library: str, language: str, include_data: bool | None = None) -> str:
+    """
+    Generate a focused summary of compatibility impacts for a library.
+
+    This prompt helps create concise reports on how breaking changes
+    will affect existing codebases and integration patterns.
+
+    Args:
+        library (str): The library to analyze
+        language (str): The programming language
+        include_data (bool, optional): Embed the library's breaking changes in the prompt
+            (default: PEG_PROMPT_INCLUDE_DATA)
+
+    Returns:
+        str: A compatibility-focused summary prompt
+    """
+    prompt = f"""You are a software compatibility specialist analyzing library breaking changes.
+
+Create a concise compatibility impact summary for {library} ({language}) using PatchEvergreen data.
+
+## Compatibility Analysis Framework
+
+### 1. API Breaking Changes
+- Method signature changes
+- Removed or renamed functions/classes
+- Parameter requirement changes
+- Return type modifications
+
+### 2. Configuration Changes
+- Configuration file format changes
+- Environment variable modifications
+- Default value changes
+- Required vs optional parameter changes
+
+### 3. Behavioral Changes
+- Different output formats
+- Changed error handling patterns
+- Modified execution flow
+- Performance characteristic changes
+
+### 4. Integration Impact
+- Framework compatibility changes
+- Plugin/extension compatibility
+- Third-party tool integration changes
+- Build system requirement changes
+
+### 5. Migration Effort Assessment
+- Simple find-and-replace changes
+- Logic rewrites required
+- Configuration updates needed
+- Testing scope implications
+
+### 6. Compatibility Recommendations
+- Backward compatibility options
+- Gradual migration strategies
+- Code organization suggestions
+- Version pinning recommendations
+"""
+    if _include_data(include_data):
+        return prompt + "\nFocus on practical compatibility concerns that developers need to address." + \
+            await _data_section([(library, language)], "get_issues_for_library")
+    return prompt + "\nUse get_issues_for_library to fetch breaking changes data and focus on practical compatibility concerns that developers need to address."
+
+
+def _include_data(requested: bool | None) -> bool:
+    return settings.PROMPT_INCLUDE_DATA if requested is None else requested
+
+
+async def _data_section(requests: list, tool: str) -> str:
+    """Fetch the digests for ``(library, language[, current_version[, target_version]])`` requests."""
+    from patchevergreen import prompt_data
+
+    digest = await prompt_data.render([prompt_data.DigestRequest(*request) for request in requests], tool)
+    return f"""
+
+## PatchEvergreen Data
+
+This breaking changes data was fetched from PatchEvergreen when the prompt was created, one issue per line as {prompt_data.LINE_FORMAT}. Base the analysis on it, and call {tool} only for issues it leaves out.
+
+{digest}"""
+
+
+TOOLS = (get_issues_for_library, get_issues_between_versions, get_issues_for_libraries,
+         audit_manifests, audit_lockfiles, search_issues)
+# Replacements for the tools that read local files, on the hosted servers
+HOSTED_TOOLS = {"audit_manifests": _hosted_audit_manifests, "audit_lockfiles": _hosted_audit_lockfiles}
+PROMPTS = (analyze_breaking_changes, dependency_audit_report, version_upgrade_planner,
+           compatibility_impact_summary)
+
+
+def _serialize(result) -> str:
+    """Encode a tool result as compact JSON, reusing the encoding kept on cached payloads."""
+    from patchevergreen import codec
+
+    return codec.dumps_text(result)
+
+
+def register(mcp: FastMCP, local: bool = False) -> None:
+    """Register every tool and prompt on ``mcp``.
+
+    Tool results are encoded by ``patchevergreen.codec`` rather than
+    FastMCP's default serializer.
+
+    Args:
+        mcp: The entry point's server.
+        local: True for a server running on the user's machine (stdio),
+            whose audit tools also read manifests and lockfiles by ``paths``.
+            Other servers get the ``HOSTED_TOOLS`` variants, which have no
+            ``paths`` argument.
+    """
+    for tool in TOOLS:
+        if not local:
+            tool = HOSTED_TOOLS.get(tool.__name__, tool)
+        mcp.add_tool(Tool.from_function(tool, serializer=_serialize))
+    for prompt in PROMPTS:
+        mcp.prompt()(prompt)
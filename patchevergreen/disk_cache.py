@@ -0,0 +1,147 @@
+"""Persistent SQLite cache tier shared across restarts, processes and containers.
+
+The database runs in WAL mode so any number of server processes can read
+while one writes, and every row carries its own freshness metadata. Mount
+the database file on a shared volume and each new process or replica starts
+with a warm cache.
+"""
+import sqlite3
+import threading
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    library     TEXT NOT NULL,
+    language    TEXT NOT NULL,
+    body        BLOB NOT NULL,
+    fetched_at  REAL NOT NULL,
+    expires_at  REAL NOT NULL,
+    stale_until REAL NOT NULL,
+    PRIMARY KEY (library, language)
+);
+CREATE INDEX IF NOT EXISTS responses_stale_until ON responses (stale_until);
+"""
+
+
+class DiskEntry:
+    """A response body read back from disk with its freshness deadlines."""
+
+    __slots__ = ("body", "fetched_at", "expires_at", "stale_until")
+
+    def __init__(self, body: bytes, fetched_at: float, expires_at: float, stale_until: float):
+        self.body = body
+        self.fetched_at = fetched_at
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+
+    def is_fresh(self, now: float = None) -> bool:
+        return (time.time() if now is None else now) < self.expires_at
+
+
+class DiskCache:
+    """SQLite-backed response cache.
+
+    Methods block on disk I/O, so async callers should run them in a worker
+    thread (``asyncio.to_thread``). Each thread gets its own connection.
+    """
+
+    def __init__(self, path: str, ttl: float, max_stale: float, busy_timeout: float = 30.0,
+                 stale_if_error: float = 0.0):
+        self.path = path
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.stale_if_error = stale_if_error
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.compacted = 0
+        # Create the schema eagerly so configuration errors surface at startup.
+        self._connection()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            # auto_vacuum only takes effect on a brand-new database file.
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: tuple):
+        """Return the DiskEntry for ``key`` if it may still be served, else None."""
+        row = self._connection().execute(
+            "SELECT body, fetched_at, expires_at, stale_until FROM responses"
+            " WHERE library = ? AND language = ? AND stale_until > ?",
+            (key[0], key[1], time.time()),
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return DiskEntry(bytes(row[0]), row[1], row[2], row[3])
+
+    def get_stale(self, key: tuple):
+        """Return the last known good DiskEntry for ``key``, kept ``stale_if_error`` seconds past serving."""
+        row = self._connection().execute(
+            "SELECT body, fetched_at, expires_at, stale_until FROM responses"
+            " WHERE library = ? AND language = ? AND stale_until > ?",
+            (key[0], key[1], time.time() - self.stale_if_error),
+        ).fetchone()
+        if row is None:
+            return None
+        return DiskEntry(bytes(row[0]), row[1], row[2], row[3])
+
+    def set(self, key: tuple, body: bytes, fetched_at: float = None) -> None:
+        """Store ``body`` for ``key`` unless another process already stored a newer copy."""
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        expires_at = fetched_at + self.ttl
+        self._connection().execute(
+            "INSERT INTO responses (library, language, body, fetched_at, expires_at, stale_until)"
+            " VALUES (?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (library, language) DO UPDATE SET"
+            " body = excluded.body, fetched_at = excluded.fetched_at,"
+            " expires_at = excluded.expires_at, stale_until = excluded.stale_until"
+            " WHERE excluded.fetched_at > responses.fetched_at",
+            (key[0], key[1], body, fetched_at, expires_at, expires_at + self.max_stale),
+        )
+        self.writes += 1
+
+    def items(self):
+        """Yield ``(key, body, fetched_at)`` for every row that may still be served, even on error."""
+        rows = self._connection().execute(
+            "SELECT library, language, body, fetched_at FROM responses WHERE stale_until > ?"
+            " ORDER BY library, language",
+            (time.time() - self.stale_if_error,),
+        )
+        for library, language, body, fetched_at in rows:
+            yield (library, language), bytes(body), fetched_at
+
+    def compact(self) -> int:
+        """Delete rows that can no longer be served, even on error, and give the space back.
+
+        Returns the number of rows deleted.
+        """
+        conn = self._connection()
+        deleted = conn.execute("DELETE FROM responses WHERE stale_until <= ?",
+                               (time.time() - self.stale_if_error,)).rowcount
+        conn.execute("PRAGMA incremental_vacuum")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.compacted += deleted
+        return deleted
+
+    def stats(self) -> dict:
+        """Return counters and occupancy figures for operators."""
+        entries = self._connection().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {
+            "path": self.path,
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "compacted": self.compacted,
+        }
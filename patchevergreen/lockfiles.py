@@ -0,0 +1,617 @@
+"""Resolved dependency graphs from package-manager lockfiles.
+
+Unlike a manifest, a lockfile lists every package a project installs,
+direct or transitive, and (for most formats) which package requires which.
+Each parser reads its lockfile incrementally and builds only a
+``LockGraph`` of packages and edges: text lockfiles are walked line by
+line, and JSON lockfiles are pulled apart one entry at a time by
+``JsonStream``, so a tens-of-megabytes package-lock.json never becomes a
+full in-memory JSON tree.
+
+``dependency_paths`` then attributes each package to the chains of
+dependencies, from the project down, that pull it in.
+"""
+import json
+import re
+from collections import deque
+from json.decoder import scanstring
+from pathlib import PurePath
+from typing import Iterable, Iterator, Optional
+
+from patchevergreen.manifests import (_COMPOSER_PLATFORM, _iter_chunks, _iter_lines, _json_object, _strip_toml_comment,
+                                      _unquote)
+
+
+class LockGraph:
+    """Packages found in a lockfile and the dependency edges between them.
+
+    Nodes are parser-specific ids. ``packages`` maps the id of every
+    installed package to ``(name, version)``; ``projects`` holds the ids of
+    the project itself and its workspace members, which are not looked up
+    but anchor the dependency paths. ``has_edges`` is False for lockfiles
+    that do not record who requires what (Pipfile.lock, go.sum).
+    """
+
+    def __init__(self, has_edges: bool = True):
+        self.packages = {}
+        self.projects = set()
+        self.edges = {}
+        self.has_edges = has_edges
+
+    def add(self, node, name: str, version: Optional[str]) -> None:
+        self.packages[node] = (name, version)
+
+    def depend(self, node, target) -> None:
+        if target is not None and target != node:
+            self.edges.setdefault(node, []).append(target)
+
+    def roots(self) -> list:
+        """Return the nodes dependency paths start from.
+
+        These are the project nodes when the lockfile names them, and
+        otherwise every package that no other package requires.
+        """
+        if self.projects:
+            return list(self.projects)
+        required = {target for targets in self.edges.values() for target in targets}
+        return [node for node in self.packages if node not in required]
+
+
+def dependency_paths(graph: LockGraph, max_paths: int) -> dict:
+    """Return up to ``max_paths`` shortest dependency paths to every reachable package.
+
+    Returns:
+        dict: package node id -> list of paths, each a tuple of package node
+        ids from a direct dependency (or a root package) down to the node.
+        Project nodes are left out of the paths.
+    """
+    paths = {}
+    queue = deque()
+    for root in graph.roots():
+        paths[root] = [()] if root in graph.projects else [(root,)]
+        queue.append(root)
+    while queue:
+        node = queue.popleft()
+        for target in graph.edges.get(node, ()):
+            known = paths.get(target)
+            if known is None:
+                known = paths[target] = []
+                queue.append(target)
+            for path in paths[node]:
+                if len(known) >= max_paths:
+                    break
+                if target not in path:
+                    known.append(path + (target,))
+    return {node: found for node, found in paths.items() if node in graph.packages and found}
+
+
+# --- Incremental JSON ----------------------------------------------------
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# A whole string, a bracket, or a lone quote opening a string cut off by the end of the buffer
+_STRUCTURE = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[{}\[\]"]')
+_DECODER = json.JSONDecoder()
+# What may follow a number's decoded part at the end of the buffer and still belong to it
+_NUMBER_TAIL = re.compile(r"[0-9.eE+\-]*")
+
+
+class JsonStream:
+    """Pull parser over JSON text that arrives in chunks.
+
+    Containers are walked with ``iter_object``/``iter_array``; the caller
+    reads each member with ``read_value`` (materializing only that member),
+    walks into it, or drops it with ``skip_value`` (which builds nothing).
+    Consumed text is discarded as the buffer is refilled.
+    """
+
+    def __init__(self, chunks: Iterable[str]):
+        self._chunks = iter(chunks)
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character ('' at the end)."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} in JSON lockfile, found {self.peek()!r}")
+        self.pos += 1
+
+    def read_string(self) -> str:
+        self._expect('"')
+        while True:
+            try:
+                value, end = scanstring(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            self.pos = end
+            return value
+
+    def read_value(self):
+        """Decode and return the next value."""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number may continue in the next chunk, even after a cut-off "." or exponent.
+            if _NUMBER_TAIL.fullmatch(self.buf, end) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def skip_value(self) -> None:
+        """Step over the next value without decoding it."""
+        first = self.peek()
+        if first == '"':
+            self.read_string()
+            return
+        if first not in "{[":
+            self.read_value()
+            return
+        depth = 0
+        while True:
+            match = _STRUCTURE.search(self.buf, self.pos)
+            if match is None:
+                self.pos = len(self.buf)
+                if not self._fill():
+                    raise ValueError("Unexpected end of JSON lockfile")
+                continue
+            token = match.group()
+            if token == '"':
+                self.pos = match.start()
+                if not self._fill():
+                    raise ValueError("Unexpected end of JSON lockfile")
+                continue
+            self.pos = match.end()
+            if token[0] == '"':
+                continue
+            depth += 1 if token in "{[" else -1
+            if depth == 0:
+                return
+
+    def iter_object(self) -> Iterator[str]:
+        """Yield the keys of the next object; consume each value before resuming."""
+        self._expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.read_string()
+            self._expect(":")
+            yield key
+            char = self.peek()
+            self.pos += 1
+            if char == "}":
+                return
+            if char != ",":
+                raise ValueError(f"Expected ',' or '}}' in JSON lockfile, found {char!r}")
+
+    def iter_array(self) -> Iterator[None]:
+        """Yield once per element of the next array; consume each element before resuming."""
+        self._expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield None
+            char = self.peek()
+            self.pos += 1
+            if char == "]":
+                return
+            if char != ",":
+                raise ValueError(f"Expected ',' or ']' in JSON lockfile, found {char!r}")
+
+
+# --- JavaScript: package-lock.json ---------------------------------------
+
+_NPM_EDGE_SECTIONS = ("dependencies", "optionalDependencies", "peerDependencies")
+_NPM_ROOT_SECTIONS = _NPM_EDGE_SECTIONS + ("devDependencies",)
+_NODE_MODULES = "node_modules/"
+
+
+def _npm_resolve(graph: LockGraph, location: str, name: str):
+    """Find the install location Node's module resolution gives ``name`` required from ``location``."""
+    base = location
+    while True:
+        candidate = f"{base}/{_NODE_MODULES}{name}" if base else f"{_NODE_MODULES}{name}"
+        if candidate in graph.packages:
+            return candidate
+        if not base:
+            return None
+        cut = base.rfind(_NODE_MODULES)
+        if cut == -1:
+            base = ""
+        else:
+            base = base[:cut].rstrip("/")
+
+
+def _npm_packages(stream: JsonStream, graph: LockGraph, requires: dict) -> None:
+    # lockfileVersion 2 and 3: a flat map of install locations
+    for location in stream.iter_object():
+        entry = stream.read_value()
+        if not isinstance(entry, dict) or entry.get("link"):
+            continue
+        sections = _NPM_ROOT_SECTIONS if _NODE_MODULES not in location else _NPM_EDGE_SECTIONS
+        requires[location] = [name for section in sections
+                              for name in _json_object(entry.get(section), f"'{section}'")]
+        if _NODE_MODULES in location:
+            name = entry.get("name") or location.rsplit(_NODE_MODULES, 1)[1]
+            graph.add(location, name, entry.get("version"))
+        else:
+            graph.projects.add(location)
+
+
+def _npm_legacy(stream: JsonStream, graph: LockGraph, requires: dict, parent: str = "") -> None:
+    # lockfileVersion 1: a tree of nested "dependencies"
+    for name in stream.iter_object():
+        entry = stream.read_value()
+        if not isinstance(entry, dict):
+            continue
+        _npm_legacy_entry(graph, requires, parent, name, entry)
+
+
+def _npm_legacy_entry(graph: LockGraph, requires: dict, parent: str, name: str, entry: dict) -> None:
+    location = f"{parent}/{_NODE_MODULES}{name}" if parent else f"{_NODE_MODULES}{name}"
+    graph.add(location, name, entry.get("version"))
+    requires[location] = list(_json_object(entry.get("requires"), "'requires'"))
+    for child, child_entry in _json_object(entry.get("dependencies"), "'dependencies'").items():
+        if isinstance(child_entry, dict):
+            _npm_legacy_entry(graph, requires, location, child, child_entry)
+
+
+def parse_package_lock(chunks: Iterable[str]) -> LockGraph:
+    graph = LockGraph()
+    requires = {}
+    stream = JsonStream(chunks)
+    seen_packages = False
+    for key in stream.iter_object():
+        if key == "packages":
+            # Version 2 lockfiles repeat the tree under "dependencies" for old npm
+            # versions; "packages" is authoritative whichever comes first.
+            graph, requires = LockGraph(), {}
+            _npm_packages(stream, graph, requires)
+            seen_packages = True
+        elif key == "dependencies" and not seen_packages:
+            _npm_legacy(stream, graph, requires)
+        else:
+            stream.skip_value()
+    for location, names in requires.items():
+        for name in names:
+            graph.depend(location, _npm_resolve(graph, location, name))
+    return graph
+
+
+# --- JavaScript: yarn.lock (classic and Berry) ---------------------------
+
+def _descriptor_name(descriptor: str) -> str:
+    at = descriptor.find("@", 1)
+    return descriptor[:at] if at > 0 else descriptor
+
+
+_YARN_KEY = re.compile(r'"([^"]+)"|([^\s:]+)')
+
+
+def _yarn_pair(text: str) -> tuple:
+    """Split ``key "value"`` (classic) or ``key: value`` (Berry) into key and value."""
+    match = _YARN_KEY.match(text)
+    key = match.group(1) or match.group(2)
+    value = text[match.end():].strip()
+    if value.startswith(":"):
+        value = value[1:].strip()
+    return key, _unquote(value)
+
+
+def parse_yarn_lock(lines: Iterable[str]) -> LockGraph:
+    graph = LockGraph()
+    by_descriptor = {}
+    requires = {}
+    node = None
+    in_dependencies = False
+    for raw in lines:
+        line = raw.rstrip("\r\n")
+        text = line.strip()
+        if not text or text.startswith("#"):
+            continue
+        indent = len(line) - len(line.lstrip())
+        if indent == 0:
+            node = None
+            in_dependencies = False
+            if not text.endswith(":") or text.startswith("__metadata"):
+                continue
+            # Classic quotes each descriptor, Berry quotes the whole list.
+            descriptors = [part.strip() for part in text[:-1].replace('"', "").split(",") if part.strip()]
+            node = descriptors[0]
+            for descriptor in descriptors:
+                by_descriptor[descriptor] = node
+            graph.add(node, _descriptor_name(node), None)
+            requires[node] = []
+            if any("@workspace:" in descriptor for descriptor in descriptors):
+                graph.projects.add(node)
+        elif node is None:
+            continue
+        elif indent <= 2:
+            key, value = _yarn_pair(text)
+            in_dependencies = key in ("dependencies", "optionalDependencies") and not value
+            if key == "version":
+                graph.add(node, graph.packages[node][0], value)
+        elif in_dependencies:
+            requires[node].append(_yarn_pair(text))
+    for node, specs in requires.items():
+        for name, spec in specs:
+            graph.depend(node, by_descriptor.get(f"{name}@{spec}") or by_descriptor.get(f"{name}@npm:{spec}"))
+    for node in graph.projects:
+        graph.packages.pop(node, None)
+    return graph
+
+
+# --- PHP: composer.lock --------------------------------------------------
+
+def _link_by_name(graph: LockGraph, requires: dict, normalize=lambda name: name) -> None:
+    by_name = {}
+    for node, (name, _) in graph.packages.items():
+        by_name.setdefault(normalize(name), []).append(node)
+    for node, names in requires.items():
+        for name in names:
+            for target in by_name.get(normalize(name), ()):
+                graph.depend(node, target)
+
+
+def parse_composer_lock(chunks: Iterable[str]) -> LockGraph:
+    graph = LockGraph()
+    requires = {}
+    stream = JsonStream(chunks)
+    for key in stream.iter_object():
+        if key not in ("packages", "packages-dev"):
+            stream.skip_value()
+            continue
+        for _ in stream.iter_array():
+            entry = stream.read_value()
+            if not isinstance(entry, dict) or "name" not in entry:
+                continue
+            if not isinstance(entry["name"], str):
+                raise ValueError(f"Expected package name to be a string, found {type(entry['name']).__name__}")
+            name = entry["name"].lower()
+            node = (name, entry.get("version"))
+            graph.add(node, name, entry.get("version"))
+            requires[node] = [dep.lower() for dep in _json_object(entry.get("require"), "'require'")
+                              if not _COMPOSER_PLATFORM.match(dep.lower())]
+    _link_by_name(graph, requires)
+    return graph
+
+
+# --- Python: Pipfile.lock, poetry.lock -----------------------------------
+
+def parse_pipfile_lock(chunks: Iterable[str]) -> LockGraph:
+    graph = LockGraph(has_edges=False)
+    stream = JsonStream(chunks)
+    for key in stream.iter_object():
+        if key not in ("default", "develop"):
+            stream.skip_value()
+            continue
+        for name in stream.iter_object():
+            entry = stream.read_value()
+            version = entry.get("version") if isinstance(entry, dict) else None
+            version = version.lstrip("=") if isinstance(version, str) and version else None
+            graph.add((name.lower(), version), name, version)
+    return graph
+
+
+_PEP503 = re.compile(r"[-_.]+")
+_TOML_KEY_VALUE = re.compile(r"""^("[^"]+"|'[^']+'|[A-Za-z0-9_.\-]+)\s*=\s*(.*)$""")
+
+
+def _toml_packages(lines: Iterable[str]) -> Iterator[dict]:
+    """Yield the ``[[package]]`` tables of a poetry.lock or Cargo.lock.
+
+    Each is a dict of its top-level string keys, plus ``dependencies``: the
+    keys of a ``[package.dependencies]`` table (poetry) or the items of a
+    ``dependencies = [...]`` array (Cargo).
+    """
+    package = None
+    table = None
+    array = None
+    for raw in lines:
+        line = _strip_toml_comment(raw).strip()
+        if not line:
+            continue
+        if array is not None:
+            array.extend(_unquote(item) for item in line.rstrip("]").split(",") if item.strip())
+            if line.endswith("]"):
+                array = None
+            continue
+        if line.startswith("["):
+            if line == "[[package]]":
+                if package is not None:
+                    yield package
+                package = {"dependencies": []}
+                table = None
+            elif package is not None:
+                table = line.strip("[] ")
+                if table.startswith("package.dependencies."):
+                    # [package.dependencies.<name>] holds one dependency's constraints
+                    package["dependencies"].append(_unquote(table.split(".", 2)[2]))
+            continue
+        if package is None:
+            continue
+        match = _TOML_KEY_VALUE.match(line)
+        if match is None:
+            continue
+        key, value = _unquote(match.group(1)), match.group(2).strip()
+        if table == "package.dependencies":
+            package["dependencies"].append(key)
+        elif table is None:
+            if key == "dependencies" and value.startswith("["):
+                items = value[1:]
+                package["dependencies"].extend(_unquote(item) for item in items.rstrip("]").split(",")
+                                               if item.strip())
+                if not value.endswith("]"):
+                    array = package["dependencies"]
+            elif value[:1] in "\"'":
+                package[key] = _unquote(value)
+    if package is not None:
+        yield package
+
+
+def parse_poetry_lock(lines: Iterable[str]) -> LockGraph:
+    graph = LockGraph()
+    requires = {}
+    for package in _toml_packages(lines):
+        if "name" not in package:
+            continue
+        node = (package["name"].lower(), package.get("version"))
+        graph.add(node, package["name"], package.get("version"))
+        requires[node] = package["dependencies"]
+    _link_by_name(graph, requires, lambda name: _PEP503.sub("-", name).lower())
+    return graph
+
+
+# --- Rust: Cargo.lock ----------------------------------------------------
+
+def parse_cargo_lock(lines: Iterable[str]) -> LockGraph:
+    graph = LockGraph()
+    requires = {}
+    by_name = {}
+    for package in _toml_packages(lines):
+        if "name" not in package:
+            continue
+        node = (package["name"], package.get("version"))
+        graph.add(node, package["name"], package.get("version"))
+        if "source" not in package:
+            # Workspace members and path dependencies belong to the project.
+            graph.projects.add(node)
+        requires[node] = package["dependencies"]
+        by_name.setdefault(package["name"], []).append(node)
+    for node, references in requires.items():
+        for reference in references:
+            # "name", "name version" or "name version (source)"
+            parts = reference.split()
+            candidates = by_name.get(parts[0], ()) if parts else ()
+            if len(parts) > 1:
+                candidates = [candidate for candidate in candidates if candidate[1] == parts[1]]
+            for target in candidates[:1]:
+                graph.depend(node, target)
+    for node in graph.projects:
+        graph.packages.pop(node, None)
+    return graph
+
+
+# --- Ruby: Gemfile.lock --------------------------------------------------
+
+_GEM_SPEC = re.compile(r"^(\S+?)(?: \(([^)]*)\))?!?$")
+
+
+def parse_gemfile_lock(lines: Iterable[str]) -> LockGraph:
+    graph = LockGraph()
+    requires = {}
+    project = ("", None)
+    section = None
+    node = None
+    for raw in lines:
+        line = raw.rstrip("\r\n")
+        if not line.strip():
+            continue
+        if not line.startswith(" "):
+            section = line.strip()
+            node = None
+            if section == "DEPENDENCIES":
+                graph.projects.add(project)
+                requires[project] = []
+            continue
+        indent = len(line) - len(line.lstrip())
+        match = _GEM_SPEC.match(line.strip())
+        if match is None:
+            continue
+        name, version = match.groups()
+        if section == "DEPENDENCIES" and indent == 2:
+            requires[project].append(name)
+        elif section in ("GEM", "GIT", "PATH") and indent == 4:
+            # Platform-specific gems carry the platform after the version, e.g. 1.15.4-x86_64-linux.
+            version = version.split("-", 1)[0] if version else None
+            node = (name, version)
+            graph.add(node, name, version)
+            requires.setdefault(node, [])
+        elif section in ("GEM", "GIT", "PATH") and indent == 6 and node is not None:
+            requires[node].append(name)
+    graph.packages.pop(project, None)
+    _link_by_name(graph, requires)
+    return graph
+
+
+# --- Go: go.sum ----------------------------------------------------------
+
+def parse_go_sum(lines: Iterable[str]) -> LockGraph:
+    graph = LockGraph(has_edges=False)
+    for line in lines:
+        parts = line.split()
+        # Lines for a module's go.mod alone belong to modules that are not built.
+        if len(parts) >= 3 and not parts[1].endswith("/go.mod"):
+            graph.add((parts[0], parts[1]), parts[0], parts[1])
+    return graph
+
+
+# --- Dispatch ------------------------------------------------------------
+
+# format -> (language, parser, how the parser consumes the lockfile)
+FORMATS = {
+    "package-lock.json": ("javascript", parse_package_lock, "chunks"),
+    "yarn.lock": ("javascript", parse_yarn_lock, "lines"),
+    "poetry.lock": ("python", parse_poetry_lock, "lines"),
+    "Pipfile.lock": ("python", parse_pipfile_lock, "chunks"),
+    "Cargo.lock": ("rust", parse_cargo_lock, "lines"),
+    "composer.lock": ("php", parse_composer_lock, "chunks"),
+    "Gemfile.lock": ("ruby", parse_gemfile_lock, "lines"),
+    "go.sum": ("go", parse_go_sum, "lines"),
+}
+
+
+def detect_format(filename: str) -> str:
+    """Return the FORMATS key for ``filename``.
+
+    Raises:
+        ValueError: If the file is not a supported lockfile.
+    """
+    name = PurePath(filename).name
+    if name in FORMATS:
+        return name
+    lowered = name.lower()
+    if lowered == "npm-shrinkwrap.json":
+        return "package-lock.json"
+    for known in FORMATS:
+        if lowered == known.lower():
+            return known
+    raise ValueError(f"Unsupported lockfile '{filename}'. Supported: {', '.join(FORMATS)}")
+
+
+def parse_lockfile(filename: str, content: Optional[str] = None, path: Optional[str] = None):
+    """Return ``(language, graph)`` for one lockfile.
+
+    Pass the lockfile either as ``content`` or, for local servers, as a
+    ``path`` on disk; ``filename`` selects the parser.
+    """
+    language, parser, mode = FORMATS[detect_format(filename)]
+    source = _iter_chunks(content, path) if mode == "chunks" else _iter_lines(content, path)
+    return language, parser(source)
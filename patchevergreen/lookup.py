@@ -0,0 +1,409 @@
+"""Cached breaking-change lookups.
+
+``get_issues`` is what the MCP tools call. Library and language names are
+first canonicalized (see ``patchevergreen.names``). It answers from the in-process
+cache when it can, then from the optional on-disk cache shared with other
+processes, and only goes to the PatchEvergreen API when neither has the
+pair. Stale entries are served immediately while a background task
+refreshes them. Concurrent misses for the same pair share one load. When
+the API is failing, the last known good response is served instead,
+marked with ``stale``. Unknown pairs (404) and empty responses, which are
+mostly misspelt names, are remembered for a short time on their own so
+they neither reach the API on every lookup nor crowd the response cache. Every response loaded is also added to the local
+search index (see ``patchevergreen.search``).
+
+Cached responses are kept in the compact form of ``patchevergreen.compact``,
+and are decoded with ``patchevergreen.codec``.
+
+A cache snapshot named by ``PEG_CACHE_SNAPSHOT`` is loaded into the memory
+cache by the first lookup, which waits for it; the file is decoded in a
+worker thread and the entries are stored on the event loop.
+With ``PEG_OFFLINE`` set, lookups are answered from the snapshot alone and
+the API is never called.
+"""
+import asyncio
+import datetime
+import logging
+import time
+from collections.abc import Mapping
+
+import httpx
+
+from patchevergreen import codec, metrics, names, resilience, scheduler, search, settings, snapshot, tracing, upstream
+from patchevergreen.cache import MemoryCache, NegativeCache
+from patchevergreen.compact import compact
+from patchevergreen.disk_cache import DiskCache
+from patchevergreen.payload import issue_list, paginate
+from patchevergreen.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+memory_cache = MemoryCache(
+    ttl=settings.CACHE_TTL,
+    max_stale=settings.CACHE_MAX_STALE,
+    max_entries=settings.CACHE_MAX_ENTRIES,
+    max_bytes=settings.CACHE_MAX_BYTES,
+    stale_if_error=settings.CACHE_STALE_IF_ERROR,
+    on_evict=search.discard,
+)
+
+negative_cache = NegativeCache(settings.NEGATIVE_CACHE_TTL, settings.NEGATIVE_CACHE_MAX_ENTRIES)
+empty_cache = NegativeCache(settings.EMPTY_CACHE_TTL, settings.NEGATIVE_CACHE_MAX_ENTRIES)
+
+disk_cache = None
+if settings.DISK_CACHE_PATH and settings.CACHE_TTL > 0:
+    disk_cache = DiskCache(settings.DISK_CACHE_PATH, ttl=settings.CACHE_TTL, max_stale=settings.CACHE_MAX_STALE,
+                           stale_if_error=settings.CACHE_STALE_IF_ERROR)
+
+_flights = SingleFlight()
+
+# Keys with a background refresh in flight (refreshes are deduplicated here
+# rather than through _flights, because a refresh is often scheduled from
+# inside the very load it would otherwise join), and strong references to
+# the background tasks so they are not garbage collected before they finish.
+_refreshing = set()
+_background_tasks = set()
+_compactor = None
+
+# Payloads served in offline mode, keyed like the cache; None when online
+offline_payloads = None
+# Loading of PEG_CACHE_SNAPSHOT, started by the first ``ready()``
+_snapshot_load = None
+
+
+def cache_key(library: str, language: str) -> tuple:
+    """Return the canonical (library, language) pair used as the cache key and sent upstream."""
+    return names.canonical_pair(library, language)
+
+
+def unknown_message(key: tuple) -> str:
+    """Return the error for a pair the API has no data for, with a hint if the language looks wrong."""
+    message = f"PatchEvergreen has no data for {key[0]} ({key[1]})"
+    if key[1] not in names.LANGUAGES:
+        suggestion = names.suggest_language(key[1])
+        if suggestion:
+            message += f"; '{key[1]}' is not a known language, did you mean '{suggestion}'?"
+        else:
+            message += f"; known languages are {', '.join(names.LANGUAGES)}"
+    return message
+
+
+def _read_snapshot(path: str) -> list:
+    """Read a cache snapshot into ``(key, payload, size, fetched_at)`` entries in compact form.
+
+    Touches no shared state, so it runs in a worker thread.
+    """
+    entries = []
+    for key, payload, fetched_at in snapshot.read(path):
+        entries.append((cache_key(*key), compact(payload), len(codec.dumps(payload)), fetched_at))
+    return entries
+
+
+async def load_snapshot(path: str) -> int:
+    """Load a cache snapshot into the memory cache (or the offline store); return the entry count.
+
+    The file is read and decoded in a worker thread; the entries are then
+    stored on the event loop, which owns the caches.
+    """
+    entries = await asyncio.to_thread(_read_snapshot, path)
+    for key, payload, size, fetched_at in entries:
+        if offline_payloads is not None:
+            offline_payloads[key] = payload
+        else:
+            memory_cache.set(key, payload, size, fetched_at=fetched_at)
+    # Entries evicted again while the snapshot was stored are not indexed.
+    search.submit_all([
+        (key, payload, fetched_at) for key, payload, size, fetched_at in entries
+        if offline_payloads is not None or getattr(memory_cache.peek(key), "value", None) is payload
+    ])
+    logger.info("Loaded %d cached responses from %s", len(entries), path)
+    return len(entries)
+
+
+def _spawn(coro) -> asyncio.Task:
+    task = asyncio.get_running_loop().create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+async def _compact_periodically() -> None:
+    while True:
+        await asyncio.sleep(settings.DISK_CACHE_COMPACT_INTERVAL)
+        try:
+            deleted = await asyncio.to_thread(disk_cache.compact)
+            logger.info("Disk cache compaction removed %d expired entries", deleted)
+        except Exception:
+            logger.warning("Disk cache compaction failed", exc_info=True)
+
+
+def _ensure_compactor() -> None:
+    global _compactor
+    if _compactor is None or _compactor.done():
+        _compactor = _spawn(_compact_periodically())
+
+
+async def _read_disk(key: tuple):
+    _ensure_compactor()
+    try:
+        return await asyncio.to_thread(disk_cache.get, key)
+    except Exception:
+        logger.warning("Disk cache read failed for %s/%s", key[0], key[1], exc_info=True)
+        return None
+
+
+async def _write_disk(key: tuple, body: bytes, fetched_at: float) -> None:
+    try:
+        await asyncio.to_thread(disk_cache.set, key, body, fetched_at)
+    except Exception:
+        logger.warning("Disk cache write failed for %s/%s", key[0], key[1], exc_info=True)
+
+
+def _is_empty(data) -> bool:
+    return empty_cache.ttl > 0 and not issue_list(data)
+
+
+def _remember(key: tuple, data, size: int, fetched_at: float) -> None:
+    """Cache a loaded response: an empty one briefly in ``empty_cache``, any other in the memory cache."""
+    if _is_empty(data):
+        empty_cache.add(key, data)
+        memory_cache.discard(key)
+        return
+    memory_cache.set(key, data, size, fetched_at=fetched_at)
+    search.submit(key, data, fetched_at)
+
+
+async def _fetch(key: tuple) -> dict:
+    body = await upstream.fetch_issues_raw(*key)
+    with tracing.span("json.decode", bytes=len(body)):
+        data = compact(codec.loads(body))
+    fetched_at = time.time()
+    _remember(key, data, len(body), fetched_at)
+    if disk_cache is not None:
+        await _write_disk(key, body, fetched_at)
+    return data
+
+
+def _remember_unknown(key: tuple, exc: BaseException) -> None:
+    """Raise LookupError (recording the pair as unknown) if ``exc`` is the API's 404 or 410 for it."""
+    if isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code in (404, 410):
+        message = unknown_message(key)
+        negative_cache.add(key, message)
+        raise LookupError(message) from exc
+
+
+async def _fetch_uncached(key: tuple) -> dict:
+    try:
+        data = await upstream.fetch_issues(*key)
+    except Exception as exc:
+        _remember_unknown(key, exc)
+        raise
+    if _is_empty(data):
+        empty_cache.add(key, data)
+    else:
+        search.submit(key, data, time.time())
+    return data
+
+
+async def _refresh(key: tuple) -> None:
+    try:
+        # Refreshes of entries that are still being served can wait behind lookups.
+        with scheduler.bulk("background-refresh"):
+            await _fetch(key)
+    except Exception:
+        logger.warning("Background refresh failed for %s/%s", key[0], key[1], exc_info=True)
+    finally:
+        _refreshing.discard(key)
+
+
+def _schedule_refresh(key: tuple) -> None:
+    if key in _refreshing:
+        return
+    _refreshing.add(key)
+    _spawn(_refresh(key))
+
+
+def mark_stale(payload: dict, fetched_at: float, exc: BaseException) -> dict:
+    """Return a copy of ``payload`` flagged as a last known good response served because of ``exc``."""
+    return {
+        **(payload if isinstance(payload, Mapping) else {"issues": payload}),
+        "stale": {
+            "fetched_at": datetime.datetime.fromtimestamp(fetched_at, datetime.timezone.utc).isoformat(),
+            "age_seconds": round(time.time() - fetched_at),
+            "reason": f"{type(exc).__name__}: {exc}",
+        },
+    }
+
+
+async def _last_known_good(key: tuple, exc: BaseException):
+    entry = memory_cache.get_stale(key)
+    if entry is not None:
+        return mark_stale(entry.value, entry.fetched_at, exc)
+    if disk_cache is not None:
+        try:
+            stored = await asyncio.to_thread(disk_cache.get_stale, key)
+        except Exception:
+            logger.warning("Disk cache read failed for %s/%s", key[0], key[1], exc_info=True)
+            stored = None
+        if stored is not None:
+            return mark_stale(codec.loads(stored.body), stored.fetched_at, exc)
+    return None
+
+
+async def _load_or_fall_back(key: tuple) -> dict:
+    try:
+        return await _load(key)
+    except Exception as exc:
+        _remember_unknown(key, exc)
+        if not resilience.is_transient(exc):
+            raise
+        fallback = await _last_known_good(key, exc)
+        if fallback is None:
+            raise
+        metrics.STALE_FALLBACKS.inc()
+        logger.warning("Serving last known good response for %s/%s: %s", key[0], key[1], exc)
+        return fallback
+
+
+async def _load(key: tuple) -> dict:
+    if disk_cache is not None:
+        with tracing.span("disk_cache.read") as span:
+            stored = await _read_disk(key)
+            span.set("hit", stored is not None)
+        if stored is not None:
+            with tracing.span("json.decode", bytes=len(stored.body)):
+                data = compact(codec.loads(stored.body))
+            _remember(key, data, len(stored.body), stored.fetched_at)
+            if not stored.is_fresh():
+                _schedule_refresh(key)
+            return data
+    return await _fetch(key)
+
+
+async def ready() -> None:
+    """Wait until the snapshot named by ``PEG_CACHE_SNAPSHOT``, if any, has been loaded.
+
+    The first call starts loading it (see ``load_snapshot``), so a large
+    snapshot holds up neither the event loop nor server startup.
+    """
+    global _snapshot_load
+    if _snapshot_load is None:
+        if not settings.CACHE_SNAPSHOT or (offline_payloads is None and settings.CACHE_TTL <= 0):
+            return
+        _snapshot_load = asyncio.ensure_future(load_snapshot(settings.CACHE_SNAPSHOT))
+    await _snapshot_load
+
+
+async def get_issues(library: str, language: str) -> dict:
+    """Return the issues for ``library``/``language``, using the caches where possible."""
+    await ready()
+    key = cache_key(library, language)
+    with tracing.span("cache.lookup", library=key[0], language=key[1]) as span:
+        if offline_payloads is not None:
+            span.set("cache.result", "offline")
+            try:
+                return offline_payloads[key]
+            except KeyError:
+                raise LookupError(f"{key[0]} ({key[1]}) is not in the offline cache snapshot") from None
+        unknown = negative_cache.get(key)
+        if unknown is not None:
+            span.set("cache.result", "negative")
+            raise LookupError(unknown)
+        empty = empty_cache.get(key)
+        if empty is not None:
+            span.set("cache.result", "empty")
+            return empty
+        if settings.CACHE_TTL <= 0:
+            span.set("cache.result", "disabled")
+            return await _flights.do(key, lambda: _fetch_uncached(key))
+        entry = memory_cache.get(key)
+        if entry is not None:
+            if not entry.is_fresh():
+                span.set("cache.result", "stale")
+                _schedule_refresh(key)
+            else:
+                span.set("cache.result", "hit")
+            return entry.value
+        span.set("cache.result", "miss")
+        return await _flights.do(key, lambda: _load_or_fall_back(key))
+
+
+async def get_issues_page(library: str, language: str, fields: list = None, cursor: str = None,
+                          page_size: int = None, max_bytes: int = None):
+    """Return the payload for the pair, or one projected page of it if any paging option is set.
+
+    Pages are cut from the cached parsed response, so paging through a
+    library never triggers another upstream fetch while it stays cached.
+    """
+    payload = await get_issues(library, language)
+    if not (fields or cursor or page_size or max_bytes):
+        return payload
+    with tracing.span("paginate"):
+        return paginate(payload, fields, cursor, page_size, max_bytes)
+
+
+async def get_derived(library: str, language: str, name: str, build, payload=None):
+    """Return ``build(payload)`` for the pair, memoized on its cache entry under ``name``.
+
+    The view is rebuilt whenever the cached payload is replaced, and is
+    computed afresh on every call if the payload is not in the memory cache.
+    Pass ``payload`` when the caller has already looked the pair up.
+    """
+    if payload is None:
+        payload = await get_issues(library, language)
+    entry = memory_cache.peek(cache_key(library, language))
+    if entry is None or entry.value is not payload:
+        return build(payload)
+    if name not in entry.derived:
+        entry.derived[name] = build(payload)
+    return entry.derived[name]
+
+
+def cache_stats() -> dict:
+    """Return cache counters for the operator stats endpoint."""
+    stats = memory_cache.stats()
+    stats["refreshes_in_flight"] = len(_refreshing)
+    stats["loads_in_flight"] = len(_flights)
+    stats["loads_started"] = _flights.started
+    stats["loads_coalesced"] = _flights.coalesced
+    stats["negative_entries"] = len(negative_cache)
+    stats["negative_hits"] = negative_cache.hits
+    stats["empty_entries"] = len(empty_cache)
+    stats["empty_hits"] = empty_cache.hits
+    stats["upstream_circuit"] = upstream.breaker.stats()
+    stats["upstream_queue"] = scheduler.scheduler.stats()
+    if offline_payloads is not None:
+        stats["offline_entries"] = len(offline_payloads)
+    if disk_cache is not None:
+        stats["disk"] = disk_cache.stats()
+    if search.index is not None:
+        stats["search_index"] = search.index.stats()
+    return stats
+
+
+def _cache_metrics() -> list:
+    stats = cache_stats()
+    return [
+        {"name": "peg_cache_lookups_total", "type": "counter",
+         "help": "Memory cache lookups by result.",
+         "samples": [("", {"result": "hit"}, stats["hits"]),
+                     ("", {"result": "stale"}, stats["stale_hits"]),
+                     ("", {"result": "miss"}, stats["misses"]),
+                     ("", {"result": "negative"}, stats["negative_hits"]),
+                     ("", {"result": "empty"}, stats["empty_hits"])]},
+        metrics.gauge_family("peg_cache_hit_ratio", "Share of memory cache lookups served from cache.",
+                             stats["hit_ratio"]),
+        metrics.gauge_family("peg_cache_entries", "Entries in the memory cache.", stats["entries"]),
+        metrics.gauge_family("peg_cache_bytes", "Payload bytes held by the memory cache.", stats["bytes"]),
+        metrics.gauge_family("peg_cache_evictions_total", "Memory cache evictions.", stats["evictions"], "counter"),
+        metrics.gauge_family("peg_upstream_loads_coalesced_total",
+                             "Cache misses that joined a load already in flight.", stats["loads_coalesced"],
+                             "counter"),
+    ]
+
+
+metrics.register_collector(_cache_metrics)
+
+# settings has already checked that PEG_OFFLINE comes with a snapshot.
+if settings.OFFLINE:
+    offline_payloads = {}
@@ -0,0 +1,425 @@
+"""Dependency extraction from package-manager manifests.
+
+Each parser walks its manifest once, line by line (or chunk by chunk for
+pom.xml), and yields ``Dependency`` records named the way PatchEvergreen
+names libraries, e.g. Maven artifacts as ``group:artifact``. Multi-megabyte
+manifests are never split into a list of lines or copied wholesale; the
+only structure built is the de-duplicated set of dependencies itself.
+"""
+import json
+import re
+import xml.etree.ElementTree as ET
+from pathlib import PurePath
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+_CHUNK_SIZE = 64 * 1024
+
+
+class Dependency(NamedTuple):
+    """A dependency declared in a manifest."""
+
+    name: str
+    language: str
+    version: Optional[str]
+    constraint: Optional[str]
+
+
+# --- Sources -------------------------------------------------------------
+
+def _iter_lines(content: Optional[str], path: Optional[str]) -> Iterator[str]:
+    if path is not None:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            yield from f
+        return
+    start = 0
+    while start < len(content):
+        end = content.find("\n", start)
+        if end == -1:
+            end = len(content)
+        yield content[start:end]
+        start = end + 1
+
+
+def _iter_chunks(content: Optional[str], path: Optional[str]) -> Iterator[str]:
+    if path is not None:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            while True:
+                chunk = f.read(_CHUNK_SIZE)
+                if not chunk:
+                    return
+                yield chunk
+    for start in range(0, len(content), _CHUNK_SIZE):
+        yield content[start:start + _CHUNK_SIZE]
+
+
+def _load_json(content: Optional[str], path: Optional[str]):
+    if path is not None:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return json.loads(content)
+
+
+def _json_object(value, what: str) -> dict:
+    """Return ``value`` if it is a JSON object (missing counts as empty), else raise ValueError."""
+    if value is None:
+        return {}
+    if not isinstance(value, dict):
+        raise ValueError(f"Expected {what} to be a JSON object, found {type(value).__name__}")
+    return value
+
+
+# --- Helpers -------------------------------------------------------------
+
+_SINGLE_CONSTRAINT = re.compile(r"^\s*(?:===|==|=|\^|~=|~>|~|>=)?\s*v?(\d[0-9A-Za-z.*+\-]*)\s*$")
+
+
+def pinned_version(constraint: Optional[str]) -> Optional[str]:
+    """Return the version a single-comparator constraint pins or starts from.
+
+    ``==2.31.0``, ``^4.17.21``, ``~> 7.0`` and a bare ``1.0`` all yield their
+    version; ranges, wildcard tags and non-registry sources yield None.
+    """
+    if not constraint:
+        return None
+    match = _SINGLE_CONSTRAINT.match(constraint)
+    return match.group(1) if match else None
+
+
+def _dependency(name: str, language: str, constraint: Optional[str]) -> Dependency:
+    constraint = constraint.strip() if constraint else None
+    return Dependency(name, language, pinned_version(constraint), constraint or None)
+
+
+def _strip_toml_comment(line: str) -> str:
+    quote = None
+    for i, char in enumerate(line):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "\"'":
+            quote = char
+        elif char == "#":
+            return line[:i]
+    return line
+
+
+def _unquote(value: str) -> str:
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    return value
+
+
+_TOML_INLINE_PAIR = re.compile(r"""([A-Za-z0-9_.\-]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|(true|false))""")
+
+
+def _toml_inline_table(value: str) -> dict:
+    """Return the string/bool pairs of a one-line TOML inline table."""
+    return {key: s1 if s1 is not None else s2 if s2 is not None else b
+            for key, s1, s2, b in _TOML_INLINE_PAIR.findall(value)}
+
+
+# --- Python: requirements.txt -------------------------------------------
+
+_REQUIREMENT = re.compile(r"^([A-Za-z0-9][A-Za-z0-9._\-]*)\s*(?:\[[^\]]*\])?\s*(.*)$")
+
+
+def parse_requirements(lines: Iterable[str]) -> Iterator[Dependency]:
+    pending = ""
+    for raw in lines:
+        line = raw.rstrip("\r\n")
+        if line.endswith("\\"):
+            pending += line[:-1] + " "
+            continue
+        line, pending = (pending + line).strip(), ""
+        if " #" in line:
+            line = line[:line.index(" #")].strip()
+        if not line or line.startswith(("#", "-")) or "://" in line.split("@")[0]:
+            continue
+        match = _REQUIREMENT.match(line)
+        if match is None:
+            continue
+        name, rest = match.groups()
+        rest = rest.split(";", 1)[0].split(" --", 1)[0].strip()
+        yield _dependency(name, "python", None if rest.startswith("@") else rest)
+
+
+# --- JavaScript / PHP: package.json, composer.json -----------------------
+
+_NPM_SECTIONS = ("dependencies", "devDependencies", "peerDependencies", "optionalDependencies")
+_COMPOSER_SECTIONS = ("require", "require-dev")
+_COMPOSER_PLATFORM = re.compile(r"^(php|php-64bit|hhvm|composer|composer-plugin-api|composer-runtime-api|ext-.+|lib-.+)$")
+
+
+def parse_package_json(data: dict) -> Iterator[Dependency]:
+    if not isinstance(data, dict):
+        raise ValueError(f"Expected package.json to be a JSON object, found {type(data).__name__}")
+    for section in _NPM_SECTIONS:
+        for name, spec in _json_object(data.get(section), f"'{section}'").items():
+            yield _dependency(name, "javascript", spec if isinstance(spec, str) else None)
+
+
+def parse_composer_json(data: dict) -> Iterator[Dependency]:
+    if not isinstance(data, dict):
+        raise ValueError(f"Expected composer.json to be a JSON object, found {type(data).__name__}")
+    for section in _COMPOSER_SECTIONS:
+        for name, spec in _json_object(data.get(section), f"'{section}'").items():
+            name = name.lower()
+            if _COMPOSER_PLATFORM.match(name) or "/" not in name:
+                continue
+            yield _dependency(name, "php", spec if isinstance(spec, str) else None)
+
+
+# --- Ruby: Gemfile -------------------------------------------------------
+
+_GEM = re.compile(r"""^\s*gem\s*\(?\s*["']([^"']+)["']((?:\s*,\s*["'][^"']*["'])*)""")
+_QUOTED = re.compile(r"""["']([^"']*)["']""")
+
+
+def parse_gemfile(lines: Iterable[str]) -> Iterator[Dependency]:
+    for line in lines:
+        match = _GEM.match(line)
+        if match is None:
+            continue
+        yield _dependency(match.group(1), "ruby", ", ".join(_QUOTED.findall(match.group(2))))
+
+
+# --- Rust: Cargo.toml ----------------------------------------------------
+
+_CARGO_SECTION = re.compile(
+    r"^(?:target\..+\.)?(?:workspace\.)?(?:dependencies|dev-dependencies|build-dependencies)(?:\.(.+))?$"
+)
+_TOML_ENTRY = re.compile(r"""^("[^"]+"|'[^']+'|[A-Za-z0-9_.\-]+)\s*=\s*(.+)$""")
+
+
+def parse_cargo_toml(lines: Iterable[str]) -> Iterator[Dependency]:
+    in_section = False
+    table = None  # [dependencies.<name>] sub-table being collected
+
+    def flush_table():
+        if table is not None:
+            return _dependency(table.get("package") or table["name"], "rust", table.get("version"))
+
+    for raw in lines:
+        line = _strip_toml_comment(raw).strip()
+        if not line:
+            continue
+        if line.startswith("["):
+            pending = flush_table()
+            if pending:
+                yield pending
+            match = _CARGO_SECTION.match(line.strip("[] "))
+            in_section = match is not None and match.group(1) is None
+            table = {"name": _unquote(match.group(1))} if match and match.group(1) else None
+            continue
+        entry = _TOML_ENTRY.match(line)
+        if entry is None:
+            continue
+        key, value = _unquote(entry.group(1)), entry.group(2).strip()
+        if table is not None:
+            if key in ("version", "package") and value[:1] in "\"'":
+                table[key] = _unquote(value)
+        elif in_section:
+            name = key.split(".", 1)[0]
+            if value[:1] in "\"'":
+                yield _dependency(name, "rust", _unquote(value))
+            elif value.startswith("{"):
+                fields = _toml_inline_table(value)
+                yield _dependency(fields.get("package") or name, "rust", fields.get("version"))
+            else:
+                yield _dependency(name, "rust", None)
+    pending = flush_table()
+    if pending:
+        yield pending
+
+
+# --- Java: pom.xml -------------------------------------------------------
+
+_MAVEN_PROPERTY = re.compile(r"\$\{([^}]+)\}")
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def parse_pom_xml(chunks: Iterable[str]) -> Iterator[Dependency]:
+    parser = ET.XMLPullParser(events=("start", "end"))
+    properties = {}
+    stack = []
+    dependency = None
+    dependency_depth = properties_depth = None
+
+    def resolve(value):
+        if value is None:
+            return None
+        return _MAVEN_PROPERTY.sub(lambda m: properties.get(m.group(1), m.group(0)), value)
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        for event, element in parser.read_events():
+            tag = _local_name(element.tag)
+            if event == "start":
+                stack.append(element)
+                if tag == "dependency":
+                    dependency, dependency_depth = {}, len(stack)
+                elif tag == "properties" and len(stack) == 2:
+                    properties_depth = len(stack)
+                continue
+            depth = len(stack)
+            text = (element.text or "").strip()
+            if dependency is not None and depth == dependency_depth + 1:
+                dependency[tag] = text
+            elif properties_depth is not None and depth == properties_depth + 1:
+                properties[tag] = text
+            elif depth == 2 and tag in ("groupId", "artifactId", "version"):
+                properties[f"project.{tag}"] = text
+            elif tag == "properties" and depth == properties_depth:
+                properties_depth = None
+            if tag == "dependency" and depth == dependency_depth:
+                if dependency.get("groupId") and dependency.get("artifactId"):
+                    name = f"{resolve(dependency['groupId'])}:{resolve(dependency['artifactId'])}"
+                    constraint = resolve(dependency.get("version"))
+                    if constraint and "${" in constraint:
+                        yield Dependency(name, "java", None, constraint)
+                    else:
+                        yield _dependency(name, "java", constraint)
+                dependency = dependency_depth = None
+            # Drop finished elements so the tree never holds the whole document.
+            stack.pop()
+            if stack:
+                stack[-1].remove(element)
+    parser.close()
+
+
+# --- Java: libs.versions.toml --------------------------------------------
+
+def parse_version_catalog(lines: Iterable[str]) -> Iterator[Dependency]:
+    section = None
+    versions = {}
+    libraries = []
+    for raw in lines:
+        line = _strip_toml_comment(raw).strip()
+        if not line:
+            continue
+        if line.startswith("["):
+            section = line.strip("[] ")
+            continue
+        entry = _TOML_ENTRY.match(line)
+        if entry is None:
+            continue
+        key, value = _unquote(entry.group(1)), entry.group(2).strip()
+        if section == "versions":
+            if value.startswith("{"):
+                fields = _toml_inline_table(value)
+                value = fields.get("strictly") or fields.get("require") or fields.get("prefer") or ""
+            versions[key] = _unquote(value)
+        elif section == "libraries":
+            if value[:1] in "\"'":
+                parts = _unquote(value).split(":")
+                if len(parts) >= 2:
+                    libraries.append((f"{parts[0]}:{parts[1]}", parts[2] if len(parts) > 2 else None, None))
+                continue
+            fields = _toml_inline_table(value)
+            module = fields.get("module")
+            if module is None and fields.get("group") and fields.get("name"):
+                module = f"{fields['group']}:{fields['name']}"
+            if module:
+                ref = fields.get("version.ref") or fields.get("ref")
+                version = fields.get("version") or fields.get("strictly") or fields.get("require")
+                libraries.append((module, version, ref))
+    # Version references may point forward, so resolve them once the file is read.
+    for module, version, ref in libraries:
+        yield _dependency(module, "java", versions.get(ref) if ref else version)
+
+
+# --- Java/Kotlin: build.gradle(.kts) -------------------------------------
+
+_GRADLE_DEPENDENCY = re.compile(
+    r"""\b(?:\w*[Ii]mplementation|api|\w*CompileOnly|compileOnly|\w*RuntimeOnly|runtimeOnly|kapt|ksp|"""
+    r"""annotationProcessor|classpath)\s*\(?\s*(?:(?:enforcedPlatform|platform)\s*\(\s*)?"""
+    r"""["']([^"':$\s]+):([^"':$\s]+)(?::([^"'@\s]+))?(?:@\w+)?["']"""
+)
+
+
+def parse_gradle(lines: Iterable[str]) -> Iterator[Dependency]:
+    for line in lines:
+        for group, artifact, version in _GRADLE_DEPENDENCY.findall(line):
+            yield _dependency(f"{group}:{artifact}", "java", version or None)
+
+
+# --- Go: go.mod ----------------------------------------------------------
+
+def parse_go_mod(lines: Iterable[str]) -> Iterator[Dependency]:
+    in_block = False
+    for raw in lines:
+        line = raw.split("//", 1)[0].strip()
+        if in_block:
+            if line == ")":
+                in_block = False
+                continue
+        elif line.startswith("require"):
+            line = line[len("require"):].strip()
+            if line == "(":
+                in_block = True
+                continue
+        else:
+            continue
+        parts = line.split()
+        if len(parts) >= 2:
+            yield _dependency(parts[0], "go", parts[1])
+
+
+# --- Dispatch ------------------------------------------------------------
+
+# format -> (language, parser, how the parser consumes the manifest)
+FORMATS = {
+    "requirements.txt": ("python", parse_requirements, "lines"),
+    "package.json": ("javascript", parse_package_json, "json"),
+    "composer.json": ("php", parse_composer_json, "json"),
+    "Gemfile": ("ruby", parse_gemfile, "lines"),
+    "Cargo.toml": ("rust", parse_cargo_toml, "lines"),
+    "pom.xml": ("java", parse_pom_xml, "chunks"),
+    "libs.versions.toml": ("java", parse_version_catalog, "lines"),
+    "build.gradle.kts": ("java", parse_gradle, "lines"),
+    "go.mod": ("go", parse_go_mod, "lines"),
+}
+
+
+def detect_format(filename: str) -> str:
+    """Return the FORMATS key for ``filename``.
+
+    Raises:
+        ValueError: If the file is not a supported manifest.
+    """
+    name = PurePath(filename).name
+    if name in FORMATS:
+        return name
+    lowered = name.lower()
+    if lowered.startswith("requirements") and lowered.endswith(".txt"):
+        return "requirements.txt"
+    if lowered.endswith(".versions.toml"):
+        return "libs.versions.toml"
+    if lowered in ("build.gradle", "build.gradle.kts"):
+        return "build.gradle.kts"
+    if lowered in ("gemfile", "cargo.toml"):
+        return "Gemfile" if lowered == "gemfile" else "Cargo.toml"
+    raise ValueError(f"Unsupported manifest '{filename}'. Supported: {', '.join(FORMATS)}")
+
+
+def parse_manifest(filename: str, content: Optional[str] = None, path: Optional[str] = None) -> list:
+    """Return the de-duplicated dependencies declared in one manifest.
+
+    Pass the manifest either as ``content`` or, for local servers, as a
+    ``path`` on disk; ``filename`` selects the parser.
+    """
+    language, parser, mode = FORMATS[detect_format(filename)]
+    if mode == "lines":
+        source = _iter_lines(content, path)
+    elif mode == "chunks":
+        source = _iter_chunks(content, path)
+    else:
+        source = _load_json(content, path)
+    seen = {}
+    for dependency in parser(source):
+        seen.setdefault(dependency.name, dependency)
+    return list(seen.values())
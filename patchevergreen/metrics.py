@@ -0,0 +1,349 @@
+"""Prometheus-style metrics for the hosted servers.
+
+A small in-process registry of counters, gauges and histograms rendered in
+the Prometheus text exposition format, so the servers need no extra
+dependency to be scraped. ``timed`` instruments tool and prompt functions,
+``HTTPMetricsMiddleware`` instruments the ASGI app, and modules with their
+own counters (such as the response cache) contribute through
+``register_collector``.
+
+With several worker processes, the worker that answers a scrape also pulls
+the samples of the other workers on its host and labels every sample with
+``worker``, so one scrape of the shared port covers the whole container.
+"""
+import asyncio
+import functools
+import inspect
+import json
+import logging
+import threading
+import time
+
+from patchevergreen import settings, tracing, workers
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_metrics = []
+_collectors = []
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def family(self) -> dict:
+        """Return this metric as a family of ``(suffix, labels, value)`` samples."""
+        with self._lock:
+            items = list(self._values.items())
+        samples = []
+        for key, value in items:
+            samples.extend(self._samples(dict(zip(self.labelnames, key)), value))
+        return {"name": self.name, "type": self.type, "help": self.documentation, "samples": samples}
+
+    def _samples(self, labels: dict, value):
+        return [("", labels, value)]
+
+
+class Counter(_Metric):
+    """A value that only goes up."""
+
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """A value that can go up and down."""
+
+    type = "gauge"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, with their count and sum."""
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += 1
+            state[2] += value
+
+    def _samples(self, labels: dict, value):
+        counts, count, total = value
+        samples = []
+        cumulative = 0
+        for bound, bucket in zip(self.buckets, counts):
+            cumulative += bucket
+            samples.append(("_bucket", {**labels, "le": repr(float(bound))}, cumulative))
+        samples.append(("_bucket", {**labels, "le": "+Inf"}, count))
+        samples.append(("_count", labels, count))
+        samples.append(("_sum", labels, total))
+        return samples
+
+
+def register_collector(collector) -> None:
+    """Add a callable returning extra families (see ``_Metric.family``) at scrape time."""
+    _collectors.append(collector)
+
+
+def gauge_family(name: str, documentation: str, value, kind: str = "gauge") -> dict:
+    """Return a single unlabelled sample as a family, for collectors."""
+    return {"name": name, "type": kind, "help": documentation, "samples": [("", {}, value)]}
+
+
+TOOL_CALLS = Counter("peg_tool_calls_total", "MCP tool calls by tool and outcome.", ("tool", "status"))
+TOOL_DURATION = Histogram("peg_tool_call_duration_seconds", "MCP tool call latency.", ("tool",))
+PROMPT_CALLS = Counter("peg_prompt_calls_total", "MCP prompt renders by prompt and outcome.", ("prompt", "status"))
+PROMPT_DURATION = Histogram("peg_prompt_duration_seconds", "MCP prompt render latency.", ("prompt",))
+UPSTREAM_REQUESTS = Counter("peg_upstream_requests_total",
+                            "PatchEvergreen API requests by HTTP status (or error type).", ("status",))
+UPSTREAM_RETRIES = Counter("peg_upstream_retries_total", "PatchEvergreen API requests retried after a transient failure.")
+UPSTREAM_QUEUE_WAIT = Histogram("peg_upstream_queue_wait_seconds",
+                                "Time lookups waited for an upstream request slot, by priority.", ("priority",),
+                                buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0))
+STALE_FALLBACKS = Counter("peg_stale_fallbacks_total",
+                          "Lookups answered with a last known good response because the API was failing.")
+UPSTREAM_DURATION = Histogram("peg_upstream_request_duration_seconds", "PatchEvergreen API request latency.")
+HTTP_REQUESTS = Counter("peg_http_requests_total", "HTTP requests by route, method and status.",
+                        ("route", "method", "status"))
+HTTP_DURATION = Histogram("peg_http_request_duration_seconds",
+                          "HTTP request latency (SSE streams excluded).", ("route",))
+HTTP_IN_FLIGHT = Gauge("peg_http_requests_in_flight", "HTTP requests being served (SSE streams excluded).")
+SSE_SESSIONS = Gauge("peg_sse_sessions_active", "Open MCP SSE streams.")
+
+
+EVENT_LOOP_LAG = Histogram("peg_event_loop_lag_seconds",
+                           "How late the event loop ran a callback scheduled every second.",
+                           buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+# Most recent lag measurement, attached to tool spans
+last_event_loop_lag = 0.0
+_lag_monitors = set()
+
+
+async def _monitor_event_loop(interval: float = 1.0) -> None:
+    global last_event_loop_lag
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        last_event_loop_lag = max(0.0, loop.time() - expected)
+        EVENT_LOOP_LAG.observe(last_event_loop_lag)
+
+
+def ensure_event_loop_monitor() -> None:
+    """Start measuring event loop lag on the running loop, once per loop."""
+    loop = asyncio.get_running_loop()
+    if not any(task.get_loop() is loop and not task.done() for task in _lag_monitors):
+        task = loop.create_task(_monitor_event_loop())
+        _lag_monitors.add(task)
+        task.add_done_callback(_lag_monitors.discard)
+
+
+def timed(kind: str):
+    """Decorate a tool (``kind="tool"``) or prompt (``kind="prompt"``) function.
+
+    Each call is counted, timed and recorded as a tracing span.
+    """
+    calls, duration = (TOOL_CALLS, TOOL_DURATION) if kind == "tool" else (PROMPT_CALLS, PROMPT_DURATION)
+
+    def decorator(fn):
+        name = fn.__name__
+
+        def record(started: float, status: str) -> None:
+            calls.inc(**{kind: name, "status": status})
+            duration.observe(time.perf_counter() - started, **{kind: name})
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                with tracing.span(f"{kind} {name}") as span:
+                    span.set("event_loop.lag_ms", round(last_event_loop_lag * 1000, 3))
+                    try:
+                        result = await fn(*args, **kwargs)
+                    except BaseException:
+                        record(started, "error")
+                        raise
+                record(started, "ok")
+                return result
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                with tracing.span(f"{kind} {name}"):
+                    try:
+                        result = fn(*args, **kwargs)
+                    except BaseException:
+                        record(started, "error")
+                        raise
+                record(started, "ok")
+                return result
+        return wrapper
+
+    return decorator
+
+
+def route_label(path: str) -> str:
+    """Collapse ``path`` to a bounded route label."""
+    if path.startswith("/messages"):
+        return "/messages"
+    if path.rstrip("/") == settings.STREAMABLE_HTTP_PATH.rstrip("/"):
+        return settings.STREAMABLE_HTTP_PATH
+    if path in _ROUTES:
+        return path
+    return "other"
+
+
+_ROUTES = {
+    "/sse", "/metrics", "/cache/stats",
+    "/.well-known/skill", "/api/skill", "/skill",
+    "/.well-known/skill/metadata", "/api/skill/metadata",
+    "/.well-known/skills", "/api/skills",
+}
+
+
+class HTTPMetricsMiddleware:
+    """ASGI middleware counting requests, latency, in-flight requests and SSE sessions."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route = route_label(scope["path"])
+        stream = route == "/sse"
+        status = "500"
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        ensure_event_loop_monitor()
+        gauge = SSE_SESSIONS if stream else HTTP_IN_FLIGHT
+        gauge.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            gauge.dec()
+            HTTP_REQUESTS.inc(route=route, method=scope["method"], status=status)
+            if not stream:
+                HTTP_DURATION.observe(time.perf_counter() - started, route=route)
+
+
+def collect() -> list:
+    """Return every family in this process."""
+    families = [metric.family() for metric in _metrics]
+    for collector in _collectors:
+        try:
+            families.extend(collector())
+        except Exception:
+            logger.warning("Metrics collector %r failed", collector, exc_info=True)
+    return families
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return repr(value)
+    return str(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render(families: list) -> str:
+    """Render families in the Prometheus text exposition format."""
+    lines = []
+    for family in families:
+        lines.append(f"# HELP {family['name']} {family['help']}")
+        lines.append(f"# TYPE {family['name']} {family['type']}")
+        for suffix, labels, value in family["samples"]:
+            label_text = ",".join(f'{key}="{_escape(str(val))}"' for key, val in labels.items())
+            name = family["name"] + suffix
+            lines.append(f"{name}{{{label_text}}} {_format_value(value)}" if label_text
+                         else f"{name} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def _merge(per_worker: dict) -> list:
+    merged = {}
+    for worker_id, families in per_worker.items():
+        for family in families:
+            target = merged.setdefault(family["name"], {**family, "samples": []})
+            target["samples"].extend((suffix, {**labels, "worker": worker_id}, value)
+                                     for suffix, labels, value in family["samples"])
+    return list(merged.values())
+
+
+async def exposition(local: bool = False) -> str:
+    """Return the metrics page; with worker routing on, include this host's other workers."""
+    if local or not workers.routing_enabled():
+        return render(collect())
+    per_worker = {workers.WORKER_ID: collect()}
+    peers = workers.local_peers()
+    if peers:
+        import httpx
+
+        async with httpx.AsyncClient(timeout=5.0) as client:
+            responses = await asyncio.gather(
+                *(client.get(f"{address}/metrics", params={"format": "json"}) for address in peers.values()),
+                return_exceptions=True,
+            )
+        for worker_id, response in zip(peers, responses):
+            if isinstance(response, Exception) or response.status_code != 200:
+                logger.warning("Could not collect metrics from worker %s", worker_id)
+                continue
+            per_worker[worker_id] = response.json()
+    return render(_merge(per_worker))
+
+
+def snapshot_json() -> str:
+    """Return this process's families as JSON, for collection by another worker."""
+    return json.dumps(collect())
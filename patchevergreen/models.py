@@ -0,0 +1,20 @@
+"""Request models used in tool signatures.
+
+Kept apart from the modules that use them so that registering the tools
+does not import the lookup stack.
+"""
+from pydantic import BaseModel, Field
+
+
+class LibraryRef(BaseModel):
+    """A (library, language) pair to look up."""
+
+    library: str = Field(description="Library name as it appears in the package manager, e.g. 'requests'")
+    language: str = Field(description="Programming language of the library, e.g. 'python'")
+
+
+class Manifest(BaseModel):
+    """A manifest file passed by content."""
+
+    filename: str = Field(description="File name, e.g. 'requirements.txt', 'package.json', 'pom.xml'")
+    content: str = Field(description="Full text of the manifest")
@@ -0,0 +1,90 @@
+"""Canonical library and language names.
+
+The same library is often asked for under several spellings (``Django``,
+``django``; ``node`` for ``javascript``). Each is mapped to one canonical
+(library, language) pair before the cache is consulted or the API is
+called, following the name rules of each package ecosystem:
+
+- Python: PEP 503 normalization (lowercase, runs of ``-``, ``_`` and ``.``
+  become ``-``), extras dropped.
+- JavaScript: npm names, including ``@scope/name``, are lowercase.
+- PHP: Composer ``vendor/package`` names are lowercase.
+- Java: Maven ``group:artifact``, any ``:version`` suffix dropped.
+- Go: module paths without scheme, ``.git`` or trailing slash, host lowercased.
+- Rust: crates.io names are case-insensitive, so lowercase.
+- Ruby: RubyGems names are case-sensitive and kept as given.
+"""
+import difflib
+import re
+
+LANGUAGES = ("python", "javascript", "java", "php", "ruby", "go", "rust")
+
+LANGUAGE_ALIASES = {
+    "py": "python", "python2": "python", "python3": "python", "pypi": "python", "pip": "python",
+    "js": "javascript", "node": "javascript", "nodejs": "javascript", "node.js": "javascript",
+    "npm": "javascript", "yarn": "javascript", "pnpm": "javascript",
+    "typescript": "javascript", "ts": "javascript", "jsx": "javascript", "tsx": "javascript",
+    "maven": "java", "gradle": "java", "jvm": "java", "kotlin": "java", "kt": "java", "scala": "java",
+    "composer": "php", "packagist": "php",
+    "rb": "ruby", "gem": "ruby", "gems": "ruby", "rubygems": "ruby",
+    "golang": "go", "gomod": "go",
+    "rs": "rust", "cargo": "rust", "crates": "rust", "crates.io": "rust",
+}
+
+_PEP503 = re.compile(r"[-_.]+")
+_EXTRAS = re.compile(r"\[.*\]$")
+
+
+def canonical_language(language: str) -> str:
+    """Return the canonical language name for ``language`` or one of its aliases."""
+    language = language.strip().lower()
+    return LANGUAGE_ALIASES.get(language, language)
+
+
+def suggest_language(language: str):
+    """Return the supported language closest to an unknown ``language``, or None."""
+    matches = difflib.get_close_matches(language, list(LANGUAGES) + list(LANGUAGE_ALIASES), n=1, cutoff=0.6)
+    return canonical_language(matches[0]) if matches else None
+
+
+def _python(name: str) -> str:
+    return _PEP503.sub("-", _EXTRAS.sub("", name)).lower()
+
+
+def _maven(name: str) -> str:
+    parts = [part.strip() for part in name.split(":")]
+    return ":".join(parts[:2])
+
+
+def _go(name: str) -> str:
+    for prefix in ("https://", "http://"):
+        if name.lower().startswith(prefix):
+            name = name[len(prefix):]
+    name = name.rstrip("/")
+    if name.endswith(".git"):
+        name = name[:-4]
+    host, slash, path = name.partition("/")
+    return host.lower() + slash + path
+
+
+_CANONICAL = {
+    "python": _python,
+    "javascript": str.lower,
+    "php": str.lower,
+    "java": _maven,
+    "go": _go,
+    "rust": str.lower,
+}
+
+
+def canonical_library(library: str, language: str) -> str:
+    """Return ``library`` as named by the package ecosystem of the (canonical) ``language``."""
+    library = library.strip()
+    canonicalize = _CANONICAL.get(language)
+    return canonicalize(library) if canonicalize else library
+
+
+def canonical_pair(library: str, language: str) -> tuple:
+    """Return the canonical ``(library, language)`` pair."""
+    language = canonical_language(language)
+    return canonical_library(library, language), language
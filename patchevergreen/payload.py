@@ -0,0 +1,114 @@
+"""Helpers for reading PatchEvergreen API payloads.
+
+The API returns either a list of issues or an object whose ``issues`` key
+holds that list, alongside library-level metadata. Cached payloads are in
+the compact form of ``patchevergreen.compact`` (read-only mappings and
+tuples), so these helpers accept any mapping and sequence.
+"""
+import base64
+import json
+from collections.abc import Mapping
+
+from patchevergreen import codec, settings
+
+
+def issue_list(payload):
+    """Return the list (or tuple) of issues inside ``payload`` (empty if there is none)."""
+    if isinstance(payload, (list, tuple)):
+        return payload
+    if isinstance(payload, Mapping) and isinstance(payload.get("issues"), (list, tuple)):
+        return payload["issues"]
+    return []
+
+
+# Issue fields that may hold the version a breaking change arrived in, in the
+# order they are checked.
+VERSION_FIELDS = (
+    "version",
+    "introduced_in",
+    "introducedIn",
+    "breaking_version",
+    "to_version",
+    "toVersion",
+    "version_to",
+    "new_version",
+    "release",
+)
+
+
+def issue_version(issue) -> str:
+    """Return the version ``issue`` was introduced in, or None if it has none."""
+    if not isinstance(issue, Mapping):
+        return None
+    for field in VERSION_FIELDS:
+        value = issue.get(field)
+        if isinstance(value, (str, int, float)) and str(value).strip():
+            return str(value).strip()
+    return None
+
+
+# Issue fields holding its title and its description, in the order they are checked
+TITLE_FIELDS = ("title", "summary", "name")
+DESCRIPTION_FIELDS = ("description", "details", "body", "message")
+
+
+def issue_text(issue, fields: tuple) -> str:
+    """Return the first non-blank of ``fields`` in ``issue`` with whitespace collapsed, or None."""
+    if not isinstance(issue, Mapping):
+        return None
+    for field in fields:
+        value = issue.get(field)
+        if isinstance(value, str) and value.strip():
+            return " ".join(value.split())
+    return None
+
+
+def _encode_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"o": offset}).encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        offset = json.loads(base64.urlsafe_b64decode(padded))["o"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor; pass the next_cursor value from a previous page") from None
+    if not isinstance(offset, int) or offset < 0:
+        raise ValueError("Invalid cursor; pass the next_cursor value from a previous page")
+    return offset
+
+
+def paginate(payload, fields: list = None, cursor: str = None, page_size: int = None, max_bytes: int = None) -> dict:
+    """Return one page of ``payload``'s issues, optionally projected to ``fields``.
+
+    A page holds at most ``page_size`` issues (``PEG_PAGE_SIZE`` by default)
+    and stops before its issues' encoded size would exceed ``max_bytes``;
+    a single issue larger than ``max_bytes`` is still returned on a page of
+    its own so paging always makes progress. Library-level metadata is
+    repeated on every page.
+
+    Raises:
+        ValueError: If ``cursor`` was not produced by a previous page.
+    """
+    issues = issue_list(payload)
+    offset = _decode_cursor(cursor) if cursor else 0
+    limit = page_size if page_size and page_size > 0 else settings.PAGE_SIZE
+    page = []
+    used = 0
+    for issue in issues[offset:offset + limit]:
+        if fields and isinstance(issue, Mapping):
+            issue = {field: issue[field] for field in fields if field in issue}
+        if max_bytes:
+            size = len(codec.dumps(issue))
+            if page and used + size > max_bytes:
+                break
+            used += size
+        page.append(issue)
+    end = offset + len(page)
+    result = {key: value for key, value in payload.items() if key != "issues"} if isinstance(payload, Mapping) else {}
+    result.update({
+        "issues": page,
+        "total_issues": len(issues),
+        "next_cursor": _encode_cursor(end) if end < len(issues) else None,
+    })
+    return result
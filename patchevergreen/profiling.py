@@ -0,0 +1,62 @@
+"""On-demand cProfile sessions for a running server.
+
+``profile_for`` profiles the calling thread, which for the hosted servers is
+the event loop thread that runs every request and tool call, for a number
+of seconds. The raw stats are written to ``PEG_PROFILE_DIR`` (open them with
+``python -m pstats`` or snakeviz) and a text summary is returned.
+"""
+import asyncio
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import time
+
+from patchevergreen import settings, workers
+
+_running = False
+
+
+class ProfilerBusy(RuntimeError):
+    """Raised when a profile is requested while another one is running."""
+
+
+async def profile_for(seconds: float) -> dict:
+    """Profile this process for ``seconds`` (capped at ``PEG_PROFILE_MAX_SECONDS``).
+
+    Returns:
+        dict: ``file`` (the .pstats path), ``seconds`` and ``summary`` (the
+        top functions by cumulative time).
+
+    Raises:
+        ProfilerBusy: If a profile is already running in this process.
+    """
+    global _running
+    if _running:
+        raise ProfilerBusy("A profile is already running in this worker")
+    seconds = max(0.1, min(seconds, settings.PROFILE_MAX_SECONDS))
+    _running = True
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.disable()
+        _running = False
+
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    path = os.path.join(settings.PROFILE_DIR,
+                        f"profile-{time.strftime('%Y%m%d-%H%M%S')}-{workers.WORKER_ID}.pstats")
+    await asyncio.to_thread(profiler.dump_stats, path)
+    summary = io.StringIO()
+    pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(settings.PROFILE_TOP)
+    return {"file": path, "seconds": seconds, "summary": summary.getvalue()}
+
+
+def admin_authorized(authorization: str) -> bool:
+    """Return True if ``authorization`` is ``Bearer <PEG_ADMIN_TOKEN>`` and a token is configured."""
+    if not settings.ADMIN_TOKEN:
+        return False
+    scheme, _, token = (authorization or "").partition(" ")
+    return scheme.lower() == "bearer" and hmac.compare_digest(token.strip(), settings.ADMIN_TOKEN)
@@ -0,0 +1,55 @@
+"""MCP progress notifications for multi-library tools.
+
+Each lookup that finishes is announced straight away as a progress
+notification whose message is the completed item as JSON, so clients can
+show (and models can use) partial results long before the whole audit is
+done. Large payloads are summarised in the notification; the full data is
+always in the final tool result.
+"""
+import logging
+
+from patchevergreen import codec, settings
+from patchevergreen.payload import issue_list
+
+logger = logging.getLogger(__name__)
+
+
+def _message(item: dict) -> str:
+    message = codec.dumps_text(item)
+    if len(message) <= settings.PROGRESS_MESSAGE_MAX_BYTES or "result" not in item:
+        return message
+    summary = dict(item)
+    summary["result"] = {"issues": len(issue_list(item["result"])), "truncated": True}
+    return codec.dumps_text(summary)
+
+
+def reporter(ctx, total: int):
+    """Return an ``on_result`` callback that reports progress through ``ctx``.
+
+    Returns None when there is no MCP context (e.g. direct Python calls) or
+    the client did not ask for progress.
+    """
+    if ctx is None:
+        return None
+
+    meta = ctx.request_context.meta
+    progress_token = meta.progressToken if meta else None
+    if progress_token is None:
+        return None
+
+    async def report(done: int, item: dict) -> None:
+        try:
+            # Tie each notification to the tool call, so streamable HTTP sends it
+            # on that call's response stream; stateless sessions have no other.
+            await ctx.request_context.session.send_progress_notification(
+                progress_token=progress_token,
+                progress=done,
+                total=total,
+                message=_message(item),
+                related_request_id=ctx.request_id,
+            )
+        except Exception:
+            # The client may have gone away; the lookup results still stand.
+            logger.debug("Could not send progress notification", exc_info=True)
+
+    return report
@@ -0,0 +1,147 @@
+"""Breaking-change digests embedded in rendered prompts.
+
+With ``include_data`` (default ``PEG_PROMPT_INCLUDE_DATA``), the analysis
+prompts fetch their libraries' issues on the server while they render and
+embed a digest of them, so the model can start the analysis straight
+away instead of spending a turn on a tool call. A digest has one line per
+issue, limited to the versions the prompt is about. The libraries of one
+prompt are fetched concurrently, and their digests share a
+``PEG_PROMPT_DATA_MAX_BYTES`` budget; issues that do not fit are counted,
+so the model knows to fetch them with a tool.
+"""
+import asyncio
+import contextlib
+from collections.abc import Mapping
+from typing import NamedTuple, Optional
+
+from patchevergreen import codec, lookup, scheduler, settings
+from patchevergreen.payload import DESCRIPTION_FIELDS, TITLE_FIELDS, issue_text, issue_version
+from patchevergreen.versions import VersionIndex, version_index
+
+# Longest description kept on an issue's line
+_DESCRIPTION_CHARS = 240
+
+LINE_FORMAT = "[version] (severity) title: description"
+
+
+class DigestRequest(NamedTuple):
+    """A library to digest, optionally limited to the issues after ``current_version`` (up to ``target_version``)."""
+
+    library: str
+    language: str
+    current_version: Optional[str] = None
+    target_version: Optional[str] = None
+
+
+def parse_dependencies(text: str) -> list:
+    """Return ``(name, version)`` pairs from a comma- or newline-separated list.
+
+    Entries are ``name``, ``name==version`` or ``name@version`` (npm scopes
+    such as ``@types/node@20.1.0`` are kept); the version is None when absent.
+    """
+    pairs = []
+    for entry in text.replace("\n", ",").split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, separator, version = entry.partition("==")
+        if not separator:
+            head, separator, version = entry[1:].partition("@")
+            name = entry[0] + head if separator else entry
+        pairs.append((name.strip(), version.strip() or None))
+    return pairs
+
+
+def issue_line(issue) -> str:
+    """Return a one-line summary of ``issue`` in ``LINE_FORMAT``."""
+    if not isinstance(issue, Mapping):
+        return "- " + " ".join(str(issue).split())[:_DESCRIPTION_CHARS]
+    parts = []
+    version = issue_version(issue)
+    if version:
+        parts.append(f"[{version}]")
+    severity = issue.get("severity")
+    if isinstance(severity, str) and severity.strip():
+        parts.append(f"({severity.strip()})")
+    description = issue_text(issue, DESCRIPTION_FIELDS)
+    if description and len(description) > _DESCRIPTION_CHARS:
+        description = description[:_DESCRIPTION_CHARS - 1].rstrip() + "…"
+    summary = ": ".join(text for text in (issue_text(issue, TITLE_FIELDS), description) if text)
+    parts.append(summary or codec.dumps_text(issue)[:_DESCRIPTION_CHARS])
+    return "- " + " ".join(parts)
+
+
+def _select(index: VersionIndex, request: DigestRequest) -> tuple:
+    """Return the issues the digest covers and a description of that range."""
+    try:
+        if request.current_version and request.target_version:
+            return (index.between(request.current_version, request.target_version),
+                    f"issues introduced after {request.current_version} up to and including "
+                    f"{request.target_version}, oldest first")
+        if request.current_version:
+            return (index.after(request.current_version),
+                    f"issues introduced after {request.current_version}, oldest first")
+    except ValueError as exc:
+        return index.newest_first(), f"all issues, newest first ({exc})"
+    return index.newest_first(), "all issues, newest first"
+
+
+def _section(request: DigestRequest, payload, index: VersionIndex, budget: int, tool: str) -> str:
+    issues, scope = _select(index, request)
+    lines = [f"### {request.library} ({request.language}): {scope}"]
+    stale = payload.get("stale") if isinstance(payload, Mapping) else None
+    if stale:
+        lines.append(f"(From a cached copy fetched at {stale['fetched_at']}; the PatchEvergreen API "
+                     f"could not be reached.)")
+    if not issues:
+        lines.append("No breaking changes recorded in this range.")
+        return "\n".join(lines) + "\n"
+    used = sum(len(line.encode()) + 1 for line in lines)
+    shown = 0
+    for issue in issues:
+        line = issue_line(issue)
+        size = len(line.encode()) + 1
+        if used + size > budget:
+            break
+        lines.append(line)
+        used += size
+        shown += 1
+    if shown < len(issues):
+        lines.append(f"({len(issues) - shown} of {len(issues)} issues left out to keep this prompt short; "
+                     f"fetch them with {tool} if the analysis needs them.)")
+    return "\n".join(lines) + "\n"
+
+
+async def render(requests: list, tool: str = "get_issues_for_library") -> str:
+    """Fetch every request's issues concurrently (up to ``PEG_BATCH_CONCURRENCY`` at once) and return their digests.
+
+    The digests together stay within ``PEG_PROMPT_DATA_MAX_BYTES``: each
+    gets an equal share of what the earlier ones left unused. A library
+    that cannot be fetched gets a note pointing to ``tool`` instead. The
+    lookups of a digest of several libraries are bulk work, like an audit's,
+    so they queue behind single-library lookups.
+    """
+    semaphore = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+
+    async def fetch(request: DigestRequest):
+        async with semaphore:
+            payload = await lookup.get_issues(request.library, request.language)
+        # The sorted index is kept on the cache entry, shared with get_issues_between_versions.
+        return payload, await version_index(request.library, request.language, payload)
+
+    lane = scheduler.bulk("prompt-digest") if len(requests) > 1 else contextlib.nullcontext()
+    with lane:
+        payloads = await asyncio.gather(*(fetch(request) for request in requests), return_exceptions=True)
+    remaining = settings.PROMPT_DATA_MAX_BYTES
+    sections = []
+    for position, (request, payload) in enumerate(zip(requests, payloads)):
+        if isinstance(payload, BaseException):
+            if not isinstance(payload, Exception):
+                raise payload
+            section = (f"### {request.library} ({request.language})\n"
+                       f"Could not fetch data ({type(payload).__name__}: {payload}); use {tool} instead.\n")
+        else:
+            section = _section(request, *payload, remaining // (len(requests) - position), tool)
+        sections.append(section)
+        remaining = max(0, remaining - len(section.encode()))
+    return "\n".join(sections)
@@ -0,0 +1,125 @@
+"""Retry and circuit-breaker policy for calls to the PatchEvergreen API.
+
+Transient failures (timeouts, connection errors, 429 and 5xx answers) are
+retried a bounded number of times with full-jitter exponential backoff, and
+never beyond a per-call time budget, so a slow upstream cannot multiply into
+many seconds of latency. A circuit breaker counts consecutive failures and,
+once they cross a threshold, fails calls immediately for a cool-down period
+before letting a single probe through to test whether the API has recovered.
+"""
+import datetime
+import email.utils
+import random
+import time
+
+import httpx
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the upstream API while the circuit is open."""
+
+    def __init__(self, retry_in: float):
+        self.retry_in = retry_in
+        super().__init__(f"PatchEvergreen API is unavailable; not retrying for {retry_in:.0f}s")
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Return True for failures worth retrying or answering from a stale copy."""
+    if isinstance(exc, (httpx.TransportError, CircuitOpenError)):
+        return True
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code == 429 or exc.response.status_code >= 500
+    return False
+
+
+def retry_after(exc: BaseException, date_cap: float = None):
+    """Return the seconds asked for by a ``Retry-After`` header on ``exc``'s response, or None.
+
+    The header is either a number of seconds or an HTTP date. A date is only
+    as good as the agreement between the two clocks, so the wait it implies
+    is capped at ``date_cap`` seconds when that is given.
+    """
+    if not isinstance(exc, httpx.HTTPStatusError):
+        return None
+    value = exc.response.headers.get("Retry-After", "").strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if when.tzinfo is None:
+        # "-0000" means UTC with no further information (RFC 5322).
+        when = when.replace(tzinfo=datetime.timezone.utc)
+    seconds = max(0.0, when.timestamp() - time.time())
+    return seconds if date_cap is None else min(seconds, date_cap)
+
+
+def backoff(attempt: int, base: float, cap: float) -> float:
+    """Return the delay before retry number ``attempt`` (0-based), with full jitter."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """Fails fast after ``threshold`` consecutive failures, for ``reset_timeout`` seconds.
+
+    After the cool-down one call is let through (half-open). Its success
+    closes the circuit; its failure opens it again. Meant to be used from a
+    single event loop.
+    """
+
+    def __init__(self, threshold: int, reset_timeout: float):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.short_circuited = 0
+        self._probing = False
+        self._probe_started = 0.0
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError if the call must not go to the upstream API."""
+        if self.threshold <= 0 or self.state == CLOSED:
+            return
+        now = time.monotonic()
+        remaining = self.opened_at + self.reset_timeout - now
+        if self.state == OPEN and remaining <= 0:
+            self.state = HALF_OPEN
+        # A probe that never reported back (e.g. it was cancelled) is replaced after a cool-down.
+        if self.state == HALF_OPEN and (not self._probing or now - self._probe_started > self.reset_timeout):
+            self._probing = True
+            self._probe_started = now
+            return
+        self.short_circuited += 1
+        raise CircuitOpenError(max(remaining, 0.0))
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._probing = False
+        self.state = CLOSED
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+        if self.state == HALF_OPEN or (self.threshold > 0 and self.failures >= self.threshold):
+            if self.state != OPEN:
+                self.times_opened += 1
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        """Return the breaker's state and counters for operators."""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "times_opened": self.times_opened,
+            "short_circuited": self.short_circuited,
+        }
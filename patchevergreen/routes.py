@@ -0,0 +1,45 @@
+"""Operator HTTP endpoints served by both hosted servers."""
+from fastmcp import FastMCP
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+from patchevergreen import lookup, metrics, profiling
+
+
+# Operator endpoint for cache hit/miss/eviction counters
+async def cache_stats(request: Request) -> JSONResponse:
+    """Report in-process cache counters."""
+    return JSONResponse(lookup.cache_stats())
+
+
+# Prometheus scrape endpoint
+async def metrics_endpoint(request: Request) -> Response:
+    """Expose tool, upstream, cache and HTTP metrics in Prometheus text format."""
+    if request.query_params.get("format") == "json":
+        # Another worker collecting this one's samples
+        return Response(metrics.snapshot_json(), media_type="application/json")
+    return Response(await metrics.exposition(), media_type=metrics.CONTENT_TYPE)
+
+
+# Admin-only sampling profiler; disabled unless PEG_ADMIN_TOKEN is set
+async def admin_profile(request: Request) -> Response:
+    """Profile this worker for ?seconds=N (default 10) and return the top functions."""
+    if not profiling.admin_authorized(request.headers.get("authorization")):
+        return JSONResponse({"error": "Not found"}, status_code=404)
+    try:
+        seconds = float(request.query_params.get("seconds", "10"))
+    except ValueError:
+        return JSONResponse({"error": "seconds must be a number"}, status_code=400)
+    try:
+        result = await profiling.profile_for(seconds)
+    except profiling.ProfilerBusy as exc:
+        return JSONResponse({"error": str(exc)}, status_code=409)
+    return Response(result["summary"], media_type="text/plain",
+                    headers={"X-Profile-File": result["file"], "X-Profile-Seconds": str(result["seconds"])})
+
+
+def register(mcp: FastMCP) -> None:
+    """Add the operator endpoints to ``mcp``'s HTTP app."""
+    mcp.custom_route("/cache/stats", methods=["GET"])(cache_stats)
+    mcp.custom_route("/metrics", methods=["GET"])(metrics_endpoint)
+    mcp.custom_route("/admin/profile", methods=["POST"])(admin_profile)
@@ -0,0 +1,192 @@
+"""Client-side rate limiting and prioritisation of PatchEvergreen API calls.
+
+Every upstream request takes a token from a token bucket refilled at
+``PEG_UPSTREAM_RATE_LIMIT`` requests per second (up to ``PEG_UPSTREAM_BURST``
+saved up), so a large audit cannot flood the API. When the API answers with
+``Retry-After``, the bucket is paused for that long.
+
+Requests waiting for a token are served interactive first: single-library
+lookups go ahead of batch and audit work. Bulk requests are served round
+robin between sessions, so one session's large audit does not hold up
+another's. The priority and session of a request come from the context it
+runs in; code is interactive unless it runs inside ``bulk``.
+"""
+import asyncio
+import contextlib
+import contextvars
+import time
+from collections import OrderedDict, deque
+
+from patchevergreen import metrics, settings
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+
+# (priority, session key) of the code running in this context
+_lane = contextvars.ContextVar("peg_upstream_lane", default=(INTERACTIVE, None))
+
+
+@contextlib.contextmanager
+def bulk(session):
+    """Run the enclosed lookups (and the tasks they start) as bulk work for ``session``."""
+    token = _lane.set((BULK, session))
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+def session_key(ctx) -> str:
+    """Return a key identifying the MCP session of ``ctx`` (or ``"local"`` without one)."""
+    if ctx is None:
+        return "local"
+    try:
+        return f"session-{id(ctx.session)}"
+    except Exception:
+        return "local"
+
+
+class TokenBucket:
+    """Allows ``rate`` acquisitions per second on average, with bursts of up to ``burst``."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        """Return the seconds until a token is available (0 if one is available now)."""
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for ``seconds``, then start again from an empty bucket."""
+        now = time.monotonic()
+        self.paused_until = max(self.paused_until, now + seconds)
+        self.tokens = 0.0
+        self.updated = self.paused_until
+
+
+class UpstreamScheduler:
+    """Hands out upstream request slots by priority, round robin between bulk sessions.
+
+    Meant to be used from a single event loop.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.enabled = rate > 0
+        self.bucket = TokenBucket(rate, burst) if self.enabled else None
+        self._interactive = deque()
+        self._bulk = OrderedDict()
+        self._dispatcher = None
+        self.granted = {INTERACTIVE: 0, BULK: 0}
+        self.throttled = 0
+
+    def depth(self) -> dict:
+        """Return the number of requests waiting, by priority."""
+        return {
+            INTERACTIVE: sum(1 for waiter in self._interactive if not waiter.done()),
+            BULK: sum(1 for queue in self._bulk.values() for waiter in queue if not waiter.done()),
+        }
+
+    async def acquire(self) -> float:
+        """Wait for this context's turn to call the API; return the seconds waited."""
+        if not self.enabled:
+            return 0.0
+        priority, session = _lane.get()
+        if not self._interactive and not self._bulk and self.bucket.delay() == 0:
+            self.bucket.take()
+            self.granted[priority] += 1
+            metrics.UPSTREAM_QUEUE_WAIT.observe(0.0, priority=priority)
+            return 0.0
+        waiter = asyncio.get_running_loop().create_future()
+        if priority == INTERACTIVE:
+            self._interactive.append(waiter)
+        else:
+            self._bulk.setdefault(session, deque()).append(waiter)
+        self._ensure_dispatcher()
+        started = time.monotonic()
+        await waiter
+        waited = time.monotonic() - started
+        self.granted[priority] += 1
+        metrics.UPSTREAM_QUEUE_WAIT.observe(waited, priority=priority)
+        return waited
+
+    def throttle(self, seconds: float) -> None:
+        """Stop calling the API for ``seconds``, as asked by a ``Retry-After`` header."""
+        if self.enabled:
+            self.throttled += 1
+            self.bucket.pause(seconds)
+
+    def _ensure_dispatcher(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._dispatcher is None or self._dispatcher.done() or self._dispatcher.get_loop() is not loop:
+            self._dispatcher = loop.create_task(self._dispatch())
+
+    def _next_waiter(self):
+        while self._interactive:
+            waiter = self._interactive.popleft()
+            if not waiter.done():
+                return waiter
+        while self._bulk:
+            session, queue = next(iter(self._bulk.items()))
+            waiter = queue.popleft()
+            if queue:
+                self._bulk.move_to_end(session)
+            else:
+                del self._bulk[session]
+            if not waiter.done():
+                return waiter
+        return None
+
+    async def _dispatch(self) -> None:
+        while self._interactive or self._bulk:
+            delay = self.bucket.delay()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            waiter = self._next_waiter()
+            if waiter is None:
+                break
+            self.bucket.take()
+            waiter.set_result(None)
+
+    def stats(self) -> dict:
+        """Return queue depth and counters for operators."""
+        return {
+            "rate_limit": self.bucket.rate if self.enabled else 0,
+            "waiting": self.depth(),
+            "bulk_sessions_waiting": len(self._bulk),
+            "granted": dict(self.granted),
+            "throttled": self.throttled,
+        }
+
+
+scheduler = UpstreamScheduler(settings.UPSTREAM_RATE_LIMIT, settings.UPSTREAM_BURST)
+
+
+def _queue_metrics() -> list:
+    depth = scheduler.depth()
+    return [{"name": "peg_upstream_queue_depth", "type": "gauge",
+             "help": "Lookups waiting for an upstream request slot, by priority.",
+             "samples": [("", {"priority": priority}, waiting) for priority, waiting in depth.items()]},
+            metrics.gauge_family("peg_upstream_throttled_total",
+                                 "Times the API asked us to back off with Retry-After.", scheduler.throttled,
+                                 "counter")]
+
+
+metrics.register_collector(_queue_metrics)
@@ -0,0 +1,404 @@
+"""Local full-text search over the breaking changes the server has fetched.
+
+Every response the server loads, whether from the PatchEvergreen API, the
+disk cache or a cache snapshot, is added to an SQLite FTS5 index with one
+row per issue. A library's rows are replaced whenever a newer response for
+it arrives. ``search_issues`` answers from this index alone, so it never
+calls the API and only covers the libraries fetched so far.
+
+Results are ranked with BM25 (title matches weigh most) and come with a
+highlighted snippet. They can be narrowed by language, by library and by
+an ecosystem-aware version range, and facet counts by language and
+library are returned with them. The index lives in memory unless
+``PEG_SEARCH_INDEX_PATH`` names a database file, which keeps it across
+restarts. It is bounded by ``PEG_SEARCH_INDEX_MAX_LIBRARIES`` and
+``PEG_SEARCH_INDEX_MAX_BYTES``, and an in-memory index also forgets the
+responses the in-memory cache evicts, so it grows no further than the
+cache does.
+"""
+import asyncio
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections.abc import Mapping
+
+from patchevergreen import codec, names, settings
+from patchevergreen.payload import DESCRIPTION_FIELDS, TITLE_FIELDS, issue_list, issue_text, issue_version
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS indexed (
+    library    TEXT NOT NULL,
+    language   TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    bytes      INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (library, language)
+);
+CREATE TABLE IF NOT EXISTS issues (
+    id       INTEGER PRIMARY KEY,
+    library  TEXT NOT NULL,
+    language TEXT NOT NULL,
+    version  TEXT,
+    title    TEXT,
+    body     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS issues_pair ON issues (library, language);
+CREATE VIRTUAL TABLE IF NOT EXISTS issues_text USING fts5(
+    title, description, details, tokenize = 'porter unicode61'
+);
+"""
+
+# BM25 weights of the title, description and details columns
+_WEIGHTS = (10.0, 4.0, 1.0)
+_SNIPPET_TOKENS = 16
+# Facet values returned per facet, most frequent first
+FACET_VALUES = 20
+
+# A quoted phrase or a bare term, either optionally followed by * for a prefix match
+_TERM = re.compile(r'"([^"]*)"(\*?)|([^\s"]+)')
+
+
+def match_expression(query: str) -> str:
+    """Return an FTS5 expression matching issues that contain every term of ``query``.
+
+    Each term is quoted, so FTS5 operators and punctuation in the query are
+    matched as text. ``"..."`` keeps a phrase together and a trailing ``*``
+    matches a prefix. Returns an empty string if the query has no terms.
+    """
+    parts = []
+    for phrase, phrase_star, term in _TERM.findall(query):
+        text = phrase if not term else term
+        star = phrase_star
+        if term.endswith("*"):
+            text, star = term.rstrip("*"), "*"
+        if re.search(r"\w", text):
+            parts.append('"' + text.replace('"', "") + '"' + star)
+    return " ".join(parts)
+
+
+def _details(issue: dict) -> str:
+    # Every other string in the issue (migration notes, links, symbols) is searchable too.
+    used = set(TITLE_FIELDS + DESCRIPTION_FIELDS)
+    texts = []
+
+    def walk(value):
+        if isinstance(value, str):
+            texts.append(value)
+        elif isinstance(value, Mapping):
+            for item in value.values():
+                walk(item)
+        elif isinstance(value, (list, tuple)):
+            for item in value:
+                walk(item)
+
+    for field, value in issue.items():
+        if field not in used:
+            walk(value)
+    return " ".join(texts)
+
+
+def _row(issue) -> tuple:
+    """Return ``(version, title, description, details)`` for an issue."""
+    if not isinstance(issue, Mapping):
+        return None, None, str(issue), ""
+    return issue_version(issue), issue_text(issue, TITLE_FIELDS), issue_text(issue, DESCRIPTION_FIELDS), \
+        _details(issue)
+
+
+class SearchIndex:
+    """SQLite FTS5 index of the issues of every response added to it.
+
+    The index holds at most ``max_libraries`` responses and about
+    ``max_bytes`` of issue text (stored bodies plus indexed text); adding
+    more drops the least recently fetched responses first.
+
+    Methods block on SQLite, so async callers should run them in a worker
+    thread (``asyncio.to_thread``). One connection is shared by all threads,
+    so an in-memory index is the same for every caller.
+    """
+
+    def __init__(self, path: str = ":memory:", max_libraries: int = 5000, max_bytes: int = 128 * 1024 * 1024):
+        self.path = path
+        self.max_libraries = max_libraries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.searches = 0
+        self.updates = 0
+        self.evictions = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(indexed)")}
+        if "bytes" not in columns:
+            # Index files written before the size bound count as empty until refreshed.
+            self._conn.execute("ALTER TABLE indexed ADD COLUMN bytes INTEGER NOT NULL DEFAULT 0")
+
+    @property
+    def in_memory(self) -> bool:
+        return self.path == ":memory:"
+
+    def _delete(self, key: tuple) -> None:
+        self._conn.execute("DELETE FROM issues_text WHERE rowid IN"
+                           " (SELECT id FROM issues WHERE library = ? AND language = ?)", key)
+        self._conn.execute("DELETE FROM issues WHERE library = ? AND language = ?", key)
+        self._conn.execute("DELETE FROM indexed WHERE library = ? AND language = ?", key)
+
+    def _trim(self) -> None:
+        """Drop the least recently fetched responses until the index is within its bounds."""
+        libraries, size = self._conn.execute("SELECT count(*), coalesce(sum(bytes), 0) FROM indexed").fetchone()
+        if libraries <= self.max_libraries and size <= self.max_bytes:
+            return
+        oldest = self._conn.execute("SELECT library, language, bytes FROM indexed ORDER BY fetched_at").fetchall()
+        for library, language, used in oldest:
+            if libraries <= self.max_libraries and size <= self.max_bytes:
+                break
+            self._delete((library, language))
+            libraries -= 1
+            size -= used
+            self.evictions += 1
+
+    def add(self, key: tuple, payload, fetched_at: float) -> bool:
+        """Replace the issues indexed for ``key`` with those in ``payload``.
+
+        Returns False without changing anything if the index already holds a
+        response for ``key`` fetched at or after ``fetched_at``.
+        """
+        rows = [_row(issue) + (codec.dumps_text(issue),) for issue in issue_list(payload)]
+        size = sum(len(text) for row in rows for text in row[1:] if text)
+        with self._lock, self._conn:
+            known = self._conn.execute("SELECT fetched_at FROM indexed WHERE library = ? AND language = ?",
+                                       key).fetchone()
+            if known is not None and known[0] >= fetched_at:
+                return False
+            self._delete(key)
+            for version, title, description, details, body in rows:
+                cursor = self._conn.execute(
+                    "INSERT INTO issues (library, language, version, title, body) VALUES (?, ?, ?, ?, ?)",
+                    (key[0], key[1], version, title, body))
+                self._conn.execute("INSERT INTO issues_text (rowid, title, description, details)"
+                                   " VALUES (?, ?, ?, ?)", (cursor.lastrowid, title, description, details))
+            self._conn.execute("INSERT INTO indexed (library, language, fetched_at, bytes) VALUES (?, ?, ?, ?)",
+                               (key[0], key[1], fetched_at, size))
+            self._trim()
+        self.updates += 1
+        return True
+
+    def discard(self, key: tuple, fetched_at: float) -> bool:
+        """Drop the issues indexed for ``key`` unless they come from a response newer than ``fetched_at``."""
+        with self._lock, self._conn:
+            known = self._conn.execute("SELECT fetched_at FROM indexed WHERE library = ? AND language = ?",
+                                       key).fetchone()
+            if known is None or known[0] > fetched_at:
+                return False
+            self._delete(key)
+        return True
+
+    def search(self, expression: str, languages: list = None, libraries: list = None, accept=None,
+               limit: int = 20) -> dict:
+        """Return the best ``limit`` issues matching the FTS5 ``expression``, with facet counts.
+
+        An empty expression matches every issue, ordered by library. Only
+        issues whose language is in ``languages`` and library in ``libraries``
+        (when given) and for which ``accept(language, version)`` is true
+        (when given) are counted. Filtering, ranking and counting run in
+        SQLite; only the returned issues are read into Python.
+        """
+        filters, params = [], []
+        if expression:
+            filters.append("issues_text MATCH ?")
+            params.append(expression)
+        for column, values in (("language", languages), ("library", libraries)):
+            if values:
+                filters.append(f"i.{column} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+        if accept is not None:
+            filters.append("peg_accept(i.language, i.version)")
+        where = f"WHERE {' AND '.join(filters)}" if filters else ""
+        if expression:
+            weights = ", ".join(map(str, _WEIGHTS))
+            source = "issues_text JOIN issues i ON i.id = issues_text.rowid"
+            top_sql = (f"SELECT i.id, i.library, i.language, i.version, bm25(issues_text, {weights}) AS rank"
+                       f" FROM {source} {where} ORDER BY rank LIMIT ?")
+        else:
+            source = "issues i"
+            top_sql = (f"SELECT i.id, i.library, i.language, i.version, 0.0 FROM {source} {where}"
+                       f" ORDER BY i.library, i.language, i.id LIMIT ?")
+        count_sql = f"SELECT i.library, i.language, count(*) FROM {source} {where} GROUP BY i.library, i.language"
+
+        with self._lock:
+            self.searches += 1
+            if accept is not None:
+                self._conn.create_function("peg_accept", 2, accept, deterministic=True)
+            top = self._conn.execute(top_sql, params + [limit]).fetchall()
+            counts = self._conn.execute(count_sql, params).fetchall()
+            ids = [row[0] for row in top]
+            marks = ", ".join("?" * len(ids))
+            if expression and ids:
+                details = self._conn.execute(
+                    f"SELECT i.id, i.title, i.body, snippet(issues_text, -1, '**', '**', '…', {_SNIPPET_TOKENS})"
+                    f" FROM issues_text JOIN issues i ON i.id = issues_text.rowid"
+                    f" WHERE issues_text MATCH ? AND issues_text.rowid IN ({marks})", [expression] + ids)
+            else:
+                details = self._conn.execute(f"SELECT id, title, body, NULL FROM issues WHERE id IN ({marks})", ids)
+            found = {row[0]: row[1:] for row in details}
+            indexed = self._conn.execute("SELECT count(*) FROM indexed").fetchone()[0]
+
+        results = []
+        for issue_id, library, language, version, rank in top:
+            title, body, snippet = found[issue_id]
+            score = float(f"{-rank:.4g}") if expression else None
+            results.append({"library": library, "language": language, "version": version, "title": title,
+                            "snippet": snippet, "score": score, "issue": codec.loads(body)})
+        facets = {"language": {}, "library": {}}
+        for library, language, count in counts:
+            facets["language"][language] = facets["language"].get(language, 0) + count
+            facets["library"][f"{library} ({language})"] = count
+        return {
+            "results": results,
+            "total_matches": sum(count for _, _, count in counts),
+            "facets": {name: dict(sorted(values.items(), key=lambda item: -item[1])[:FACET_VALUES])
+                       for name, values in facets.items()},
+            "indexed_libraries": indexed,
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            libraries, size = self._conn.execute("SELECT count(*), coalesce(sum(bytes), 0) FROM indexed").fetchone()
+            issues = self._conn.execute("SELECT count(*) FROM issues").fetchone()[0]
+        return {"libraries": libraries, "issues": issues, "bytes": size, "max_libraries": self.max_libraries,
+                "max_bytes": self.max_bytes, "updates": self.updates, "evictions": self.evictions,
+                "searches": self.searches}
+
+
+index = None
+if settings.SEARCH_INDEX:
+    try:
+        index = SearchIndex(settings.SEARCH_INDEX_PATH or ":memory:", settings.SEARCH_INDEX_MAX_LIBRARIES,
+                            settings.SEARCH_INDEX_MAX_BYTES)
+    except sqlite3.OperationalError:
+        # Some SQLite builds leave out FTS5; everything but search_issues still works.
+        logger.warning("Search index unavailable; search_issues is disabled", exc_info=True)
+
+# Indexing tasks still running, awaited by searches so they see every fetched response
+_pending = set()
+
+
+def _add(key: tuple, payload, fetched_at: float) -> None:
+    try:
+        index.add(key, payload, fetched_at)
+    except Exception:
+        logger.warning("Search indexing failed for %s/%s", key[0], key[1], exc_info=True)
+
+
+def _add_all(entries: list) -> None:
+    for key, payload, fetched_at in entries:
+        _add(key, payload, fetched_at)
+
+
+def _start(function, *args) -> None:
+    task = asyncio.get_running_loop().create_task(asyncio.to_thread(function, *args))
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+def submit(key: tuple, payload, fetched_at: float) -> None:
+    """Index ``payload`` for ``key`` in a worker thread, without delaying the caller."""
+    if index is not None:
+        _start(_add, key, payload, fetched_at)
+
+
+def submit_all(entries: list) -> None:
+    """Index ``(key, payload, fetched_at)`` entries in one worker thread (a loaded snapshot)."""
+    if index is not None and entries:
+        _start(_add_all, entries)
+
+
+def _discard(key: tuple, fetched_at: float) -> None:
+    try:
+        index.discard(key, fetched_at)
+    except Exception:
+        logger.warning("Search index cleanup failed for %s/%s", key[0], key[1], exc_info=True)
+
+
+def discard(key: tuple, entry) -> None:
+    """Drop ``key`` from an in-memory index once the response cache has evicted it.
+
+    Passed to the response cache as its ``on_evict`` callback; an index kept
+    in a database file holds on to evicted responses, within its own bounds.
+    """
+    if index is None or not index.in_memory:
+        return
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        # A cache used outside the event loop (scripts, tests) cleans up inline.
+        _discard(key, entry.fetched_at)
+        return
+    _start(_discard, key, entry.fetched_at)
+
+
+def _libraries(libraries: list, language: str) -> list:
+    """Return every canonical spelling of ``libraries`` in ``language`` (or any language)."""
+    languages = [language] if language else names.LANGUAGES
+    return sorted({names.canonical_library(library, each) for library in libraries for each in languages}
+                  | ({library.strip() for library in libraries} if not language else set()))
+
+
+def _version_filter(language: str, after_version: str, up_to_version: str):
+    """Return ``accept(language, version)`` for the range (after_version, up_to_version], or None."""
+    if not (after_version or up_to_version):
+        return None
+    # versions imports lookup, which feeds this index, so it is imported on first use.
+    from patchevergreen.versions import version_key
+
+    bounds = {}
+    keys = {}
+
+    def bounds_for(issue_language: str) -> tuple:
+        if issue_language not in bounds:
+            low = version_key(issue_language, after_version) if after_version else None
+            high = version_key(issue_language, up_to_version) if up_to_version else None
+            parsed = (low is not None or not after_version) and (high is not None or not up_to_version)
+            bounds[issue_language] = (parsed, low, high)
+        return bounds[issue_language]
+
+    if language and not bounds_for(language)[0]:
+        bad = after_version if after_version and bounds[language][1] is None else up_to_version
+        raise ValueError(f"Cannot parse version '{bad}' for language '{language}'")
+
+    def accept(issue_language: str, version: str) -> bool:
+        parsed, low, high = bounds_for(issue_language)
+        if not parsed or not version:
+            return False
+        if (issue_language, version) not in keys:
+            keys[issue_language, version] = version_key(issue_language, version)
+        key = keys[issue_language, version]
+        return key is not None and (low is None or key > low) and (high is None or key <= high)
+
+    return accept
+
+
+async def search_issues(query: str = "", language: str = None, libraries: list = None, after_version: str = None,
+                        up_to_version: str = None, limit: int = 20) -> dict:
+    """Search the issues of every response fetched so far; never calls the API."""
+    if index is None:
+        raise RuntimeError("Search is disabled on this server (PEG_SEARCH_INDEX is off or SQLite lacks FTS5)")
+    started = time.perf_counter()
+    language = names.canonical_language(language) if language else None
+    accept = _version_filter(language, after_version, up_to_version)
+    limit = max(1, min(limit, settings.SEARCH_MAX_RESULTS))
+    if _pending:
+        await asyncio.wait(set(_pending))
+    found = await asyncio.to_thread(index.search, match_expression(query or ""),
+                                    [language] if language else None,
+                                    _libraries(libraries, language) if libraries else None, accept, limit)
+    return {
+        "query": query,
+        **found,
+        "took_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
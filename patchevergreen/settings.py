@@ -0,0 +1,149 @@
+"""Environment-driven configuration shared by the PatchEvergreen servers.
+
+Every knob is read once at import time from a ``PEG_*`` environment variable,
+so Docker and docker-compose deployments can tune the servers without code
+changes.
+"""
+import os
+
+
+def env_str(name: str, default: str) -> str:
+    """Return the environment variable ``name``, or ``default`` if unset/empty."""
+    value = os.environ.get(name, "").strip()
+    return value or default
+
+
+def env_int(name: str, default: int) -> int:
+    """Return the environment variable ``name`` parsed as an int."""
+    value = os.environ.get(name, "").strip()
+    return int(value) if value else default
+
+
+def env_float(name: str, default: float) -> float:
+    """Return the environment variable ``name`` parsed as a float."""
+    value = os.environ.get(name, "").strip()
+    return float(value) if value else default
+
+
+def env_bool(name: str, default: bool) -> bool:
+    """Return the environment variable ``name`` parsed as a boolean flag."""
+    value = os.environ.get(name, "").strip().lower()
+    if not value:
+        return default
+    return value in ("1", "true", "yes", "on")
+
+
+# Upstream PatchEvergreen API client
+UPSTREAM_URL = env_str("PEG_UPSTREAM_URL", "https://app.patchevergreen.com/api/getissuesforlibrary.php")
+UPSTREAM_HTTP2 = env_bool("PEG_UPSTREAM_HTTP2", True)
+UPSTREAM_POOL_SIZE = env_int("PEG_UPSTREAM_POOL_SIZE", 20)
+UPSTREAM_CONNECT_TIMEOUT = env_float("PEG_UPSTREAM_CONNECT_TIMEOUT", 5.0)
+UPSTREAM_READ_TIMEOUT = env_float("PEG_UPSTREAM_READ_TIMEOUT", 10.0)
+UPSTREAM_POOL_TIMEOUT = env_float("PEG_UPSTREAM_POOL_TIMEOUT", 10.0)
+UPSTREAM_KEEPALIVE_EXPIRY = env_float("PEG_UPSTREAM_KEEPALIVE_EXPIRY", 60.0)
+
+# Retries of transient upstream failures, and the circuit breaker that stops
+# calling the API after repeated failures (PEG_UPSTREAM_BREAKER_THRESHOLD=0 disables it)
+UPSTREAM_RETRIES = env_int("PEG_UPSTREAM_RETRIES", 2)
+UPSTREAM_RETRY_BASE_DELAY = env_float("PEG_UPSTREAM_RETRY_BASE_DELAY", 0.1)
+UPSTREAM_RETRY_MAX_DELAY = env_float("PEG_UPSTREAM_RETRY_MAX_DELAY", 1.0)
+UPSTREAM_RETRY_BUDGET = env_float("PEG_UPSTREAM_RETRY_BUDGET", 3.0)
+UPSTREAM_BREAKER_THRESHOLD = env_int("PEG_UPSTREAM_BREAKER_THRESHOLD", 5)
+UPSTREAM_BREAKER_RESET = env_float("PEG_UPSTREAM_BREAKER_RESET", 30.0)
+
+# Client-side rate limit on API requests per process (PEG_UPSTREAM_RATE_LIMIT=0 disables it)
+UPSTREAM_RATE_LIMIT = env_float("PEG_UPSTREAM_RATE_LIMIT", 10.0)
+UPSTREAM_BURST = env_float("PEG_UPSTREAM_BURST", 20.0)
+
+# In-process response cache (set PEG_CACHE_TTL=0 to disable)
+CACHE_TTL = env_float("PEG_CACHE_TTL", 3600.0)
+CACHE_MAX_STALE = env_float("PEG_CACHE_MAX_STALE", 86400.0)
+# How much longer a response is kept to answer with when the API is failing
+CACHE_STALE_IF_ERROR = env_float("PEG_CACHE_STALE_IF_ERROR", 7 * 86400.0)
+CACHE_MAX_ENTRIES = env_int("PEG_CACHE_MAX_ENTRIES", 5000)
+CACHE_MAX_BYTES = env_int("PEG_CACHE_MAX_BYTES", 128 * 1024 * 1024)
+
+# Pairs the API does not know (404) are remembered briefly (PEG_NEGATIVE_CACHE_TTL=0 disables),
+# and so are empty answers, which stay out of the response cache (PEG_EMPTY_CACHE_TTL=0 caches
+# them like any other response)
+NEGATIVE_CACHE_TTL = env_float("PEG_NEGATIVE_CACHE_TTL", 300.0)
+EMPTY_CACHE_TTL = env_float("PEG_EMPTY_CACHE_TTL", 300.0)
+NEGATIVE_CACHE_MAX_ENTRIES = env_int("PEG_NEGATIVE_CACHE_MAX_ENTRIES", 10000)
+
+# Optional on-disk cache tier shared by every process that mounts the same file
+DISK_CACHE_PATH = env_str("PEG_DISK_CACHE_PATH", "")
+DISK_CACHE_COMPACT_INTERVAL = env_float("PEG_DISK_CACHE_COMPACT_INTERVAL", 600.0)
+
+# Cache snapshot loaded into the caches (see python -m patchevergreen.warm); with
+# PEG_OFFLINE the server answers from the snapshot only and never calls the API.
+# Both are checked here so a misconfigured server fails as it starts.
+CACHE_SNAPSHOT = env_str("PEG_CACHE_SNAPSHOT", "")
+OFFLINE = env_bool("PEG_OFFLINE", False)
+if OFFLINE and not CACHE_SNAPSHOT:
+    raise RuntimeError("PEG_OFFLINE needs PEG_CACHE_SNAPSHOT to name the snapshot to serve from")
+if CACHE_SNAPSHOT and not os.path.isfile(CACHE_SNAPSHOT):
+    raise RuntimeError(f"PEG_CACHE_SNAPSHOT names '{CACHE_SNAPSHOT}', which is not a file")
+
+# Batch lookups
+BATCH_CONCURRENCY = env_int("PEG_BATCH_CONCURRENCY", 8)
+BATCH_MAX_ITEMS = env_int("PEG_BATCH_MAX_ITEMS", 500)
+
+# Dependency paths reported per installed package version by audit_lockfiles
+LOCKFILE_MAX_PATHS = env_int("PEG_LOCKFILE_MAX_PATHS", 3)
+
+# Progress notifications carry each completed item; larger payloads are summarised
+PROGRESS_MESSAGE_MAX_BYTES = env_int("PEG_PROGRESS_MESSAGE_MAX_BYTES", 16 * 1024)
+
+# Prompts that embed a digest of the fetched issues (see patchevergreen/prompt_data.py)
+PROMPT_INCLUDE_DATA = env_bool("PEG_PROMPT_INCLUDE_DATA", False)
+PROMPT_DATA_MAX_BYTES = env_int("PEG_PROMPT_DATA_MAX_BYTES", 12 * 1024)
+
+# Local full-text index of every fetched response, queried by search_issues; it
+# is kept in memory unless PEG_SEARCH_INDEX_PATH names an SQLite database file.
+# It holds at most this many libraries and bytes of issue text, dropping the
+# least recently fetched first; an in-memory index also drops what the
+# response cache evicts
+SEARCH_INDEX = env_bool("PEG_SEARCH_INDEX", True)
+SEARCH_INDEX_PATH = env_str("PEG_SEARCH_INDEX_PATH", "")
+SEARCH_INDEX_MAX_LIBRARIES = env_int("PEG_SEARCH_INDEX_MAX_LIBRARIES", CACHE_MAX_ENTRIES)
+SEARCH_INDEX_MAX_BYTES = env_int("PEG_SEARCH_INDEX_MAX_BYTES", CACHE_MAX_BYTES)
+SEARCH_MAX_RESULTS = env_int("PEG_SEARCH_MAX_RESULTS", 100)
+
+# Default number of issues per page when get_issues_for_library is paged
+PAGE_SIZE = env_int("PEG_PAGE_SIZE", 50)
+
+# Skill HTTP endpoints
+SKILL_MAX_AGE = env_int("PEG_SKILL_MAX_AGE", 300)
+SKILL_RECHECK_SECONDS = env_float("PEG_SKILL_RECHECK_SECONDS", 2.0)
+
+# Multi-process SSE serving. With more than one worker (or a registry shared
+# between replicas), each worker advertises a private address in the registry
+# directory and forwards /messages POSTs for sessions it does not own. The
+# private listener is on loopback unless replicas share the registry.
+WORKERS = env_int("PEG_WORKERS", 1)
+WORKER_REGISTRY = env_str("PEG_WORKER_REGISTRY", "")
+WORKER_BIND_HOST = env_str("PEG_WORKER_BIND_HOST", "127.0.0.1")
+WORKER_ADVERTISE_HOST = env_str("PEG_WORKER_ADVERTISE_HOST", "")
+
+# Streamable HTTP transport, served next to SSE by the hosted servers. Stateless
+# mode keeps no per-client state between requests, so any worker can answer.
+STREAMABLE_HTTP_PATH = env_str("PEG_STREAMABLE_HTTP_PATH", "/mcp")
+STREAMABLE_HTTP_STATELESS = env_bool("PEG_STREAMABLE_HTTP_STATELESS", True)
+STREAMABLE_HTTP_JSON_RESPONSE = env_bool("PEG_STREAMABLE_HTTP_JSON_RESPONSE", False)
+
+# Tracing: set PEG_TRACING_EXPORTER to "file" or "otlp" to record spans
+TRACING_EXPORTER = env_str("PEG_TRACING_EXPORTER", "").lower()
+TRACING_FILE = env_str("PEG_TRACING_FILE", "traces.jsonl")
+TRACING_OTLP_ENDPOINT = env_str("PEG_TRACING_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+TRACING_SERVICE_NAME = env_str("PEG_TRACING_SERVICE_NAME", "patchevergreen-mcp")
+TRACING_SAMPLE_RATE = env_float("PEG_TRACING_SAMPLE_RATE", 1.0)
+TRACING_BATCH_SIZE = env_int("PEG_TRACING_BATCH_SIZE", 512)
+TRACING_FLUSH_INTERVAL = env_float("PEG_TRACING_FLUSH_INTERVAL", 5.0)
+TRACING_QUEUE_SIZE = env_int("PEG_TRACING_QUEUE_SIZE", 10000)
+TRACING_SHUTDOWN_TIMEOUT = env_float("PEG_TRACING_SHUTDOWN_TIMEOUT", 5.0)
+
+# Admin endpoints (disabled unless a token is set) and on-demand profiling
+ADMIN_TOKEN = env_str("PEG_ADMIN_TOKEN", "")
+PROFILE_DIR = env_str("PEG_PROFILE_DIR", "profiles")
+PROFILE_MAX_SECONDS = env_float("PEG_PROFILE_MAX_SECONDS", 120.0)
+PROFILE_TOP = env_int("PEG_PROFILE_TOP", 40)
@@ -0,0 +1,40 @@
+"""Coalescing of concurrent identical async calls."""
+import asyncio
+
+
+class SingleFlight:
+    """Run at most one call per key at a time and share its outcome.
+
+    The first caller for a key starts the work as a task; callers that
+    arrive while it is running wait on the same task and receive the same
+    result or exception. The task is shielded, so a waiter that gets
+    cancelled (for example because its client went away) does not cancel
+    the work for everyone else.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key, fn):
+        """Return ``await fn()``, joining an in-flight call for ``key`` if there is one."""
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(fn())
+            self._calls[key] = task
+            self.started += 1
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved even if every waiter went away.
+            task.exception()
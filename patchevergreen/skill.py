@@ -0,0 +1,185 @@
+"""Precomputed HTTP representations of the SKILL.md file.
+
+SKILL.md is read and parsed once, and re-read only when its mtime changes.
+Each endpoint's body is rendered once per version of the file, tagged with
+a strong ETag and compressed in advance with gzip (and brotli when the
+``brotli`` package is installed), so serving a request, including a
+conditional 304, is a dictionary lookup.
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from patchevergreen import settings
+
+DEFAULT_SKILL_NAME = "PatchEvergreen Breaking Changes Analyzer"
+
+
+class Representation:
+    """One rendered response body with its ETag and pre-compressed variants."""
+
+    __slots__ = ("body", "content_type", "etag", "encoded")
+
+    def __init__(self, body: bytes, content_type: str):
+        self.body = body
+        self.content_type = content_type
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        # encoding -> (compressed body, ETag of that variant)
+        self.encoded = {}
+        compressed = gzip.compress(body, compresslevel=9, mtime=0)
+        if len(compressed) < len(body):
+            self.encoded["gzip"] = (compressed, f'"{digest}-gz"')
+        if brotli is not None:
+            compressed = brotli.compress(body, quality=11)
+            if len(compressed) < len(body):
+                self.encoded["br"] = (compressed, f'"{digest}-br"')
+
+
+def parse_frontmatter(content: str):
+    """Return the YAML frontmatter between the leading ``---`` markers, or None."""
+    if content.startswith('---'):
+        parts = content.split('---', 2)
+        if len(parts) >= 3:
+            return parts[1]
+    return None
+
+
+def parse_metadata(frontmatter: str) -> dict:
+    """Parse the flat ``key: value`` pairs (and ``[a, b]`` tag lists) of the frontmatter."""
+    metadata = {}
+    for line in frontmatter.split('\n'):
+        if ':' in line:
+            key, value = line.split(':', 1)
+            key = key.strip()
+            value = value.strip().strip('"').strip("'")
+            if key == 'tags' and value.startswith('['):
+                # Handle array format
+                metadata[key] = [t.strip().strip('"').strip("'") for t in value.strip('[]').split(',')]
+            else:
+                metadata[key] = value
+    return metadata
+
+
+def _json_body(data) -> bytes:
+    # Same encoding as Flask's jsonify, so responses are byte-for-byte unchanged.
+    return (json.dumps(data, sort_keys=True, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+class SkillSnapshot:
+    """Everything served for one version of SKILL.md."""
+
+    def __init__(self, content: str, mtime: float):
+        self.mtime = mtime
+        self.content = content
+        self.markdown = Representation(content.encode("utf-8"), "text/markdown; charset=utf-8")
+        frontmatter = parse_frontmatter(content)
+        self.frontmatter = None
+        metadata = {}
+        if frontmatter is not None:
+            self.frontmatter = Representation(frontmatter.strip().encode("utf-8"), "text/yaml; charset=utf-8")
+            metadata = parse_metadata(frontmatter)
+        self.metadata = metadata
+        self.listing = Representation(_json_body({
+            "skills": [
+                {
+                    "name": metadata.get("name", DEFAULT_SKILL_NAME),
+                    "description": metadata.get("description", ""),
+                    "version": metadata.get("version", "1.0.0"),
+                    "url": "/.well-known/skill",
+                }
+            ]
+        }), "application/json")
+
+
+class SkillFile:
+    """Caches the SKILL.md snapshot and reloads it when the file's mtime changes.
+
+    The file is stat()ed at most once every ``PEG_SKILL_RECHECK_SECONDS``.
+    Safe to share between threads.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def snapshot(self):
+        """Return the current SkillSnapshot, or None if the file does not exist."""
+        now = time.monotonic()
+        if now - self._checked_at < settings.SKILL_RECHECK_SECONDS:
+            return self._snapshot
+        with self._lock:
+            if now - self._checked_at < settings.SKILL_RECHECK_SECONDS:
+                return self._snapshot
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except FileNotFoundError:
+                self._snapshot = None
+            else:
+                if self._snapshot is None or self._snapshot.mtime != mtime:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        self._snapshot = SkillSnapshot(f.read(), mtime)
+            self._checked_at = now
+            return self._snapshot
+
+
+def _accepted_encodings(accept_encoding: str) -> set:
+    accepted = set()
+    for item in (accept_encoding or "").split(","):
+        name, *params = item.split(";")
+        quality = 1.0
+        for param in params:
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name.strip() and quality > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so ignore any W/ prefix.
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def respond(representation: Representation, accept_encoding: str = None, if_none_match: str = None):
+    """Choose the variant of ``representation`` for a request.
+
+    Returns:
+        tuple: ``(status, headers, body)``, where status is 200 or 304 and
+        headers is a list of (name, value) pairs.
+    """
+    accepted = _accepted_encodings(accept_encoding)
+    body, etag, encoding = representation.body, representation.etag, None
+    for candidate in ("br", "gzip"):
+        if candidate in representation.encoded and (candidate in accepted or "*" in accepted):
+            (body, etag), encoding = representation.encoded[candidate], candidate
+            break
+    headers = [
+        ("ETag", etag),
+        ("Cache-Control", f"public, max-age={settings.SKILL_MAX_AGE}"),
+        ("Vary", "Accept-Encoding"),
+    ]
+    if _etag_matches(if_none_match, etag):
+        return 304, headers, b""
+    headers.append(("Content-Type", representation.content_type))
+    if encoding:
+        headers.append(("Content-Encoding", encoding))
+    return 200, headers, body
@@ -0,0 +1,51 @@
+"""Cache snapshot files for pre-warming servers and running them offline.
+
+A snapshot is JSON Lines, gzip-compressed when the file name ends in
+``.gz``. The first line is a header; every other line holds one cached
+response::
+
+    {"format": "patchevergreen-cache-snapshot", "version": 1, "created_at": 1767225600.0}
+    {"library": "requests", "language": "python", "fetched_at": 1767225000.0, "payload": {...}}
+"""
+import gzip
+import json
+import time
+
+from patchevergreen import codec
+
+FORMAT = "patchevergreen-cache-snapshot"
+VERSION = 1
+
+
+def _open(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def write(path: str, records) -> int:
+    """Write ``(key, payload, fetched_at)`` records to a snapshot; return how many were written."""
+    count = 0
+    with _open(path, "w") as f:
+        f.write(json.dumps({"format": FORMAT, "version": VERSION, "created_at": time.time()}) + "\n")
+        for (library, language), payload, fetched_at in records:
+            f.write(codec.dumps_text({"library": library, "language": language, "fetched_at": fetched_at,
+                                      "payload": payload}) + "\n")
+            count += 1
+    return count
+
+
+def read(path: str):
+    """Yield ``(key, payload, fetched_at)`` records from a snapshot.
+
+    Raises:
+        ValueError: If the file is not a snapshot this version can read.
+    """
+    with _open(path, "r") as f:
+        header = json.loads(f.readline() or "{}")
+        if header.get("format") != FORMAT or header.get("version") != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} PatchEvergreen cache snapshot")
+        for line in f:
+            if line.strip():
+                record = codec.loads(line)
+                yield (record["library"], record["language"]), record["payload"], record["fetched_at"]
@@ -0,0 +1,347 @@
+"""Lightweight tracing with an OpenTelemetry-compatible exporter.
+
+Spans are recorded in-process and exported in the OTLP/JSON encoding, either
+appended as one ``ExportTraceServiceRequest`` per line to ``PEG_TRACING_FILE``
+or POSTed to an OTLP/HTTP collector at ``PEG_TRACING_OTLP_ENDPOINT`` (for
+example an OpenTelemetry Collector, Jaeger or Tempo). Export runs on a
+background thread, so the event loop never waits on it; spans still queued
+when the process exits are flushed, waiting at most
+``PEG_TRACING_SHUTDOWN_TIMEOUT`` seconds. With ``PEG_TRACING_EXPORTER``
+unset, ``span`` is a no-op.
+
+Spans nest through a context variable, so they follow a request across
+``await`` points and into the tasks it creates. Incoming W3C ``traceparent``
+headers are honoured by ``TracingMiddleware``.
+"""
+import atexit
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+
+from patchevergreen import settings
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar("peg_span", default=None)
+
+# OTLP status codes
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+# OTLP span kinds
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+
+
+def enabled() -> bool:
+    """Return True if spans are being recorded and exported."""
+    return settings.TRACING_EXPORTER in ("file", "otlp")
+
+
+class Span:
+    """One timed operation within a trace."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "kind", "start_ns", "end_ns",
+                 "attributes", "events", "status", "status_message", "sampled")
+
+    def __init__(self, name: str, parent=None, kind: int = KIND_INTERNAL, trace_id: str = None,
+                 parent_id: str = None, sampled: bool = None):
+        self.name = name
+        self.kind = kind
+        if parent is not None:
+            self.trace_id, self.parent_id, self.sampled = parent.trace_id, parent.span_id, parent.sampled
+        else:
+            self.trace_id = trace_id or f"{random.getrandbits(128):032x}"
+            self.parent_id = parent_id
+            self.sampled = random.random() < settings.TRACING_SAMPLE_RATE if sampled is None else sampled
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = {}
+        self.events = []
+        self.status = STATUS_OK
+        self.status_message = ""
+
+    def set(self, key: str, value) -> None:
+        """Set an attribute on the span."""
+        self.attributes[key] = value
+
+    def event(self, name: str, **attributes) -> None:
+        """Record a point-in-time event on the span."""
+        self.events.append((time.time_ns(), name, attributes))
+
+    def fail(self, exc: BaseException) -> None:
+        """Mark the span as failed with ``exc``."""
+        self.status = STATUS_ERROR
+        self.status_message = f"{type(exc).__name__}: {exc}"
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            if self.sampled:
+                _exporter().submit(self)
+
+
+class _NullSpan:
+    """Stand-in yielded by ``span`` when tracing is off."""
+
+    def set(self, key, value):
+        pass
+
+    def event(self, name, **attributes):
+        pass
+
+    def fail(self, exc):
+        pass
+
+
+_NULL = _NullSpan()
+
+
+@contextlib.contextmanager
+def span(name: str, kind: int = KIND_INTERNAL, **attributes):
+    """Record the enclosed block as a child of the current span (or a new trace)."""
+    if not enabled():
+        yield _NULL
+        return
+    current = Span(name, parent=_current.get(), kind=kind)
+    current.attributes.update(attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.fail(exc)
+        raise
+    finally:
+        _current.reset(token)
+        current.end()
+
+
+def current_span():
+    """Return the active span, or None."""
+    return _current.get()
+
+
+def parse_traceparent(header: str):
+    """Return ``(trace_id, parent_span_id, sampled)`` from a W3C traceparent header, or None."""
+    parts = (header or "").strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        sampled = bool(int(parts[3], 16) & 1)
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    return parts[1], parts[2], sampled
+
+
+async def httpx_trace(event_name: str, info: dict) -> None:
+    """httpx ``trace`` extension hook turning connection phases into child spans.
+
+    httpcore reports ``<phase>.started`` / ``.complete`` / ``.failed`` for
+    TCP connect (including DNS resolution), TLS handshake, sending the
+    request and receiving the response headers and body.
+    """
+    parent = _current.get()
+    if parent is None:
+        return
+    phase, _, stage = event_name.rpartition(".")
+    open_phases = parent.attributes.setdefault("_phases", {})
+    if stage == "started":
+        open_phases[phase] = Span(phase, parent=parent, kind=KIND_CLIENT)
+    elif phase in open_phases:
+        child = open_phases.pop(phase)
+        if stage == "failed" and isinstance(info.get("exception"), BaseException):
+            child.fail(info["exception"])
+        child.end()
+
+
+class TracingMiddleware:
+    """ASGI middleware opening a server span per HTTP request.
+
+    SSE streams are not traced as one span (they can last for days); the
+    tool calls made over them start their own traces.
+    """
+
+    def __init__(self, app, route_label):
+        self.app = app
+        self.route_label = route_label
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not enabled():
+            await self.app(scope, receive, send)
+            return
+        route = self.route_label(scope["path"])
+        if route == "/sse":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        parent = parse_traceparent(headers.get(b"traceparent", b"").decode("latin-1"))
+        trace_id, parent_id, sampled = parent or (None, None, None)
+        current = Span(f"{scope['method']} {route}", kind=KIND_SERVER,
+                       trace_id=trace_id, parent_id=parent_id, sampled=sampled)
+        current.set("http.request.method", scope["method"])
+        current.set("http.route", route)
+        current.set("url.path", scope["path"])
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                current.set("http.response.status_code", message["status"])
+                if message["status"] >= 500:
+                    current.status = STATUS_ERROR
+            await send(message)
+
+        token = _current.set(current)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as exc:
+            current.fail(exc)
+            raise
+        finally:
+            _current.reset(token)
+            current.end()
+
+
+def _any_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _attributes(attributes: dict) -> list:
+    return [{"key": key, "value": _any_value(value)} for key, value in attributes.items()
+            if not key.startswith("_")]
+
+
+def _otlp_span(item: Span) -> dict:
+    encoded = {
+        "traceId": item.trace_id,
+        "spanId": item.span_id,
+        "name": item.name,
+        "kind": item.kind,
+        "startTimeUnixNano": str(item.start_ns),
+        "endTimeUnixNano": str(item.end_ns),
+        "attributes": _attributes(item.attributes),
+        "status": {"code": item.status, "message": item.status_message} if item.status_message
+        else {"code": item.status},
+    }
+    if item.parent_id:
+        encoded["parentSpanId"] = item.parent_id
+    if item.events:
+        encoded["events"] = [{"timeUnixNano": str(at), "name": name, "attributes": _attributes(attrs)}
+                             for at, name, attrs in item.events]
+    return encoded
+
+
+def encode(spans: list) -> dict:
+    """Return ``spans`` as an OTLP/JSON ExportTraceServiceRequest."""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": _attributes({
+                "service.name": settings.TRACING_SERVICE_NAME,
+                "process.pid": os.getpid(),
+            })},
+            "scopeSpans": [{
+                "scope": {"name": "patchevergreen"},
+                "spans": [_otlp_span(item) for item in spans],
+            }],
+        }]
+    }
+
+
+class _Exporter:
+    """Batches finished spans and writes them out from a daemon thread."""
+
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=settings.TRACING_QUEUE_SIZE)
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="peg-trace-exporter", daemon=True)
+        self._thread.start()
+
+    def submit(self, item: Span) -> None:
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout: float) -> bool:
+        """Export every span submitted so far; return False if that took over ``timeout`` seconds."""
+        done = threading.Event()
+        deadline = time.monotonic() + timeout
+        try:
+            # Queued behind the spans already waiting, so they are all written first.
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(max(deadline - time.monotonic(), 0))
+
+    def _run(self) -> None:
+        client = None
+        if settings.TRACING_EXPORTER == "otlp":
+            import httpx
+
+            client = httpx.Client(timeout=10.0)
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + settings.TRACING_FLUSH_INTERVAL
+            while len(batch) < settings.TRACING_BATCH_SIZE and not isinstance(batch[-1], threading.Event):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            flushed = batch.pop() if isinstance(batch[-1], threading.Event) else None
+            if batch:
+                try:
+                    self._write(client, encode(batch))
+                except Exception:
+                    logger.warning("Could not export %d spans", len(batch), exc_info=True)
+            if flushed is not None:
+                flushed.set()
+
+    def _write(self, client, payload: dict) -> None:
+        if client is None:
+            with open(settings.TRACING_FILE, "a", encoding="utf-8") as f:
+                f.write(json.dumps(payload, separators=(",", ":")) + "\n")
+        else:
+            client.post(settings.TRACING_OTLP_ENDPOINT, json=payload).raise_for_status()
+
+
+_exporter_instance = None
+_exporter_lock = threading.Lock()
+
+
+def _exporter() -> _Exporter:
+    global _exporter_instance
+    if _exporter_instance is None:
+        with _exporter_lock:
+            if _exporter_instance is None:
+                _exporter_instance = _Exporter()
+                atexit.register(flush)
+    return _exporter_instance
+
+
+def flush(timeout: float = None) -> None:
+    """Export the spans still queued, waiting at most ``timeout`` seconds (``PEG_TRACING_SHUTDOWN_TIMEOUT``).
+
+    Registered to run at exit once the exporter has started, so spans are
+    not lost when a worker stops or the server is redeployed.
+    """
+    if _exporter_instance is None:
+        return
+    timeout = settings.TRACING_SHUTDOWN_TIMEOUT if timeout is None else timeout
+    if not _exporter_instance.flush(timeout):
+        logger.warning("Gave up exporting queued spans after %.1fs", timeout)
@@ -0,0 +1,50 @@
+"""The ASGI app served by the hosted MCP servers.
+
+One Starlette app carries both MCP HTTP transports:
+
+* SSE at ``/sse`` (with messages posted to ``workers.message_path()``),
+  for clients that keep a stream open for the whole session.
+* Streamable HTTP at ``PEG_STREAMABLE_HTTP_PATH``, where each request is a
+  short POST answered either with a JSON body or, when the tool reports
+  progress, with a response stream that ends with the result. In the
+  default stateless mode no session outlives its request, so idle clients
+  hold no socket or server state and any worker can serve any request.
+"""
+import logging
+
+from fastmcp.server.http import create_sse_app, create_streamable_http_app
+from starlette.middleware import Middleware
+
+from patchevergreen import metrics, settings, tracing, workers
+
+logger = logging.getLogger(__name__)
+
+
+def http_app(mcp):
+    """Build the SSE + streamable HTTP app for ``mcp``, wrapped for worker routing when enabled."""
+    streamable = create_streamable_http_app(
+        server=mcp,
+        streamable_http_path=settings.STREAMABLE_HTTP_PATH,
+        json_response=settings.STREAMABLE_HTTP_JSON_RESPONSE,
+        stateless_http=settings.STREAMABLE_HTTP_STATELESS,
+    )
+    custom_routes = set(map(id, mcp._additional_http_routes))
+    app = create_sse_app(
+        server=mcp,
+        message_path=workers.message_path(),
+        sse_path="/sse",
+        routes=[route for route in streamable.routes if id(route) not in custom_routes],
+        middleware=[
+            Middleware(metrics.HTTPMetricsMiddleware),
+            Middleware(tracing.TracingMiddleware, route_label=metrics.route_label),
+        ],
+    )
+    # The streamable HTTP session manager runs inside its app's lifespan.
+    app.router.lifespan_context = streamable.router.lifespan_context
+
+    if workers.routing_enabled():
+        if not settings.STREAMABLE_HTTP_STATELESS:
+            logger.warning("Stateful streamable HTTP sessions are not routed between workers; "
+                           "set PEG_STREAMABLE_HTTP_STATELESS=true or run a single worker")
+        return workers.SessionRouter(app)
+    return app
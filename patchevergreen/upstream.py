@@ -0,0 +1,146 @@
+"""Async, connection-pooled client for the PatchEvergreen API.
+
+All tool calls in a process share one ``httpx.AsyncClient``. It keeps
+connections alive between calls and multiplexes requests over HTTP/2, so many
+concurrent lookups cost one TLS handshake per pooled connection rather than one
+per call, and the event loop is never blocked waiting on the network.
+
+Requests are rate limited and queued by priority (see
+``patchevergreen.scheduler``). Transient failures are retried and a circuit
+breaker stops calling the API while it keeps failing (see
+``patchevergreen.resilience``).
+"""
+import asyncio
+import time
+
+import httpx
+
+from patchevergreen import codec, metrics, resilience, settings, tracing
+from patchevergreen.scheduler import scheduler
+
+_client = None
+_client_loop = None
+
+breaker = resilience.CircuitBreaker(settings.UPSTREAM_BREAKER_THRESHOLD, settings.UPSTREAM_BREAKER_RESET)
+
+
+def _build_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.UPSTREAM_POOL_SIZE,
+        max_keepalive_connections=settings.UPSTREAM_POOL_SIZE,
+        keepalive_expiry=settings.UPSTREAM_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(
+        connect=settings.UPSTREAM_CONNECT_TIMEOUT,
+        read=settings.UPSTREAM_READ_TIMEOUT,
+        write=settings.UPSTREAM_READ_TIMEOUT,
+        pool=settings.UPSTREAM_POOL_TIMEOUT,
+    )
+    return httpx.AsyncClient(http2=settings.UPSTREAM_HTTP2, limits=limits, timeout=timeout)
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it on first use.
+
+    Pooled connections belong to the event loop that opened them, so a new
+    client is created if we are called from a different loop.
+    """
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = _build_client()
+        _client_loop = loop
+    return _client
+
+
+async def aclose() -> None:
+    """Close the shared client and its pooled connections."""
+    global _client, _client_loop
+    if _client is not None:
+        await _client.aclose()
+    _client = None
+    _client_loop = None
+
+
+async def _get(library: str, language: str) -> bytes:
+    params = {"library": library, "language": language}
+    with tracing.span("upstream.fetch", kind=tracing.KIND_CLIENT, library=library, language=language) as span:
+        # Connection phases (DNS + TCP connect, TLS, request, response) become child spans.
+        extensions = {"trace": tracing.httpx_trace} if tracing.enabled() else None
+        started = time.perf_counter()
+        try:
+            response = await get_client().get(settings.UPSTREAM_URL, params=params, extensions=extensions)
+        except httpx.HTTPError as exc:
+            metrics.UPSTREAM_REQUESTS.inc(status=type(exc).__name__)
+            raise
+        finally:
+            metrics.UPSTREAM_DURATION.observe(time.perf_counter() - started)
+        metrics.UPSTREAM_REQUESTS.inc(status=response.status_code)
+        span.set("http.response.status_code", response.status_code)
+        span.set("http.response.body.size", len(response.content))
+        span.set("network.protocol.version", response.http_version)
+        response.raise_for_status()
+        return response.content
+
+
+async def fetch_issues_raw(library: str, language: str) -> bytes:
+    """Fetch the raw JSON body for ``library``/``language`` from the PatchEvergreen API.
+
+    Timeouts, connection errors, 429 and 5xx answers are retried up to
+    ``PEG_UPSTREAM_RETRIES`` times with jittered backoff, as long as the
+    retry can start within ``PEG_UPSTREAM_RETRY_BUDGET`` seconds of the call.
+
+    Raises:
+        httpx.HTTPStatusError: If the API answers with a 4xx/5xx status.
+        httpx.TransportError: If the API cannot be reached in time.
+        resilience.CircuitOpenError: If the API has been failing and is not being called.
+    """
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        await scheduler.acquire()
+        breaker.before_call()
+        try:
+            body = await _get(library, language)
+        except httpx.HTTPError as exc:
+            if not resilience.is_transient(exc):
+                # The API answered; it is up even if it rejected this request.
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            delay = resilience.backoff(attempt, settings.UPSTREAM_RETRY_BASE_DELAY, settings.UPSTREAM_RETRY_MAX_DELAY)
+            requested = resilience.retry_after(exc, settings.UPSTREAM_RETRY_MAX_DELAY)
+            if requested is not None:
+                scheduler.throttle(requested)
+                delay = max(delay, requested)
+            if (attempt >= settings.UPSTREAM_RETRIES
+                    or time.monotonic() - started + delay > settings.UPSTREAM_RETRY_BUDGET):
+                raise
+            attempt += 1
+            metrics.UPSTREAM_RETRIES.inc()
+            await asyncio.sleep(delay)
+        else:
+            breaker.record_success()
+            return body
+
+
+async def fetch_issues(library: str, language: str) -> dict:
+    """Fetch and decode the issues for ``library``/``language``."""
+    return codec.loads(await fetch_issues_raw(library, language))
+
+
+def _breaker_metrics() -> list:
+    stats = breaker.stats()
+    return [
+        {"name": "peg_upstream_circuit_open", "type": "gauge",
+         "help": "1 while the circuit breaker is failing upstream calls fast (0.5 while half-open).",
+         "samples": [("", {}, {"closed": 0, "half_open": 0.5, "open": 1}[stats["state"]])]},
+        metrics.gauge_family("peg_upstream_circuit_opened_total", "Times the circuit breaker opened.",
+                             stats["times_opened"], "counter"),
+        metrics.gauge_family("peg_upstream_short_circuited_total",
+                             "Upstream calls failed fast by the open circuit breaker.",
+                             stats["short_circuited"], "counter"),
+    ]
+
+
+metrics.register_collector(_breaker_metrics)
@@ -0,0 +1,179 @@
+"""Ecosystem-aware version ordering and a sorted per-library issue index.
+
+``version_key`` turns a version string into a sortable key using the rules
+of the library's ecosystem: PEP 440 for Python, Maven's qualifier order
+for JVM languages, Composer's stability order for PHP, and semver-style
+ordering (pre-releases before the release) for everything else. Keys from
+different ecosystems are never compared with each other.
+"""
+import re
+from bisect import bisect_right
+
+from packaging.version import InvalidVersion, Version
+
+from patchevergreen import lookup, names
+from patchevergreen.manifests import pinned_version
+from patchevergreen.payload import issue_list, issue_version
+
+_RELEASE = re.compile(r"^[vV]?(\d+(?:\.\d+)*)(.*)$")
+_IDENTIFIER = re.compile(r"\d+|[A-Za-z]+")
+
+_MAVEN_QUALIFIERS = {
+    "alpha": 0, "a": 0, "beta": 1, "b": 1, "milestone": 2, "m": 2, "rc": 3, "cr": 3,
+    "snapshot": 4, "": 5, "ga": 5, "final": 5, "release": 5, "sp": 6,
+}
+_COMPOSER_STABILITY = {
+    "dev": 0, "alpha": 1, "a": 1, "beta": 2, "b": 2, "rc": 3, "": 4, "stable": 4, "patch": 5, "pl": 5, "p": 5,
+}
+
+# Keyed by canonical language name (see ``names.canonical_language``)
+SCHEMES = {
+    "python": "pep440",
+    "java": "maven",
+    "php": "composer",
+}
+
+
+def _split(version: str):
+    """Split ``version`` into a release tuple without trailing zeros and the rest."""
+    match = _RELEASE.match(version.strip().split("+", 1)[0])
+    if match is None:
+        return None, None
+    release = [int(part) for part in match.group(1).split(".")]
+    while len(release) > 1 and release[-1] == 0:
+        release.pop()
+    return tuple(release), match.group(2).lstrip(".-_")
+
+
+def _identifiers(parts: list) -> tuple:
+    # Numbers sort before words, as semver specifies for pre-release identifiers.
+    return tuple((0, int(part), "") if part.isdigit() else (1, 0, part.lower()) for part in parts)
+
+
+def _semver_key(version: str):
+    release, rest = _split(version)
+    if release is None:
+        return None
+    if not rest:
+        return release, 1, ()
+    return release, 0, _identifiers(_IDENTIFIER.findall(rest))
+
+
+def _ranked_key(version: str, ranks: dict, unknown_rank: int):
+    release, rest = _split(version)
+    if release is None:
+        return None
+    identifiers = _IDENTIFIER.findall(rest)
+    qualifier = identifiers[0].lower() if identifiers and not identifiers[0].isdigit() else ""
+    if qualifier:
+        identifiers = identifiers[1:]
+    if qualifier in ranks:
+        return release, ranks[qualifier], "", _identifiers(identifiers)
+    # Unknown qualifiers (e.g. Guava's "-jre") sort among themselves by name.
+    return release, unknown_rank, qualifier, _identifiers(identifiers)
+
+
+def _pep440_key(version: str):
+    try:
+        return Version(version)
+    except InvalidVersion:
+        return None
+
+
+def version_key(language: str, version: str):
+    """Return a sortable key for ``version`` in ``language``'s ecosystem, or None.
+
+    ``language`` may be an alias (``py``, ``kotlin``, ``typescript``...).
+    Operators such as ``^``, ``~>`` or ``==`` are stripped first, so a
+    Composer constraint like ``^6.5`` sorts as ``6.5``.
+    """
+    if not version:
+        return None
+    version = pinned_version(version) or version
+    scheme = SCHEMES.get(names.canonical_language(language), "semver")
+    if scheme == "pep440":
+        return _pep440_key(version)
+    if scheme == "maven":
+        return _ranked_key(version, _MAVEN_QUALIFIERS, len(_MAVEN_QUALIFIERS))
+    if scheme == "composer":
+        return _ranked_key(version, _COMPOSER_STABILITY, _COMPOSER_STABILITY[""])
+    return _semver_key(version)
+
+
+class VersionIndex:
+    """A library's issues sorted by the version that introduced them.
+
+    Built once per cached response; each range query is two binary searches.
+    """
+
+    def __init__(self, language: str, payload):
+        self.language = language
+        versioned = []
+        self.unversioned = []
+        for issue in issue_list(payload):
+            key = version_key(language, issue_version(issue))
+            if key is None:
+                self.unversioned.append(issue)
+            else:
+                versioned.append((key, len(versioned), issue))
+        versioned.sort(key=lambda item: (item[0], item[1]))
+        self._keys = [key for key, _, _ in versioned]
+        self._issues = [issue for _, _, issue in versioned]
+
+    def __len__(self) -> int:
+        return len(self._issues) + len(self.unversioned)
+
+    def between(self, current_version: str, target_version: str) -> list:
+        """Return issues introduced after ``current_version`` up to and including ``target_version``.
+
+        Raises:
+            ValueError: If either version cannot be parsed for this ecosystem.
+        """
+        current = version_key(self.language, current_version)
+        target = version_key(self.language, target_version)
+        if current is None or target is None:
+            bad = current_version if current is None else target_version
+            raise ValueError(f"Cannot parse version '{bad}' for language '{self.language}'")
+        if target < current:
+            current, target = target, current
+        return self._issues[bisect_right(self._keys, current):bisect_right(self._keys, target)]
+
+    def after(self, current_version: str) -> list:
+        """Return issues introduced after ``current_version``.
+
+        Raises:
+            ValueError: If the version cannot be parsed for this ecosystem.
+        """
+        current = version_key(self.language, current_version)
+        if current is None:
+            raise ValueError(f"Cannot parse version '{current_version}' for language '{self.language}'")
+        return self._issues[bisect_right(self._keys, current):]
+
+    def newest_first(self) -> list:
+        """Return every issue, the most recently introduced first and unversioned ones last."""
+        return self._issues[::-1] + self.unversioned
+
+
+async def version_index(library: str, language: str, payload=None) -> VersionIndex:
+    """Return the ``VersionIndex`` of the pair's issues, built once per cached response."""
+    return await lookup.get_derived(library, language, "version_index",
+                                    lambda payload: VersionIndex(language, payload), payload)
+
+
+async def issues_between(library: str, language: str, current_version: str, target_version: str) -> dict:
+    """Return the issues for the pair that fall in (current_version, target_version].
+
+    The index is memoized on the cached response, so repeated range queries
+    for the same library cost two binary searches each.
+    """
+    index = await version_index(library, language)
+    issues = index.between(current_version, target_version)
+    return {
+        "library": library,
+        "language": language,
+        "current_version": current_version,
+        "target_version": target_version,
+        "issues": issues,
+        "total_issues": len(index),
+        "unversioned_issues": len(index.unversioned),
+    }
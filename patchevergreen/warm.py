@@ -0,0 +1,173 @@
+"""Pre-populate the response cache, and move it between machines as a snapshot.
+
+Usage::
+
+    # Fetch pairs into the disk cache (PEG_DISK_CACHE_PATH) and/or a snapshot file
+    python -m patchevergreen.warm fetch --pairs pairs.txt --manifests ./src --output cache.jsonl.gz
+
+    # Copy the disk cache to a snapshot, or a snapshot into the disk cache
+    python -m patchevergreen.warm export cache.jsonl.gz
+    python -m patchevergreen.warm import cache.jsonl.gz
+
+A pairs file has one ``library language`` pair per line (a comma also
+separates them); blank lines and ``#`` comments are ignored. Manifest
+directories are searched recursively for the manifest formats that
+``audit_manifests`` supports.
+
+Start a server with ``PEG_CACHE_SNAPSHOT=cache.jsonl.gz`` to load a snapshot
+at startup, and add ``PEG_OFFLINE=true`` to serve from it alone.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections.abc import Mapping
+
+from patchevergreen import batch, codec, lookup, settings, snapshot, upstream
+from patchevergreen.disk_cache import DiskCache
+from patchevergreen.manifests import detect_format, parse_manifest
+
+# Directories that hold installed or generated code rather than a project's own manifests
+_SKIP_DIRS = {"node_modules", "vendor", "target", "build", "dist", "__pycache__", "venv", ".venv"}
+
+
+def read_pairs(path: str) -> list:
+    """Return the (library, language) pairs listed in a pairs file."""
+    pairs = []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            parts = line.replace(",", " ").split()
+            if len(parts) != 2:
+                raise ValueError(f"{path}:{number}: expected 'library language', got {line!r}")
+            pairs.append((parts[0], parts[1]))
+    return pairs
+
+
+def find_manifest_pairs(directory: str) -> list:
+    """Return the (library, language) pairs declared by every manifest under ``directory``."""
+    pairs = []
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if not d.startswith(".") and d not in _SKIP_DIRS)
+        for name in sorted(files):
+            try:
+                detect_format(name)
+            except ValueError:
+                continue
+            path = os.path.join(root, name)
+            try:
+                dependencies = parse_manifest(name, path=path)
+            except Exception as exc:
+                print(f"skipping {path}: {type(exc).__name__}: {exc}", file=sys.stderr)
+                continue
+            pairs.extend((dependency.name, dependency.language) for dependency in dependencies)
+    return pairs
+
+
+def _disk_cache(path: str) -> DiskCache:
+    path = path or settings.DISK_CACHE_PATH
+    if not path:
+        raise SystemExit("No disk cache: set PEG_DISK_CACHE_PATH or pass --disk-cache")
+    return DiskCache(path, ttl=settings.CACHE_TTL, max_stale=settings.CACHE_MAX_STALE,
+                     stale_if_error=settings.CACHE_STALE_IF_ERROR)
+
+
+async def _fetch(pairs: list, concurrency: int) -> list:
+    unique = {}
+    for library, language in pairs:
+        unique.setdefault(lookup.cache_key(library, language), None)
+    items = [{"library": library, "language": language} for library, language in unique]
+
+    async def report(done: int, item: dict) -> None:
+        status = "error: " + item["error"] if "error" in item else "ok"
+        print(f"[{done}/{len(items)}] {item['library']} ({item['language']}) {status}", file=sys.stderr)
+
+    try:
+        return await batch.fan_out(items, report, session="warm", concurrency=concurrency)
+    finally:
+        await upstream.aclose()
+
+
+def fetch(args) -> int:
+    pairs = []
+    for path in args.pairs:
+        pairs.extend(read_pairs(path))
+    for directory in args.manifests:
+        pairs.extend(find_manifest_pairs(directory))
+    if not pairs:
+        raise SystemExit("Nothing to fetch: pass --pairs and/or --manifests")
+    if not settings.DISK_CACHE_PATH and not args.output:
+        raise SystemExit("Nowhere to keep the results: set PEG_DISK_CACHE_PATH and/or pass --output")
+
+    started = time.perf_counter()
+    results = asyncio.run(_fetch(pairs, args.concurrency))
+    failed = [item for item in results if "error" in item]
+    if args.output:
+        def records():
+            for item in results:
+                if "error" in item:
+                    continue
+                key = lookup.cache_key(item["library"], item["language"])
+                entry = lookup.memory_cache.peek(key)
+                if entry is not None:
+                    yield key, entry.value, entry.fetched_at
+                else:
+                    payload = item["result"]
+                    if isinstance(payload, Mapping) and "stale" in payload:
+                        continue
+                    yield key, payload, time.time()
+
+        written = snapshot.write(args.output, records())
+        print(f"wrote {written} responses to {args.output}", file=sys.stderr)
+    print(f"fetched {len(results) - len(failed)} of {len(results)} libraries in "
+          f"{time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def export(args) -> int:
+    cache = _disk_cache(args.disk_cache)
+    written = snapshot.write(args.snapshot, ((key, codec.loads(body), fetched_at)
+                                             for key, body, fetched_at in cache.items()))
+    print(f"wrote {written} responses to {args.snapshot}", file=sys.stderr)
+    return 0
+
+
+def import_(args) -> int:
+    cache = _disk_cache(args.disk_cache)
+    imported = 0
+    for key, payload, fetched_at in snapshot.read(args.snapshot):
+        cache.set(key, codec.dumps(payload), fetched_at)
+        imported += 1
+    print(f"imported {imported} responses into {cache.path}", file=sys.stderr)
+    return 0
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m patchevergreen.warm",
+                                     description="Pre-populate and move the PatchEvergreen response cache.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    fetch_parser = commands.add_parser("fetch", help="fetch libraries into the disk cache and/or a snapshot")
+    fetch_parser.add_argument("--pairs", action="append", default=[], help="file of 'library language' lines")
+    fetch_parser.add_argument("--manifests", action="append", default=[], help="directory to search for manifests")
+    fetch_parser.add_argument("--concurrency", type=int, default=settings.BATCH_CONCURRENCY,
+                              help="lookups in flight at once")
+    fetch_parser.add_argument("--output", help="also write the fetched responses to this snapshot file")
+    fetch_parser.set_defaults(run=fetch)
+
+    for name, run, help_text in (("export", export, "write the disk cache to a snapshot file"),
+                                 ("import", import_, "load a snapshot file into the disk cache")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("snapshot", help="snapshot file (.jsonl, or .jsonl.gz for gzip)")
+        command.add_argument("--disk-cache", help="disk cache database (default: PEG_DISK_CACHE_PATH)")
+        command.set_defaults(run=run)
+
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
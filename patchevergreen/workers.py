@@ -0,0 +1,294 @@
+"""Multi-process serving of the MCP SSE app with session affinity.
+
+An SSE session lives in the worker process that accepted its ``GET /sse``,
+and the client's follow-up ``POST /messages`` requests must reach that same
+process. Each worker therefore gets an id and advertises the message path
+``/messages/<worker id>/`` to its clients. A POST that lands on another
+worker (because uvicorn's workers share one listening socket, or because
+nginx balanced it to another replica) is forwarded to the owner.
+
+Workers find each other through a registry directory: at startup each one
+opens a private listener and writes its address to ``<registry>/<worker id>``,
+and removes the file on shutdown. Files left behind by workers that died
+are removed by the next worker that finds nothing listening at their
+address, and a live worker rewrites its file if it has gone missing.
+Pointing ``PEG_WORKER_REGISTRY`` at a volume shared by several containers
+extends the same routing across replicas (with ``PEG_WORKER_BIND_HOST``
+set to an address the other containers can reach). Requests are only ever
+forwarded to addresses in the registry.
+
+The private listener binds to loopback by default and answers only what
+other workers ask of it: message POSTs for this worker's sessions and the
+metrics they collect. Operator endpoints such as ``/cache/stats`` are never
+served on it.
+"""
+import asyncio
+import contextlib
+import logging
+import os
+import re
+import secrets
+import socket
+import tempfile
+
+from patchevergreen import settings
+
+logger = logging.getLogger(__name__)
+
+WORKER_ID = secrets.token_hex(6)
+# This worker's private address once it has registered.
+_address = None
+
+_WORKER_ID = re.compile(r"^[0-9a-f]+$")
+_MESSAGE_PATH = re.compile(r"^/messages/([0-9a-f]+)(/.*)?$")
+# Hop-by-hop headers are never copied between the two connections.
+_HOP_HEADERS = {"connection", "keep-alive", "transfer-encoding", "content-length", "host", "upgrade"}
+# Paths other than message paths that other workers request from the private listener
+_PRIVATE_PATHS = {"/metrics"}
+# Seconds between checks that this worker's registry file still exists, and
+# the connect timeout when checking whether another worker is still there
+_REGISTER_INTERVAL = 30.0
+_PROBE_TIMEOUT = 1.0
+
+
+def routing_enabled() -> bool:
+    """Return True if this process takes part in session routing."""
+    return bool(settings.WORKER_REGISTRY)
+
+
+def message_path() -> str:
+    """Return the path this process's SSE sessions post their messages to."""
+    return f"/messages/{WORKER_ID}/" if routing_enabled() else "/messages/"
+
+
+def _advertised_host() -> str:
+    if settings.WORKER_ADVERTISE_HOST:
+        return settings.WORKER_ADVERTISE_HOST
+    if settings.WORKER_BIND_HOST not in ("0.0.0.0", "::", ""):
+        return settings.WORKER_BIND_HOST
+    try:
+        return socket.gethostbyname(socket.gethostname())
+    except OSError:
+        return "127.0.0.1"
+
+
+def _registry_file(worker_id: str) -> str:
+    return os.path.join(settings.WORKER_REGISTRY, worker_id)
+
+
+def _register() -> None:
+    path = _registry_file(WORKER_ID)
+    with open(path + ".tmp", "w") as f:
+        f.write(_address)
+    os.replace(path + ".tmp", path)
+
+
+def _unregister(worker_id: str) -> None:
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(_registry_file(worker_id))
+
+
+async def _is_dead(address: str) -> bool:
+    """Return True if nothing accepts connections at ``address`` (a slow answer is not taken as dead)."""
+    host, port = address.split("://", 1)[-1].rsplit(":", 1)
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, int(port)), _PROBE_TIMEOUT)
+    except asyncio.TimeoutError:
+        return False
+    except (OSError, ValueError):
+        return True
+    writer.close()
+    return False
+
+
+async def _remove_stale() -> None:
+    """Remove the registry files of other workers whose address no longer accepts connections."""
+    entries = {}
+    for worker_id in os.listdir(settings.WORKER_REGISTRY):
+        if worker_id == WORKER_ID or not _WORKER_ID.match(worker_id):
+            continue
+        try:
+            with open(_registry_file(worker_id)) as f:
+                entries[worker_id] = f.read().strip()
+        except FileNotFoundError:
+            continue
+    dead = await asyncio.gather(*(_is_dead(address) for address in entries.values()))
+    for (worker_id, address), is_dead in zip(entries.items(), dead):
+        if is_dead:
+            logger.info("Removing stale registration of worker %s at %s", worker_id, address)
+            _unregister(worker_id)
+
+
+class PrivateApp:
+    """ASGI wrapper serving the app on the private listener, limited to what other workers request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        match = _MESSAGE_PATH.match(scope["path"])
+        if (match and match.group(1) == WORKER_ID) or scope["path"] in _PRIVATE_PATHS:
+            await self.app(scope, receive, send)
+            return
+        await _respond(send, 404, b"Not Found")
+
+
+async def _respond(send, status: int, content: bytes, headers: list = None) -> None:
+    headers = list(headers or [(b"content-type", b"text/plain; charset=utf-8")])
+    headers.append((b"content-length", str(len(content)).encode()))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": content})
+
+
+def local_peers() -> dict:
+    """Return ``{worker id: address}`` for the other registered workers on this host."""
+    if _address is None:
+        return {}
+    host = _address.rsplit(":", 1)[0]
+    peers = {}
+    for worker_id in os.listdir(settings.WORKER_REGISTRY):
+        if worker_id == WORKER_ID or not _WORKER_ID.match(worker_id):
+            continue
+        try:
+            with open(_registry_file(worker_id)) as f:
+                address = f.read().strip()
+        except FileNotFoundError:
+            continue
+        if address.rsplit(":", 1)[0] == host:
+            peers[worker_id] = address
+    return peers
+
+
+class SessionRouter:
+    """ASGI wrapper that forwards message POSTs to the worker owning the session."""
+
+    def __init__(self, app):
+        self.app = app
+        self._peers = {}
+        self._client = None
+        self._server = None
+        self._serve_task = None
+        self._register_task = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.app(scope, self._lifespan_receive(receive), send)
+            return
+        if scope["type"] == "http":
+            match = _MESSAGE_PATH.match(scope["path"])
+            if match and match.group(1) != WORKER_ID:
+                await self._forward(match.group(1), scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+    def _lifespan_receive(self, receive):
+        async def wrapped():
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await self._start()
+            elif message["type"] == "lifespan.shutdown":
+                await self._stop()
+            return message
+        return wrapped
+
+    async def _start(self) -> None:
+        os.makedirs(settings.WORKER_REGISTRY, exist_ok=True)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((settings.WORKER_BIND_HOST, 0))
+        port = sock.getsockname()[1]
+        # uvicorn and httpx are only needed once a worker serves HTTP.
+        import httpx
+        import uvicorn
+
+        # log_config=None leaves the worker's logging setup alone.
+        config = uvicorn.Config(PrivateApp(self.app), lifespan="off", log_config=None, access_log=False)
+        self._server = uvicorn.Server(config)
+        # The worker's main server owns signal handling.
+        self._server.capture_signals = contextlib.nullcontext
+        self._serve_task = asyncio.create_task(self._server.serve(sockets=[sock]))
+        self._client = httpx.AsyncClient(timeout=httpx.Timeout(30.0, connect=5.0))
+
+        global _address
+        _address = f"http://{_advertised_host()}:{port}"
+        _register()
+        logger.info("Worker %s registered at %s", WORKER_ID, _address)
+        await _remove_stale()
+        self._register_task = asyncio.create_task(self._keep_registered())
+
+    async def _keep_registered(self) -> None:
+        # Another worker may have taken this one for dead (say, after a network blip) and removed its file.
+        while True:
+            await asyncio.sleep(_REGISTER_INTERVAL)
+            if not os.path.exists(_registry_file(WORKER_ID)):
+                logger.info("Worker %s registering again at %s", WORKER_ID, _address)
+                _register()
+
+    async def _stop(self) -> None:
+        if self._register_task is not None:
+            self._register_task.cancel()
+        _unregister(WORKER_ID)
+        if self._server is not None:
+            self._server.should_exit = True
+            await self._serve_task
+        if self._client is not None:
+            await self._client.aclose()
+
+    def _peer_address(self, worker_id: str):
+        address = self._peers.get(worker_id)
+        if address is None:
+            try:
+                with open(_registry_file(worker_id)) as f:
+                    address = f.read().strip()
+            except FileNotFoundError:
+                return None
+            self._peers[worker_id] = address
+        return address
+
+    async def _forward(self, worker_id: str, scope, receive, send) -> None:
+        import httpx
+
+        body = bytearray()
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+
+        address = self._peer_address(worker_id)
+        response = None
+        if address is not None:
+            url = address + scope["path"]
+            if scope["query_string"]:
+                url += "?" + scope["query_string"].decode("latin-1")
+            headers = [(name, value) for name, value in scope["headers"]
+                       if name.decode("latin-1").lower() not in _HOP_HEADERS]
+            try:
+                response = await self._client.request(scope["method"], url, headers=headers, content=bytes(body))
+            except httpx.TransportError as exc:
+                # The owner has gone away; its sessions went with it.
+                logger.warning("Could not forward to worker %s at %s: %s", worker_id, address, exc)
+                self._peers.pop(worker_id, None)
+                if isinstance(exc, httpx.ConnectError) and await _is_dead(address):
+                    # Nothing listens there any more, so stop routing to it.
+                    _unregister(worker_id)
+
+        if response is None:
+            await _respond(send, 404, b"Could not find session")
+            return
+        headers = [(name, value) for name, value in response.headers.raw
+                   if name.decode("latin-1").lower() not in _HOP_HEADERS]
+        await _respond(send, response.status_code, response.content, headers)
+
+
+def run(app: str, host: str, port: int) -> None:
+    """Serve the app factory ``app`` ("module:function") with ``PEG_WORKERS`` processes."""
+    import uvicorn
+
+    workers = max(1, settings.WORKERS)
+    if workers > 1 and not settings.WORKER_REGISTRY:
+        # Worker processes inherit the environment, so they all read this path.
+        os.environ["PEG_WORKER_REGISTRY"] = tempfile.mkdtemp(prefix="peg-workers-")
+    uvicorn.run(app, factory=True, host=host, port=port, workers=workers, log_level="info")
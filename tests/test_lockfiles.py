@@ -0,0 +1,401 @@
+import json
+
+import pytest
+
+from patchevergreen.lockfiles import JsonStream, LockGraph, dependency_paths, detect_format, parse_lockfile
+
+
+def chunked(text, size):
+    return [text[start:start + size] for start in range(0, len(text), size)]
+
+
+def versions(graph):
+    return {name: version for name, version in graph.packages.values()}
+
+
+def edges_by_name(graph):
+    return {(graph.packages[node][0], graph.packages[target][0])
+            for node, targets in graph.edges.items() if node in graph.packages
+            for target in targets}
+
+
+def paths_by_name(graph, max_paths=5):
+    return {graph.packages[node][0]: sorted(tuple(graph.packages[step][0] for step in path) for path in found)
+            for node, found in dependency_paths(graph, max_paths).items()}
+
+
+# --- JsonStream ------------------------------------------------------------
+
+DOCUMENT = json.dumps({
+    "skipped": {"nested": [1, {"deep": "va}l]ue"}, "quote \" and \\ backslash"], "n": -12.5e3},
+    "text": "esc\"aped \\ é 😀 {not [structure",
+    "number": 1234567890.125,
+    "items": [{"name": "a", "ok": True}, None, 42, "s"],
+    "empty": {},
+    "none": [],
+}, ensure_ascii=False)
+
+
+def read_document(stream):
+    found = {}
+    for key in stream.iter_object():
+        if key == "skipped":
+            stream.skip_value()
+        elif key == "items":
+            found[key] = []
+            for _ in stream.iter_array():
+                found[key].append(stream.read_value())
+        elif key in ("empty", "none"):
+            found[key] = list(stream.iter_object() if key == "empty" else stream.iter_array())
+        else:
+            found[key] = stream.read_value()
+    return found
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7, 16, 64, len(DOCUMENT)])
+def test_json_stream_splits_at_any_chunk_boundary(size):
+    stream = JsonStream(chunked(DOCUMENT, size))
+    assert read_document(stream) == {
+        "text": "esc\"aped \\ é 😀 {not [structure",
+        "number": 1234567890.125,
+        "items": [{"name": "a", "ok": True}, None, 42, "s"],
+        "empty": [],
+        "none": [],
+    }
+    assert stream.peek() == ""
+
+
+@pytest.mark.parametrize("size", [1, 4, 9])
+def test_json_stream_reads_a_number_split_across_chunks(size):
+    stream = JsonStream(chunked('[123456789, 2]', size))
+    values = []
+    for _ in stream.iter_array():
+        values.append(stream.read_value())
+    assert values == [123456789, 2]
+
+
+@pytest.mark.parametrize("text", ['{"a": [1, 2}', '{"a": "unterminated', '{"a" 1}', '{"a": {"b": 1]'])
+def test_json_stream_rejects_malformed_json(text):
+    with pytest.raises(ValueError):
+        stream = JsonStream(chunked(text, 3))
+        for _ in stream.iter_object():
+            stream.skip_value()
+
+
+# --- package-lock.json -----------------------------------------------------
+
+def test_package_lock_v3_resolves_nested_installs():
+    lock = json.dumps({
+        "name": "app",
+        "lockfileVersion": 3,
+        "packages": {
+            "": {"name": "app", "dependencies": {"express": "^4.18.0"}, "devDependencies": {"jest": "^29"}},
+            "node_modules/express": {"version": "4.18.2", "dependencies": {"debug": "2.6.9", "qs": "6.11.0"}},
+            "node_modules/express/node_modules/debug": {"version": "2.6.9"},
+            "node_modules/debug": {"version": "4.3.4"},
+            "node_modules/qs": {"version": "6.11.0"},
+            "node_modules/jest": {"version": "29.7.0", "dependencies": {"debug": "^4"}},
+            "node_modules/linked": {"resolved": "packages/linked", "link": True},
+        },
+    })
+    language, graph = parse_lockfile("package-lock.json", lock)
+    assert language == "javascript"
+    assert graph.projects == {""}
+    assert graph.edges["node_modules/express"] == ["node_modules/express/node_modules/debug", "node_modules/qs"]
+    assert graph.edges["node_modules/jest"] == ["node_modules/debug"]
+    paths = dependency_paths(graph, 5)
+    assert paths["node_modules/express/node_modules/debug"] == [
+        ("node_modules/express", "node_modules/express/node_modules/debug")]
+    assert paths["node_modules/debug"] == [("node_modules/jest", "node_modules/debug")]
+
+
+def test_package_lock_v2_prefers_packages_over_legacy_tree():
+    lock = json.dumps({
+        "lockfileVersion": 2,
+        "dependencies": {"stale": {"version": "0.0.1"}},
+        "packages": {"": {"dependencies": {"lodash": "^4"}}, "node_modules/lodash": {"version": "4.17.21"}},
+    })
+    _, graph = parse_lockfile("package-lock.json", lock)
+    assert versions(graph) == {"lodash": "4.17.21"}
+
+
+def test_package_lock_v1_legacy_tree():
+    lock = json.dumps({
+        "lockfileVersion": 1,
+        "dependencies": {
+            "a": {"version": "1.0.0", "requires": {"b": "^2"},
+                  "dependencies": {"b": {"version": "2.0.0"}}},
+            "b": {"version": "1.0.0"},
+        },
+    })
+    _, graph = parse_lockfile("npm-shrinkwrap.json", lock)
+    assert graph.edges == {"node_modules/a": ["node_modules/a/node_modules/b"]}
+    assert graph.packages["node_modules/a/node_modules/b"] == ("b", "2.0.0")
+
+
+# --- yarn.lock -------------------------------------------------------------
+
+YARN_CLASSIC = '''# THIS IS AN AUTOGENERATED FILE. DO NOT EDIT THIS FILE DIRECTLY.
+# yarn lockfile v1
+
+
+"@babel/core@^7.0.0", "@babel/core@^7.1.0":
+  version "7.22.5"
+  resolved "https://registry.yarnpkg.com/@babel/core/-/core-7.22.5.tgz#abc"
+  integrity sha512-xyz
+  dependencies:
+    debug "^4.1.0"
+    semver "^6.3.0"
+
+debug@^4.1.0:
+  version "4.3.4"
+  dependencies:
+    ms "2.1.2"
+
+ms@2.1.2:
+  version "2.1.2"
+
+semver@^6.3.0:
+  version "6.3.1"
+'''
+
+YARN_BERRY = '''# This file is generated by running "yarn install" inside your project.
+
+__metadata:
+  version: 6
+  cacheKey: 8
+
+"@babel/core@npm:^7.0.0, @babel/core@npm:^7.1.0":
+  version: 7.22.5
+  resolution: "@babel/core@npm:7.22.5"
+  dependencies:
+    debug: ^4.1.0
+    semver: ^6.3.0
+  checksum: abc
+  languageName: node
+  linkType: hard
+
+"app@workspace:.":
+  version: 0.0.0-use.local
+  resolution: "app@workspace:."
+  dependencies:
+    "@babel/core": ^7.1.0
+  languageName: unknown
+  linkType: soft
+
+"debug@npm:^4.1.0":
+  version: 4.3.4
+  resolution: "debug@npm:4.3.4"
+  dependencies:
+    ms: 2.1.2
+  languageName: node
+  linkType: hard
+
+"ms@npm:2.1.2":
+  version: 2.1.2
+  resolution: "ms@npm:2.1.2"
+  languageName: node
+  linkType: hard
+
+"semver@npm:^6.3.0":
+  version: 6.3.1
+  resolution: "semver@npm:6.3.1"
+  languageName: node
+  linkType: hard
+'''
+
+
+@pytest.mark.parametrize("lock", [YARN_CLASSIC, YARN_BERRY], ids=["classic", "berry"])
+def test_yarn_lock_versions_and_edges(lock):
+    _, graph = parse_lockfile("yarn.lock", lock)
+    assert versions(graph) == {"@babel/core": "7.22.5", "debug": "4.3.4", "ms": "2.1.2", "semver": "6.3.1"}
+    assert edges_by_name(graph) == {("@babel/core", "debug"), ("@babel/core", "semver"), ("debug", "ms")}
+    assert paths_by_name(graph)["ms"] == [("@babel/core", "debug", "ms")]
+
+
+def test_yarn_berry_workspace_is_the_project():
+    _, graph = parse_lockfile("yarn.lock", YARN_BERRY)
+    assert graph.projects == {"app@workspace:."}
+    assert "app@workspace:." not in graph.packages
+    assert paths_by_name(graph)["@babel/core"] == [("@babel/core",)]
+
+
+def test_yarn_classic_has_no_project_node():
+    _, graph = parse_lockfile("yarn.lock", YARN_CLASSIC)
+    assert graph.projects == set()
+    assert [graph.packages[node][0] for node in graph.roots()] == ["@babel/core"]
+
+
+# --- composer.lock, Pipfile.lock, poetry.lock ------------------------------
+
+def test_composer_lock():
+    lock = json.dumps({
+        "_readme": ["..."],
+        "packages": [
+            {"name": "Monolog/Monolog", "version": "3.4.0", "require": {"php": ">=8.1", "psr/log": "^2.0 || ^3.0"}},
+            {"name": "psr/log", "version": "3.0.0", "require": {"php": ">=8.0"}},
+        ],
+        "packages-dev": [{"name": "phpunit/phpunit", "version": "10.5.0", "require": {"ext-dom": "*"}}],
+    })
+    language, graph = parse_lockfile("composer.lock", lock)
+    assert language == "php"
+    assert versions(graph) == {"monolog/monolog": "3.4.0", "psr/log": "3.0.0", "phpunit/phpunit": "10.5.0"}
+    assert edges_by_name(graph) == {("monolog/monolog", "psr/log")}
+
+
+def test_pipfile_lock_strips_pins():
+    lock = json.dumps({
+        "_meta": {"hash": {"sha256": "x"}},
+        "default": {"requests": {"version": "==2.31.0", "hashes": []}, "local": {"path": "."}},
+        "develop": {"pytest": {"version": "==7.4.0"}},
+    })
+    language, graph = parse_lockfile("Pipfile.lock", lock)
+    assert language == "python"
+    assert versions(graph) == {"requests": "2.31.0", "local": None, "pytest": "7.4.0"}
+    assert not graph.has_edges
+
+
+def test_poetry_lock_links_normalized_names():
+    lock = '''[[package]]
+name = "Flask"
+version = "2.3.3"
+description = "A simple framework"
+
+[package.dependencies]
+Werkzeug = ">=2.3.7"
+itsdangerous = ">=2.1.2"
+
+[package.extras]
+async = ["asgiref (>=3.2)"]
+
+[[package]]
+name = "werkzeug"
+version = "2.3.7"
+
+[package.dependencies.MarkupSafe]
+version = ">=2.1.1"
+
+[[package]]
+name = "markupsafe"
+version = "2.1.3"
+
+[[package]]
+name = "its_dangerous"
+version = "2.1.2"
+
+[metadata]
+lock-version = "2.0"
+'''
+    _, graph = parse_lockfile("poetry.lock", lock)
+    assert versions(graph) == {"Flask": "2.3.3", "werkzeug": "2.3.7", "markupsafe": "2.1.3", "its_dangerous": "2.1.2"}
+    assert edges_by_name(graph) == {("Flask", "werkzeug"), ("werkzeug", "markupsafe")}
+
+
+# --- Cargo.lock, Gemfile.lock, go.sum --------------------------------------
+
+def test_cargo_lock_disambiguates_versions():
+    lock = '''version = 3
+
+[[package]]
+name = "app"
+version = "0.1.0"
+dependencies = [
+ "rand 0.8.5",
+ "rand 0.7.3",
+ "serde",
+]
+
+[[package]]
+name = "rand"
+version = "0.7.3"
+source = "registry+https://github.com/rust-lang/crates.io-index"
+
+[[package]]
+name = "rand"
+version = "0.8.5"
+source = "registry+https://github.com/rust-lang/crates.io-index"
+dependencies = ["serde"]
+
+[[package]]
+name = "serde"
+version = "1.0.188"
+source = "registry+https://github.com/rust-lang/crates.io-index"
+'''
+    _, graph = parse_lockfile("Cargo.lock", lock)
+    assert graph.projects == {("app", "0.1.0")}
+    assert ("app", "0.1.0") not in graph.packages
+    assert graph.edges[("app", "0.1.0")] == [("rand", "0.8.5"), ("rand", "0.7.3"), ("serde", "1.0.188")]
+    assert graph.edges[("rand", "0.8.5")] == [("serde", "1.0.188")]
+
+
+def test_gemfile_lock():
+    lock = '''GEM
+  remote: https://rubygems.org/
+  specs:
+    actionpack (7.0.4)
+      rack (~> 2.0)
+    nokogiri (1.15.4-x86_64-linux)
+      racc (~> 1.4)
+    rack (2.2.8)
+    racc (1.7.1)
+
+PLATFORMS
+  x86_64-linux
+
+DEPENDENCIES
+  actionpack (~> 7.0)
+  nokogiri!
+
+BUNDLED WITH
+   2.4.19
+'''
+    language, graph = parse_lockfile("Gemfile.lock", lock)
+    assert language == "ruby"
+    assert versions(graph) == {"actionpack": "7.0.4", "nokogiri": "1.15.4", "rack": "2.2.8", "racc": "1.7.1"}
+    assert paths_by_name(graph) == {
+        "actionpack": [("actionpack",)],
+        "nokogiri": [("nokogiri",)],
+        "rack": [("actionpack", "rack")],
+        "racc": [("nokogiri", "racc")],
+    }
+
+
+def test_go_sum_skips_go_mod_only_lines():
+    lock = (
+        "github.com/pkg/errors v0.9.1 h1:abc=\n"
+        "github.com/pkg/errors v0.9.1/go.mod h1:def=\n"
+        "golang.org/x/text v0.3.0/go.mod h1:ghi=\n"
+    )
+    _, graph = parse_lockfile("go.sum", lock)
+    assert versions(graph) == {"github.com/pkg/errors": "v0.9.1"}
+    assert not graph.has_edges
+
+
+# --- Paths and dispatch ----------------------------------------------------
+
+def test_dependency_paths_caps_paths_and_survives_cycles():
+    graph = LockGraph()
+    for node in "abcd":
+        graph.add(node, node, "1")
+    graph.projects.add("root")
+    for node, target in [("root", "a"), ("root", "b"), ("a", "c"), ("b", "c"), ("c", "d"), ("d", "c")]:
+        graph.depend(node, target)
+    paths = dependency_paths(graph, 1)
+    assert paths["c"] == [("a", "c")]
+    assert paths["d"] == [("a", "c", "d")]
+    assert len(dependency_paths(graph, 5)["c"]) == 2
+
+
+@pytest.mark.parametrize("filename, expected", [
+    ("frontend/package-lock.json", "package-lock.json"),
+    ("npm-shrinkwrap.json", "package-lock.json"),
+    ("pipfile.lock", "Pipfile.lock"),
+    ("gemfile.lock", "Gemfile.lock"),
+])
+def test_detect_format(filename, expected):
+    assert detect_format(filename) == expected
+
+
+def test_detect_format_rejects_unknown_files():
+    with pytest.raises(ValueError, match="Unsupported lockfile"):
+        detect_format("pnpm-lock.yaml")
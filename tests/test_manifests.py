@@ -0,0 +1,230 @@
+import pytest
+
+from patchevergreen.manifests import Dependency, detect_format, parse_manifest, pinned_version
+
+
+def names(dependencies):
+    return {dependency.name: dependency for dependency in dependencies}
+
+
+def test_requirements_pins_ranges_and_continuations():
+    deps = names(parse_manifest("requirements.txt", (
+        "requests==2.31.0\n"
+        "flask[async]>=2.0,<3 ; python_version >= '3.8'\n"
+        "django~=4.2  # LTS\n"
+        "numpy \\\n"
+        "    ==1.26.4\n"
+        "# a comment\n"
+        "--index-url https://pypi.org/simple\n"
+        "-r base.txt\n"
+    )))
+    assert deps == {
+        "requests": Dependency("requests", "python", "2.31.0", "==2.31.0"),
+        "flask": Dependency("flask", "python", None, ">=2.0,<3"),
+        "django": Dependency("django", "python", "4.2", "~=4.2"),
+        "numpy": Dependency("numpy", "python", "1.26.4", "==1.26.4"),
+    }
+
+
+def test_requirements_editable_and_url():
+    deps = parse_manifest("requirements.txt", (
+        "-e git+https://github.com/org/proj.git#egg=proj\n"
+        "-e ./local\n"
+        "--editable ../other\n"
+        "mypkg @ https://example.com/mypkg-1.0.tar.gz\n"
+        "https://example.com/other-1.0.zip\n"
+        "git+https://github.com/org/another.git\n"
+    ))
+    # Editable installs and bare URLs name no registry package; a direct
+    # reference does, but pins no registry version.
+    assert deps == [Dependency("mypkg", "python", None, None)]
+
+
+def test_requirements_keeps_first_declaration():
+    deps = parse_manifest("requirements.txt", "six==1.16.0\nsix==1.15.0\n")
+    assert deps == [Dependency("six", "python", "1.16.0", "==1.16.0")]
+
+
+def test_package_json():
+    deps = names(parse_manifest("package.json", """{
+        "name": "app",
+        "dependencies": {"lodash": "^4.17.21", "local": "file:../local"},
+        "devDependencies": {"jest": "29.7.0"},
+        "peerDependencies": {"react": ">=17 <19"}
+    }"""))
+    assert deps["lodash"] == Dependency("lodash", "javascript", "4.17.21", "^4.17.21")
+    assert deps["local"].version is None
+    assert deps["jest"].version == "29.7.0"
+    assert deps["react"].version is None
+
+
+def test_package_json_rejects_non_object_sections():
+    with pytest.raises(ValueError):
+        parse_manifest("package.json", '{"dependencies": ["lodash"]}')
+
+
+def test_composer_json_skips_platform_packages():
+    deps = names(parse_manifest("composer.json", """{
+        "require": {"php": ">=8.1", "ext-json": "*", "Monolog/Monolog": "^3.0"},
+        "require-dev": {"phpunit/phpunit": "10.5.0"}
+    }"""))
+    assert set(deps) == {"monolog/monolog", "phpunit/phpunit"}
+    assert deps["monolog/monolog"].version == "3.0"
+
+
+def test_gemfile():
+    deps = names(parse_manifest("Gemfile", (
+        "source 'https://rubygems.org'\n"
+        "gem 'rails', '~> 7.0.4'\n"
+        'gem "puma", ">= 5.0", "< 7"\n'
+        "gem 'bootsnap', require: false\n"
+    )))
+    assert deps["rails"] == Dependency("rails", "ruby", "7.0.4", "~> 7.0.4")
+    assert deps["puma"] == Dependency("puma", "ruby", None, ">= 5.0, < 7")
+    assert deps["bootsnap"] == Dependency("bootsnap", "ruby", None, None)
+
+
+def test_cargo_toml():
+    deps = names(parse_manifest("Cargo.toml", (
+        "[package]\n"
+        'name = "app"\n'
+        'version = "0.1.0"\n'
+        "\n"
+        "[dependencies]\n"
+        'serde = { version = "1.0", features = ["derive"] }\n'
+        'rand = "0.8.5"  # comment\n'
+        'local = { path = "../local" }\n'
+        'tokio_crate = { package = "tokio", version = "1.35" }\n'
+        "\n"
+        "[dev-dependencies.criterion]\n"
+        'version = "0.5"\n'
+        "\n"
+        "[target.'cfg(unix)'.dependencies]\n"
+        'libc = "0.2"\n'
+    )))
+    assert set(deps) == {"serde", "rand", "local", "tokio", "criterion", "libc"}
+    assert deps["serde"].version == "1.0"
+    assert deps["rand"].version == "0.8.5"
+    assert deps["local"].version is None
+    assert deps["tokio"].version == "1.35"
+    assert deps["criterion"].version == "0.5"
+
+
+def test_pom_xml_resolves_properties():
+    deps = names(parse_manifest("pom.xml", """<?xml version="1.0"?>
+<project xmlns="http://maven.apache.org/POM/4.0.0">
+  <groupId>com.example</groupId>
+  <version>2.0.0</version>
+  <properties>
+    <jackson.version>2.15.2</jackson.version>
+  </properties>
+  <dependencies>
+    <dependency>
+      <groupId>com.fasterxml.jackson.core</groupId>
+      <artifactId>jackson-databind</artifactId>
+      <version>${jackson.version}</version>
+    </dependency>
+    <dependency>
+      <groupId>${project.groupId}</groupId>
+      <artifactId>sibling</artifactId>
+      <version>${project.version}</version>
+    </dependency>
+    <dependency>
+      <groupId>org.example</groupId>
+      <artifactId>unresolved</artifactId>
+      <version>${missing.version}</version>
+    </dependency>
+  </dependencies>
+</project>"""))
+    assert deps["com.fasterxml.jackson.core:jackson-databind"].version == "2.15.2"
+    assert deps["com.example:sibling"].version == "2.0.0"
+    assert deps["org.example:unresolved"] == Dependency("org.example:unresolved", "java", None, "${missing.version}")
+
+
+def test_pom_xml_read_in_small_chunks(tmp_path, monkeypatch):
+    from patchevergreen import manifests
+
+    monkeypatch.setattr(manifests, "_CHUNK_SIZE", 7)
+    path = tmp_path / "pom.xml"
+    path.write_text("<project><dependencies><dependency><groupId>g</groupId><artifactId>a</artifactId>"
+                    "<version>1.2.3</version></dependency></dependencies></project>")
+    assert parse_manifest("pom.xml", path=str(path)) == [Dependency("g:a", "java", "1.2.3", "1.2.3")]
+
+
+def test_version_catalog_resolves_forward_references():
+    deps = names(parse_manifest("gradle/libs.versions.toml", (
+        "[libraries]\n"
+        'guava = { module = "com.google.guava:guava", version.ref = "guava" }\n'
+        'junit = { group = "org.junit.jupiter", name = "junit-jupiter", version = "5.10.0" }\n'
+        'okhttp = "com.squareup.okhttp3:okhttp:4.12.0"\n'
+        "\n"
+        "[versions]\n"
+        'guava = "32.1.2-jre"\n'
+    )))
+    assert deps["com.google.guava:guava"].version == "32.1.2-jre"
+    assert deps["org.junit.jupiter:junit-jupiter"].version == "5.10.0"
+    assert deps["com.squareup.okhttp3:okhttp"].version == "4.12.0"
+
+
+def test_gradle():
+    deps = names(parse_manifest("build.gradle", (
+        "dependencies {\n"
+        "    implementation 'org.springframework:spring-core:6.0.11'\n"
+        '    testImplementation("org.junit.jupiter:junit-jupiter:5.10.0")\n'
+        '    implementation(platform("org.springframework.boot:spring-boot-dependencies:3.1.2"))\n'
+        '    api("com.google.guava:guava")\n'
+        "}\n"
+    )))
+    assert deps["org.springframework:spring-core"].version == "6.0.11"
+    assert deps["org.junit.jupiter:junit-jupiter"].version == "5.10.0"
+    assert deps["org.springframework.boot:spring-boot-dependencies"].version == "3.1.2"
+    assert deps["com.google.guava:guava"].version is None
+
+
+def test_go_mod():
+    deps = names(parse_manifest("go.mod", (
+        "module example.com/app\n"
+        "\n"
+        "go 1.21\n"
+        "\n"
+        "require github.com/pkg/errors v0.9.1\n"
+        "require (\n"
+        "    golang.org/x/text v0.13.0 // indirect\n"
+        "    github.com/stretchr/testify v1.8.4\n"
+        ")\n"
+    )))
+    assert set(deps) == {"github.com/pkg/errors", "golang.org/x/text", "github.com/stretchr/testify"}
+    assert deps["golang.org/x/text"].version == "0.13.0"
+
+
+@pytest.mark.parametrize("filename, expected", [
+    ("requirements.txt", "requirements.txt"),
+    ("requirements/Requirements-Dev.TXT", "requirements.txt"),
+    ("app/package.json", "package.json"),
+    ("gemfile", "Gemfile"),
+    ("build.gradle", "build.gradle.kts"),
+    ("gradle/libs.versions.toml", "libs.versions.toml"),
+    ("deps.versions.toml", "libs.versions.toml"),
+])
+def test_detect_format(filename, expected):
+    assert detect_format(filename) == expected
+
+
+def test_detect_format_rejects_unknown_files():
+    with pytest.raises(ValueError, match="Unsupported manifest"):
+        detect_format("setup.py")
+
+
+@pytest.mark.parametrize("constraint, expected", [
+    ("==2.31.0", "2.31.0"),
+    ("^4.17.21", "4.17.21"),
+    ("~> 7.0", "7.0"),
+    ("v1.2.3", "1.2.3"),
+    (">=1.0,<2", None),
+    ("*", None),
+    ("latest", None),
+    ("", None),
+    (None, None),
+])
+def test_pinned_version(constraint, expected):
+    assert pinned_version(constraint) == expected
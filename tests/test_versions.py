@@ -0,0 +1,89 @@
+import pytest
+
+from patchevergreen.versions import VersionIndex, version_key
+
+
+def ordered(language, versions):
+    return sorted(versions, key=lambda version: version_key(language, version))
+
+
+def test_pep440_order():
+    assert ordered("python", ["1.0.post1", "1.0", "1.0rc1", "0.9", "1.0b2", "1.0.dev0", "1.0a1"]) == [
+        "0.9", "1.0.dev0", "1.0a1", "1.0b2", "1.0rc1", "1.0", "1.0.post1"]
+
+
+def test_semver_prerelease_order():
+    # The example ordering from the semver 2.0.0 specification, shuffled
+    versions = ["1.0.0", "1.0.0-rc.1", "1.0.0-beta.11", "1.0.0-alpha.beta", "1.0.0-beta.2", "1.0.0-alpha",
+                "1.0.0-beta", "1.0.0-alpha.1"]
+    assert ordered("javascript", versions) == [
+        "1.0.0-alpha", "1.0.0-alpha.1", "1.0.0-alpha.beta", "1.0.0-beta", "1.0.0-beta.2", "1.0.0-beta.11",
+        "1.0.0-rc.1", "1.0.0"]
+
+
+def test_maven_qualifier_order():
+    versions = ["1.0-sp1", "1.0", "1.0-SNAPSHOT", "1.0-RC1", "1.0-M1", "1.0-beta", "1.0-alpha-1"]
+    assert ordered("java", versions) == ["1.0-alpha-1", "1.0-beta", "1.0-M1", "1.0-RC1", "1.0-SNAPSHOT", "1.0",
+                                         "1.0-sp1"]
+
+
+def test_maven_unknown_qualifiers_sort_after_the_release():
+    assert ordered("java", ["31.1-jre", "31.1", "31.1-android", "31.0-jre"]) == [
+        "31.0-jre", "31.1", "31.1-android", "31.1-jre"]
+
+
+def test_composer_stability_order():
+    assert ordered("php", ["1.0.0-p1", "1.0.0", "1.0.0-RC1", "1.0.0-beta1", "1.0.0-dev"]) == [
+        "1.0.0-dev", "1.0.0-beta1", "1.0.0-RC1", "1.0.0", "1.0.0-p1"]
+
+
+@pytest.mark.parametrize("language, first, second", [
+    ("python", "1.0", "1.0.0"),
+    ("java", "1.0", "1.0.Final"),
+    ("go", "v1.2.3", "1.2.3"),
+    ("javascript", "1.0.0+build.5", "1.0.0"),
+    ("javascript", "1.10.0", "1.10"),
+])
+def test_equivalent_spellings(language, first, second):
+    assert version_key(language, first) == version_key(language, second)
+
+
+@pytest.mark.parametrize("language, constraint, version", [
+    ("py", "==2.0", "2.0"),
+    ("php", "^6.5", "6.5"),
+    ("ruby", "~> 7.0.4", "7.0.4"),
+])
+def test_constraints_and_language_aliases(language, constraint, version):
+    assert version_key(language, constraint) == version_key(language, version)
+
+
+def test_language_aliases_pick_the_ecosystem_scheme():
+    assert version_key("kotlin", "1.0-RC1") == version_key("java", "1.0-RC1")
+    assert version_key("py", "1.0rc1") < version_key("py", "1.0")
+
+
+@pytest.mark.parametrize("language, version", [
+    ("python", "not a version"),
+    ("javascript", "latest"),
+    ("javascript", ""),
+    ("java", None),
+])
+def test_unparseable_versions(language, version):
+    assert version_key(language, version) is None
+
+
+def test_version_index_ranges():
+    payload = {"issues": [
+        {"id": 1, "version": "2.0.0"},
+        {"id": 2, "version": "1.5.0"},
+        {"id": 3, "version": "2.0.0-rc.1"},
+        {"id": 4, "version": "3.0.0"},
+        {"id": 5},
+    ]}
+    index = VersionIndex("javascript", payload)
+    assert len(index) == 5
+    assert [issue["id"] for issue in index.between("1.5.0", "2.0.0")] == [3, 1]
+    assert [issue["id"] for issue in index.between("2.0.0", "1.5.0")] == [3, 1]
+    assert [issue["id"] for issue in index.unversioned] == [5]
+    with pytest.raises(ValueError, match="Cannot parse version"):
+        index.between("latest", "2.0.0")